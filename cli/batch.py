@@ -0,0 +1,68 @@
+"""
+Ejecución de operaciones por archivo sobre muchos PDFs con un pool de procesos.
+"""
+import os
+import time
+
+from cli.commands import FILE_OPERATIONS
+from logic.session import PDFSession
+from logic.workers import process_map
+
+
+def resolve_output(input_path, output, multiple, extension=".pdf"):
+    """
+    Decide la ruta de salida de un archivo: output es un archivo si solo hay
+    una entrada y tiene la extensión indicada; si no, es un directorio.
+    """
+    if not output:
+        return None
+    if not multiple and output.lower().endswith(extension) and not os.path.isdir(output):
+        return output
+
+    os.makedirs(output, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output, base_name + extension)
+
+
+def process_file(task):
+    """
+    Aplica una operación a un PDF y guarda el resultado.
+    Se ejecuta en un proceso trabajador: retorna solo datos serializables.
+    """
+    operation, input_path, output_path, opts = task
+    start = time.perf_counter()
+    result = {'input': input_path, 'output': output_path, 'ok': False}
+
+    session = PDFSession()
+    try:
+        session.open(input_path)
+        opts.output_file = output_path
+        should_save = FILE_OPERATIONS[operation](session, opts) is not False
+        result['ok'] = session.save(output_path) if should_save else True
+        result['pages'] = session.page_count
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        session.close()
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_per_file(operation, inputs, output, opts, jobs=None, extension=".pdf", cancel=None):
+    """
+    Ejecuta una operación sobre cada archivo de entrada, repartiendo los
+    archivos entre un pool de procesos. Produce los resultados en el orden
+    de las entradas. cancel es un threading.Event opcional para abandonar
+    lo que quede.
+    """
+    multiple = len(inputs) > 1
+    tasks = [(operation, path, resolve_output(path, output, multiple, extension), opts)
+             for path in inputs]
+
+    for task, result, error in process_map(process_file, tasks, jobs, cancel):
+        if error is not None:
+            _, input_path, output_path, _ = task
+            result = {'input': input_path, 'output': output_path, 'ok': False,
+                      'error': str(error), 'seconds': 0.0}
+        yield result
@@ -0,0 +1,434 @@
+"""
+Batería de benchmarks de las operaciones principales.
+
+Genera en local un corpus sintético y reproducible (la misma semilla produce
+los mismos documentos) de tres tipos:
+- text: páginas llenas de texto
+- vector: páginas con cientos de trazos vectoriales
+- image: páginas con imágenes a tamaño completo
+de cualquier número de páginas (10 a 10.000) y con índices profundos.
+
+Sobre cada documento se mide la carga, la fusión, el guardado, el renderizado
+a escala de miniatura y de vista previa, las transformaciones de PageEditor,
+el reordenamiento y la preparación de marcadores. Los resultados se guardan
+en JSON y se pueden comparar con una ejecución anterior (línea base) para
+detectar regresiones.
+"""
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from logic.bookmarks import BookmarkManager
+from logic.conversion_cache import default_cache_dir
+from logic.page_editor import PageEditor
+from logic.page_order import PageOrderManager
+from logic.pdf_handler import PDFHandler
+
+# Cambiar al modificar los generadores: invalida los corpus ya generados
+CORPUS_VERSION = 1
+CORPUS_SEED = 1234
+
+KINDS = ('text', 'vector', 'image')
+DEFAULT_SIZES = (10, 100)
+
+# Escalas que usa la interfaz: miniaturas del panel izquierdo y vista previa
+THUMBNAIL_SCALE = 0.15
+PREVIEW_SCALE = 1.0
+
+# Páginas muestreadas en las operaciones que dependen de cada página
+SAMPLE_PAGES = 20
+TRANSFORM_PAGES = 5
+# Imágenes añadidas en add_images_as_pages (como máximo)
+MAX_IMAGE_FILES = 100
+# Imágenes distintas del corpus (las páginas las reutilizan)
+DISTINCT_IMAGES = 8
+# Profundidad de los índices generados
+OUTLINE_DEPTH = 6
+
+# Una regresión debe superar el umbral relativo y esta diferencia absoluta
+DEFAULT_THRESHOLD = 0.10
+MIN_DELTA_SECONDS = 0.002
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+         "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+         "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo").split()
+
+
+def default_corpus_dir():
+    """Directorio donde se guarda el corpus generado (se reutiliza entre ejecuciones)"""
+    return os.path.join(os.path.dirname(default_cache_dir()), "benchmark-corpus")
+
+
+# =============================================================================
+# CORPUS SINTÉTICO
+# =============================================================================
+
+def _make_image(rng, width=640, height=480):
+    """Imagen RGB con bandas de color aleatorias (en bytes PNG)"""
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(255)
+    for top in range(0, height, 16):
+        color = [rng.randrange(256) for _ in range(3)]
+        pix.set_rect(fitz.IRect(rng.randrange(width // 2), top, width, top + 16), color)
+    return pix.tobytes("png")
+
+
+def _text_page(page, rng):
+    lines = []
+    for _ in range(60):
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(12)))
+    page.insert_text((36, 48), "\n".join(lines), fontsize=9)
+
+
+def _vector_page(page, rng):
+    shape = page.new_shape()
+    width, height = page.rect.width, page.rect.height
+    for _ in range(150):
+        points = [fitz.Point(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(4)]
+        shape.draw_bezier(*points)
+        shape.finish(color=(rng.random(), rng.random(), rng.random()), width=0.5)
+    for _ in range(50):
+        x, y = rng.uniform(0, width - 60), rng.uniform(0, height - 40)
+        shape.draw_rect(fitz.Rect(x, y, x + rng.uniform(5, 60), y + rng.uniform(5, 40)))
+        shape.finish(color=(0, 0, 0), fill=(rng.random(), rng.random(), rng.random()))
+    shape.commit()
+
+
+def _build_outline(page_count, rng):
+    """Un marcador por página con niveles anidados hasta OUTLINE_DEPTH"""
+    toc = []
+    for page in range(1, page_count + 1):
+        level = 1 + (page - 1) % OUTLINE_DEPTH
+        toc.append([level, f"Sección {page} " + rng.choice(WORDS), page])
+    return toc
+
+
+def generate_document(path, kind, page_count, seed=CORPUS_SEED):
+    """Genera un PDF sintético del tipo indicado"""
+    rng = random.Random(f"{seed}-{kind}-{page_count}")
+    doc = fitz.open()
+    image_xrefs = []
+    images = [_make_image(rng) for _ in range(DISTINCT_IMAGES)] if kind == 'image' else []
+
+    for index in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        if kind == 'text':
+            _text_page(page, rng)
+        elif kind == 'vector':
+            _vector_page(page, rng)
+        else:
+            slot = index % DISTINCT_IMAGES
+            rect = fitz.Rect(36, 36, 559, 806)
+            if slot < len(image_xrefs):
+                # Reutilizar el mismo objeto imagen, como haría un escáner con plantillas
+                page.insert_image(rect, xref=image_xrefs[slot])
+            else:
+                image_xrefs.append(page.insert_image(rect, stream=images[slot]))
+
+    doc.set_toc(_build_outline(page_count, rng))
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def generate_images(directory, count, seed=CORPUS_SEED):
+    """Genera imágenes sueltas (JPEG y PNG alternos) para add_images_as_pages"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        extension = "jpg" if index % 2 == 0 else "png"
+        path = os.path.join(directory, f"image-{index:04d}.{extension}")
+        if not os.path.exists(path):
+            pix = fitz.Pixmap(_make_image(random.Random(f"{seed}-image-{index}")))
+            data = pix.tobytes("jpeg") if extension == "jpg" else pix.tobytes("png")
+            with open(path, "wb") as f:
+                f.write(data)
+        paths.append(path)
+    return paths
+
+
+class Corpus:
+    """
+    Corpus en disco. Cada documento se genera la primera vez que se pide y
+    se reutiliza en las ejecuciones siguientes.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = os.path.join(directory or default_corpus_dir(), f"v{CORPUS_VERSION}")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def document(self, kind, page_count):
+        path = os.path.join(self.directory, f"{kind}-{page_count}.pdf")
+        if not os.path.exists(path):
+            temp_path = path + ".tmp"
+            generate_document(temp_path, kind, page_count)
+            os.replace(temp_path, path)
+        return path
+
+    def images(self, count):
+        return generate_images(os.path.join(self.directory, "images"), count)
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+
+class Measure:
+    """Acumula el tiempo de los bloques `with measure():` de una repetición"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._start = None
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+        return False
+
+
+def _sample_pages(page_count, count):
+    """Páginas repartidas uniformemente por el documento"""
+    if page_count <= count:
+        return list(range(page_count))
+    step = page_count / count
+    return [int(i * step) for i in range(count)]
+
+
+def bench_load(case, measure):
+    handler = PDFHandler()
+    with measure():
+        doc, toc = handler.load(case['path'])
+    doc.close()
+
+
+def bench_merge_single(case, measure):
+    handler = PDFHandler()
+    doc, toc = handler.load(case['path'])
+    with measure():
+        doc, toc, order = handler.merge_single(doc, toc, list(range(len(doc))), case['path'])
+    doc.close()
+
+
+def bench_add_images(case, measure):
+    handler = PDFHandler()
+    doc = fitz.open()
+    with measure():
+        handler.add_images_as_pages(doc, [], case['images'])
+    doc.close()
+
+
+def bench_save(case, measure):
+    handler = PDFHandler()
+    doc, toc = handler.load(case['path'])
+    out = os.path.join(case['temp_dir'], "save.pdf")
+    with measure():
+        handler.save(doc, toc, out)
+    doc.close()
+    os.remove(out)
+
+
+def _bench_pixmap(scale):
+    def bench(case, measure):
+        handler = PDFHandler()
+        doc, toc = handler.load(case['path'])
+        with measure():
+            for page_num in _sample_pages(len(doc), SAMPLE_PAGES):
+                handler.get_page_pixmap(doc, page_num, scale)
+        doc.close()
+    return bench
+
+
+def bench_apply_transforms(case, measure):
+    doc = fitz.open(case['path'])
+    editor = PageEditor()
+    for page_num in _sample_pages(len(doc), TRANSFORM_PAGES):
+        editor.set_page_scale(page_num, 0.9)
+        editor.set_page_margins_uniform(page_num, 20)
+        editor.set_page_grayscale(page_num, page_num % 2 == 0)
+    with measure():
+        editor.apply_all_transforms(doc)
+    doc.close()
+
+
+def bench_apply_reorder(case, measure):
+    doc = fitz.open(case['path'])
+    toc = doc.get_toc()
+    manager = PageOrderManager()
+    manager.set_order(list(reversed(range(len(doc)))))
+    with measure():
+        manager.apply_reorder(doc, toc)
+    doc.close()
+
+
+def bench_prepare_for_display(case, measure):
+    doc = fitz.open(case['path'])
+    manager = BookmarkManager()
+    manager.set_toc(doc.get_toc())
+    order = list(reversed(range(len(doc))))
+    doc.close()
+    with measure():
+        manager.prepare_for_display(order)
+
+
+# Nombre -> (función, tipos de documento en los que se mide)
+BENCHMARKS = {
+    'load': (bench_load, KINDS),
+    'merge_single': (bench_merge_single, KINDS),
+    'add_images_as_pages': (bench_add_images, ('image',)),
+    'save': (bench_save, KINDS),
+    'get_page_pixmap.thumbnail': (_bench_pixmap(THUMBNAIL_SCALE), KINDS),
+    'get_page_pixmap.preview': (_bench_pixmap(PREVIEW_SCALE), KINDS),
+    'apply_all_transforms': (bench_apply_transforms, KINDS),
+    'apply_reorder': (bench_apply_reorder, KINDS),
+    'prepare_for_display': (bench_prepare_for_display, ('text',)),
+}
+
+
+def run_case(bench, case, repeat, warmup=1):
+    """Ejecuta un benchmark y retorna los tiempos de cada repetición medida"""
+    samples = []
+    for index in range(warmup + repeat):
+        gc.collect()
+        measure = Measure()
+        bench(case, measure)
+        if index >= warmup:
+            samples.append(measure.seconds)
+    return samples
+
+
+def environment():
+    """Datos de la máquina, para saber si dos resultados son comparables"""
+    return {
+        'python': platform.python_version(),
+        'pymupdf': fitz.VersionBind,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, kinds=KINDS, repeat=5, corpus_dir=None,
+                   only=None, progress=None):
+    """
+    Ejecuta todos los benchmarks sobre el corpus y retorna los resultados.
+    only filtra por subcadena del nombre (p. ej. "pixmap" o "save[image").
+    """
+    corpus = Corpus(corpus_dir)
+    results = {}
+    temp_dir = tempfile.mkdtemp(prefix="easypdf-bench-")
+    try:
+        for kind in kinds:
+            for page_count in sizes:
+                case = {
+                    'path': corpus.document(kind, page_count),
+                    'temp_dir': temp_dir,
+                    'images': None,
+                }
+                for name, (bench, bench_kinds) in BENCHMARKS.items():
+                    key = f"{name}[{kind}-{page_count}]"
+                    if kind not in bench_kinds or (only and only not in key):
+                        continue
+                    if bench is bench_add_images and case['images'] is None:
+                        case['images'] = corpus.images(min(page_count, MAX_IMAGE_FILES))
+                    samples = run_case(bench, case, repeat)
+                    results[key] = {
+                        'operation': name,
+                        'kind': kind,
+                        'pages': page_count,
+                        'median': round(statistics.median(samples), 6),
+                        'min': round(min(samples), 6),
+                        'max': round(max(samples), 6),
+                        'samples': [round(s, 6) for s in samples],
+                    }
+                    if progress:
+                        progress(key, results[key])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {
+        'version': CORPUS_VERSION,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': environment(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+# =============================================================================
+# COMPARACIÓN CON UNA LÍNEA BASE
+# =============================================================================
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_results(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA_SECONDS):
+    """
+    Compara las medianas con las de la línea base. Una operación es una
+    regresión si tarda más de un `threshold` relativo y al menos min_delta
+    segundos más (así no se marcan diferencias de ruido en operaciones muy
+    rápidas). Retorna una fila por benchmark presente en ambos resultados.
+    """
+    rows = []
+    base_results = baseline.get('results', {})
+    for key, result in current.get('results', {}).items():
+        base = base_results.get(key)
+        if not base:
+            continue
+        delta = result['median'] - base['median']
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        if ratio > 1 + threshold and delta > min_delta:
+            status = 'regression'
+        elif ratio < 1 - threshold and -delta > min_delta:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        rows.append({
+            'benchmark': key,
+            'baseline': base['median'],
+            'current': result['median'],
+            'ratio': round(ratio, 3),
+            'status': status,
+        })
+    return rows
+
+
+def format_results(results):
+    lines = []
+    for key, result in results['results'].items():
+        per_page = result['median'] / result['pages'] * 1000
+        lines.append(f"{key:<45} {result['median'] * 1000:10.2f} ms  "
+                     f"({per_page:.3f} ms/pág, mín {result['min'] * 1000:.2f})")
+    return "\n".join(lines)
+
+
+def format_comparison(rows, current, baseline):
+    lines = []
+    if current.get('environment') != baseline.get('environment'):
+        lines.append("aviso: la línea base se midió en otro entorno; las diferencias pueden no ser significativas")
+    marks = {'regression': "REGRESIÓN", 'improvement': "mejora", 'ok': ""}
+    for row in rows:
+        lines.append(f"{row['benchmark']:<45} {row['baseline'] * 1000:10.2f} -> "
+                     f"{row['current'] * 1000:10.2f} ms  x{row['ratio']:<6} {marks[row['status']]}")
+    regressions = sum(1 for row in rows if row['status'] == 'regression')
+    lines.append(f"{len(rows)} comparados, {regressions} regresiones")
+    return "\n".join(lines)
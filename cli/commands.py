@@ -0,0 +1,208 @@
+"""
+Operaciones de la línea de comandos sobre una sesión PDF.
+Cada operación por archivo recibe la sesión abierta y las opciones de argparse.
+"""
+import json
+
+
+def parse_pages(spec, page_count):
+    """
+    Convierte una lista de páginas "1-3,5,9-" (1-based) en índices 0-based.
+    None o "all" seleccionan todas las páginas.
+    """
+    if not spec or spec == "all":
+        return list(range(page_count))
+
+    pages = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            start = int(start) if start else 1
+            end = int(end) if end else page_count
+            pages.extend(range(start - 1, min(end, page_count)))
+        else:
+            pages.append(int(part) - 1)
+
+    invalid = [p + 1 for p in pages if p < 0 or p >= page_count]
+    if invalid:
+        raise ValueError(f"Páginas fuera de rango (el documento tiene {page_count}): {invalid}")
+    return pages
+
+
+def parse_order(spec, page_count, reverse=False):
+    """
+    Calcula el nuevo orden de páginas. Las páginas indicadas van primero,
+    en ese orden; las no indicadas se añaden después en su orden original.
+    """
+    if reverse:
+        return list(range(page_count - 1, -1, -1))
+
+    listed = parse_pages(spec, page_count)
+    seen = set(listed)
+    return listed + [p for p in range(page_count) if p not in seen]
+
+
+def load_toc(path):
+    """Lee un TOC exportado como JSON: lista de [nivel, título, página]"""
+    with open(path, "r", encoding="utf-8") as f:
+        toc = json.load(f)
+    return [[int(lvl), str(title), int(page)] for lvl, title, page, *_ in toc]
+
+
+def write_toc(toc, path):
+    """Escribe el TOC como JSON (o por la salida estándar si path es None)"""
+    # Una entrada por línea: fácil de editar a mano y de comparar
+    lines = ",\n".join("  " + json.dumps(list(entry), ensure_ascii=False) for entry in toc)
+    text = f"[\n{lines}\n]" if toc else "[]"
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+# =============================================================================
+# OPERACIONES POR ARCHIVO
+# Cada una modifica la sesión; retornan False si no hay que guardar el PDF
+# =============================================================================
+
+def op_reorder(session, opts):
+    session.reorder(parse_order(opts.order, session.page_count, opts.reverse))
+
+
+def op_delete(session, opts):
+    session.delete_pages(parse_pages(opts.pages, session.page_count))
+
+
+def op_duplicate(session, opts):
+    session.duplicate_pages(parse_pages(opts.pages, session.page_count))
+
+
+def op_insert_blank(session, opts):
+    position = session.page_count if opts.after is None else opts.after
+    session.insert_blank(position, opts.count)
+
+
+def op_remove_duplicates(session, opts):
+    from logic.duplicates import format_groups
+
+    # Con varias entradas los archivos ya se reparten entre procesos
+    jobs = opts.jobs if len(opts.inputs) == 1 else 1
+    groups = session.find_duplicates(opts.max_distance, jobs)
+    repeated = [position for group in groups for position in group[1:]]
+    print(f"{opts.output_file}: {len(repeated)} páginas repetidas")
+    if groups and opts.details:
+        print(format_groups(groups))
+    if repeated:
+        session.delete_pages(repeated)
+
+
+def op_remove_blank(session, opts):
+    # Con varias entradas los archivos ya se reparten entre procesos
+    jobs = opts.jobs if len(opts.inputs) == 1 else 1
+    blank = session.find_blank_pages(opts.max_ink, jobs)
+    print(f"{opts.output_file}: {len(blank)} páginas en blanco")
+    if blank and opts.details:
+        print("\n".join(f"  página {position + 1}: {ink * 100:.2f} % de tinta"
+                        for position, ink in blank.items()))
+    if blank:
+        session.delete_pages(blank)
+
+
+def op_rotate(session, opts):
+    session.rotate(parse_pages(opts.pages, session.page_count), opts.direction)
+
+
+def op_scale(session, opts):
+    session.scale(parse_pages(opts.pages, session.page_count), opts.factor)
+
+
+def op_margins(session, opts):
+    pages = parse_pages(opts.pages, session.page_count)
+    if opts.all is not None:
+        session.margins(pages, opts.all, opts.all, opts.all, opts.all)
+    else:
+        session.margins(pages, opts.top, opts.right, opts.bottom, opts.left)
+
+
+def op_autocrop(session, opts):
+    # Con varias entradas los archivos ya se reparten entre procesos
+    jobs = opts.jobs if len(opts.inputs) == 1 else 1
+    cropped = session.autocrop(parse_pages(opts.pages, session.page_count),
+                               opts.uniform, opts.padding, jobs)
+    print(f"{opts.output_file}: {cropped} páginas recortadas")
+
+
+def op_grayscale(session, opts):
+    session.grayscale(parse_pages(opts.pages, session.page_count))
+
+
+def op_optimize_images(session, opts):
+    from logic.image_optimizer import format_report
+
+    # Con varias entradas los archivos ya se reparten entre procesos
+    jobs = opts.jobs if len(opts.inputs) == 1 else 1
+    report = session.optimize_images(opts.dpi, opts.quality, jobs)
+    print(f"{opts.output_file}: {format_report(report, opts.details)}")
+
+
+def op_impose(session, opts):
+    from cli.pipeline import parse_page_size
+
+    pages = session.page_count
+    sheets = session.impose(opts.nup, opts.booklet, parse_page_size({'size': opts.paper}),
+                            opts.signature, opts.creep, opts.gutter, opts.margin)
+    print(f"{opts.output_file}: {pages} páginas en {sheets} caras")
+
+
+def op_stamp(session, opts):
+    from logic.stamping import parse_color
+
+    if opts.bates is not None:
+        session.set_bates(opts.bates, opts.bates_start, opts.bates_digits)
+    text = opts.text
+    if text is None and opts.bates is not None:
+        text = "{bates}"
+    if text is None and opts.image is None:
+        raise ValueError("indica --text, --image o --bates")
+    if text is not None:
+        session.stamp_text(text, opts.position, opts.font_size, parse_color(opts.color),
+                           opts.opacity, opts.angle, opts.margin)
+    if opts.image is not None:
+        session.stamp_image(opts.image, opts.image_position, opts.image_width, opts.margin)
+    if opts.bates is not None:
+        manager = session.stamp_manager
+        print(f"{opts.output_file}: Bates {manager.bates_number(0)} a "
+              f"{manager.bates_number(session.page_count - 1)}")
+
+
+def op_bookmarks_import(session, opts):
+    session.set_bookmarks(load_toc(opts.toc))
+
+
+def op_bookmarks_export(session, opts):
+    write_toc(session.get_bookmarks(), opts.output_file)
+    return False
+
+
+FILE_OPERATIONS = {
+    'reorder': op_reorder,
+    'delete': op_delete,
+    'duplicate': op_duplicate,
+    'insert-blank': op_insert_blank,
+    'remove-duplicates': op_remove_duplicates,
+    'remove-blank': op_remove_blank,
+    'rotate': op_rotate,
+    'scale': op_scale,
+    'margins': op_margins,
+    'autocrop': op_autocrop,
+    'grayscale': op_grayscale,
+    'optimize-images': op_optimize_images,
+    'impose': op_impose,
+    'stamp': op_stamp,
+    'bookmarks-import': op_bookmarks_import,
+    'bookmarks-export': op_bookmarks_export,
+}
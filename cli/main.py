@@ -0,0 +1,527 @@
+"""
+easyPDF en línea de comandos.
+
+Ejecuta las mismas operaciones que la interfaz gráfica sin cargar tkinter.
+Las operaciones por archivo (rotar, escalar, etc.) aceptan varios PDFs y
+los procesan en paralelo con un pool de procesos.
+"""
+import argparse
+import logging
+import os
+import sys
+
+from cli.batch import resolve_output, run_per_file
+from logic.memory import format_report as format_memory_report, memory
+from logic.session import PDFSession
+from logic.tracing import tracer
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="easypdf",
+        description="Edición de PDFs por lotes sin interfaz gráfica."
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-v", "--verbose", action="store_true", help="mostrar más información")
+    common.add_argument("--trace", default=None, metavar="JSON",
+                        help="guardar una traza de rendimiento (formato Chrome trace / Perfetto)")
+    common.add_argument("--tracemalloc", action="store_true",
+                        help="medir con tracemalloc la memoria de cada operación y mostrar un resumen")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def command(name, help_text, parent=None):
+        return (parent or sub).add_parser(name, help=help_text, parents=[common])
+
+    def per_file(name, help_text, output_help="PDF de salida (una entrada) o directorio"):
+        p = command(name, help_text)
+        p.add_argument("inputs", nargs="+", help="PDFs de entrada")
+        p.add_argument("-o", "--output", required=True, help=output_help)
+        p.add_argument("-j", "--jobs", type=int, default=None,
+                       help="procesos en paralelo (por defecto, uno por CPU)")
+        return p
+
+    def pages_arg(p):
+        p.add_argument("--pages", default="all", help='páginas, p. ej. "1-3,5,9-" (por defecto todas)')
+
+    # --- Operaciones que combinan varias entradas en un PDF ---
+    p = command("merge", "fusionar PDFs en uno")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--output", required=True)
+
+    p = command("images-to-pdf", "crear un PDF a partir de imágenes")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("--max-dpi", type=int, default=None, help="reducir imágenes por encima de esta resolución")
+
+    p = command("docs-to-pdf", "convertir documentos de oficina a un PDF")
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--output", required=True)
+
+    # --- Operaciones por archivo ---
+    p = per_file("reorder", "reordenar páginas")
+    p.add_argument("--order", help='nuevo orden, p. ej. "3,1,2"; las páginas no indicadas van al final')
+    p.add_argument("--reverse", action="store_true", help="invertir el orden de las páginas")
+
+    p = per_file("delete", "eliminar páginas")
+    p.add_argument("--pages", required=True, help='páginas a eliminar, p. ej. "1,3,5-7"')
+
+    p = per_file("duplicate", "duplicar páginas (cada copia va tras su original)")
+    pages_arg(p)
+
+    p = per_file("insert-blank", "insertar páginas en blanco")
+    p.add_argument("--after", type=int, default=None, help="página tras la que insertar (0 = al principio; por defecto, al final)")
+    p.add_argument("--count", type=int, default=1, help="número de páginas")
+
+    p = per_file("remove-duplicates", "eliminar páginas repetidas")
+    p.add_argument("--max-distance", type=int, default=None,
+                   help="bits distintos tolerados entre las miniaturas de páginas sin texto (de 256)")
+    p.add_argument("--details", action="store_true", help="mostrar qué página repite a cuál")
+
+    p = per_file("remove-blank", "eliminar páginas en blanco")
+    p.add_argument("--max-ink", type=float, default=None,
+                   help="fracción de la página con tinta por debajo de la cual está en blanco (por defecto 0.002)")
+    p.add_argument("--details", action="store_true", help="mostrar la tinta de cada página eliminada")
+
+    p = per_file("rotate", "rotar páginas 90°")
+    p.add_argument("--direction", choices=("left", "right"), default="right")
+    pages_arg(p)
+
+    p = per_file("scale", "escalar páginas")
+    p.add_argument("--factor", type=float, required=True, help="factor de escala (1.0 = original)")
+    pages_arg(p)
+
+    p = per_file("margins", "añadir márgenes (en puntos)")
+    for side in ("top", "right", "bottom", "left"):
+        p.add_argument(f"--{side}", type=float, default=0)
+    p.add_argument("--all", type=float, default=None, help="mismo margen en los cuatro lados")
+    pages_arg(p)
+
+    p = per_file("autocrop", "recortar los márgenes en blanco")
+    p.add_argument("--uniform", action="store_true", help="mismo recorte en todas las páginas (el que abarca todo el contenido)")
+    p.add_argument("--padding", type=float, default=None, help="espacio en puntos alrededor del contenido (por defecto 6)")
+    pages_arg(p)
+
+    p = per_file("grayscale", "convertir páginas a blanco y negro")
+    pages_arg(p)
+
+    p = per_file("optimize-images", "reducir y recomprimir las imágenes")
+    p.add_argument("--dpi", type=int, default=150, help="resolución máxima según el tamaño al que se dibujan")
+    p.add_argument("--quality", type=int, default=75, help="calidad JPEG (1-95)")
+    p.add_argument("--details", action="store_true", help="mostrar el resultado de cada imagen")
+
+    p = per_file("impose", "imponer páginas en hojas de impresión (N-up o cuadernillo)")
+    layout = p.add_mutually_exclusive_group()
+    layout.add_argument("--nup", type=int, default=2, choices=(2, 4, 6, 8, 9, 16), help="páginas por cara")
+    layout.add_argument("--booklet", action="store_true", help="cuadernillo para plegar y grapar")
+    p.add_argument("--paper", default="A4", help="tamaño de la hoja: A3, A4, A5, LETTER o LEGAL")
+    p.add_argument("--signature", type=int, default=0,
+                   help="hojas por pliego del cuadernillo (por defecto, un solo pliego)")
+    p.add_argument("--creep", type=float, default=0,
+                   help="desplazamiento hacia el lomo de la hoja más interior de cada pliego (en puntos)")
+    p.add_argument("--gutter", type=float, default=0, help="espacio entre páginas (en puntos)")
+    p.add_argument("--margin", type=float, default=0, help="margen de la hoja (en puntos)")
+
+    positions = ("top-left", "top", "top-right", "center", "bottom-left", "bottom", "bottom-right")
+    p = per_file("stamp", "estampar numeración, Bates, marcas de agua o un logo en todas las páginas")
+    p.add_argument("--text", default=None,
+                   help='texto; admite {page}, {total} y {bates}, p. ej. "Página {page} de {total}"')
+    p.add_argument("--position", choices=positions, default="bottom-right")
+    p.add_argument("--font-size", type=float, default=None, help="cuerpo del texto (por defecto 10)")
+    p.add_argument("--color", default="#000000", help="color del texto (#rrggbb)")
+    p.add_argument("--opacity", type=float, default=1.0, help="opacidad del texto (0-1)")
+    p.add_argument("--angle", type=float, default=0, help="giro del texto en grados (solo sin campos)")
+    p.add_argument("--bates", default=None, metavar="PREFIJO",
+                   help="numeración Bates con este prefijo (sin --text, se estampa solo el número)")
+    p.add_argument("--bates-start", type=int, default=1, help="primer número Bates")
+    p.add_argument("--bates-digits", type=int, default=None, help="cifras del número Bates (por defecto 6)")
+    p.add_argument("--image", default=None, help="imagen (un logo) para estampar")
+    p.add_argument("--image-position", choices=positions, default="top-right")
+    p.add_argument("--image-width", type=float, default=None, help="ancho de la imagen en puntos (por defecto 96)")
+    p.add_argument("--margin", type=float, default=None, help="distancia al borde en puntos (por defecto 24)")
+
+    p = command("run", "ejecutar un archivo de trabajo JSON o TOML")
+    p.add_argument("job_file", help="archivo de trabajo")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="procesos en paralelo")
+    p.add_argument("--restart", action="store_true", help="ignorar el registro de trabajos hechos")
+    p.add_argument("--summary", default=None, help="ruta del resumen JSON")
+
+    p = command("watch", "procesar automáticamente lo que se deja en una carpeta")
+    p.add_argument("folder", help="carpeta vigilada (cada subcarpeta se fusiona en un PDF)")
+    p.add_argument("-o", "--output", required=True, help="directorio de salida")
+    p.add_argument("--config", default=None, help="archivo de trabajo con el proceso a aplicar")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="procesos en paralelo")
+    p.add_argument("--settle", type=float, default=5.0,
+                   help="segundos sin cambios para considerar un lote completo")
+    p.add_argument("--poll", action="store_true", help="revisar la carpeta periódicamente en vez de usar eventos")
+    p.add_argument("--poll-interval", type=float, default=2.0)
+    p.add_argument("--metrics", default=None, help="JSON donde escribir las métricas")
+
+    p = command("serve", "servicio HTTP local")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("-j", "--jobs", type=int, default=None, help="procesos del pool")
+    p.add_argument("--max-jobs", type=int, default=None, help="trabajos simultáneos como máximo")
+    p.add_argument("--max-upload-mb", type=float, default=200, help="tamaño máximo de cada subida")
+
+    p = command("startup", "medir el arranque de la interfaz gráfica")
+    p.add_argument("--runs", type=int, default=3, help="número de arranques")
+    p.add_argument("--json", action="store_true", help="resultado en JSON")
+    p.add_argument("--open", default=None, metavar="PDF",
+                   help="abrir también este PDF y medir la primera página y la carga completa")
+
+    p = command("bench", "medir el rendimiento con un corpus sintético")
+    p.add_argument("--sizes", default="10,100", help='páginas de los documentos, p. ej. "10,100,1000,10000"')
+    p.add_argument("--kinds", default="text,vector,image", help="tipos de documento")
+    p.add_argument("--repeat", type=int, default=5, help="repeticiones de cada medida")
+    p.add_argument("--filter", default=None, help="medir solo los benchmarks que contengan este texto")
+    p.add_argument("--corpus", default=None, help="directorio del corpus generado")
+    p.add_argument("-o", "--output", default=None, help="JSON donde guardar los resultados")
+    p.add_argument("--baseline", default=None, help="JSON de una ejecución anterior con la que comparar")
+    p.add_argument("--threshold", type=float, default=0.10,
+                   help="aumento relativo a partir del cual se marca una regresión")
+
+    p = command("split", "dividir un PDF en varios")
+    p.add_argument("input", help="PDF de entrada")
+    p.add_argument("-o", "--output", required=True, help="directorio de salida")
+    mode = p.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--every", type=int, metavar="N", help="una parte cada N páginas")
+    mode.add_argument("--bookmarks", action="store_true", help="una parte por marcador de primer nivel")
+    mode.add_argument("--ranges", nargs="+", metavar="RANGO",
+                      help='una parte por rango, p. ej. "1-3" "4-10,12" "13-"')
+    mode.add_argument("--blank", action="store_true",
+                      help="partir por las páginas en blanco (que se descartan)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="procesos en paralelo")
+
+    p = command("export-images", "exportar páginas como imágenes")
+    p.add_argument("input", help="PDF de entrada")
+    p.add_argument("-o", "--output", required=True, help="directorio de salida")
+    p.add_argument("--format", choices=("png", "jpeg", "webp", "tiff"), default="png")
+    p.add_argument("--dpi", type=int, default=150, help="resolución (por defecto 150 ppp)")
+    p.add_argument("--quality", type=int, default=85, help="calidad de JPEG y WebP (1-100)")
+    pages_arg(p)
+    p.add_argument("-j", "--jobs", type=int, default=None, help="procesos en paralelo")
+
+    p = command("search", "buscar texto en PDFs (con el mismo índice que la interfaz)")
+    p.add_argument("query", help="texto a buscar (la última palabra puede estar incompleta)")
+    p.add_argument("inputs", nargs="+", help="PDFs en los que buscar")
+    p.add_argument("--max-hits", type=int, default=100, help="aciertos como máximo")
+    p.add_argument("--no-cache", action="store_true", help="no usar ni guardar el índice en disco")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="procesos para extraer el texto")
+    p.add_argument("--json", action="store_true", help="resultado en JSON")
+
+    p = sub.add_parser("bookmarks", help="exportar o importar marcadores")
+    bsub = p.add_subparsers(dest="action", required=True)
+    p = command("export", "exportar los marcadores a JSON", bsub)
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("-o", "--output", default=None,
+                   help="JSON de salida (una entrada) o directorio; por defecto, la salida estándar")
+    p.add_argument("-j", "--jobs", type=int, default=None)
+    p = command("import", "sustituir los marcadores por los de un JSON", bsub)
+    p.add_argument("inputs", nargs="+")
+    p.add_argument("--toc", required=True, help="JSON con una lista de [nivel, título, página]")
+    p.add_argument("-o", "--output", required=True)
+    p.add_argument("-j", "--jobs", type=int, default=None)
+
+    return parser
+
+
+def run(argv=None):
+    """Ejecuta la línea de comandos. Retorna el código de salida"""
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if getattr(args, "verbose", False) else logging.WARNING,
+                        format="%(levelname)s: %(message)s")
+
+    trace_path = getattr(args, "trace", None)
+    if trace_path:
+        tracer.start()
+    if getattr(args, "tracemalloc", False):
+        memory.start_tracemalloc()
+
+    try:
+        with tracer.span(f"cli.{args.command}"):
+            return _dispatch(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if memory.tracemalloc_enabled:
+            print(format_memory_report(memory.report()), file=sys.stderr)
+            memory.stop_tracemalloc()
+        if trace_path:
+            tracer.stop()
+            count = tracer.export(trace_path)
+            logging.info("Traza con %d operaciones guardada en %s", count, trace_path)
+
+
+def _dispatch(args):
+    if args.command in COMBINE_COMMANDS:
+        return COMBINE_COMMANDS[args.command](args)
+    if args.command == "run":
+        return _run_job_file(args)
+    if args.command == "watch":
+        return _watch(args)
+    if args.command == "serve":
+        return _serve(args)
+    if args.command == "startup":
+        return _startup(args)
+    if args.command == "bench":
+        return _bench(args)
+    if args.command == "search":
+        return _search(args)
+    if args.command == "split":
+        return _split(args)
+    if args.command == "export-images":
+        return _export_images(args)
+    if args.command == "bookmarks":
+        operation = f"bookmarks-{args.action}"
+        extension = ".json" if args.action == "export" else ".pdf"
+    else:
+        operation, extension = args.command, ".pdf"
+    return _run_batch(operation, args, extension)
+
+
+def _run_batch(operation, args, extension):
+    failed = 0
+    for result in run_per_file(operation, args.inputs, args.output, args,
+                               jobs=args.jobs, extension=extension):
+        if result['ok']:
+            logging.info("%s -> %s (%.2f s)", result['input'],
+                         result['output'] or "stdout", result['seconds'])
+        else:
+            failed += 1
+            print(f"error: {result['input']}: {result.get('error', 'no se pudo guardar')}",
+                  file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _run_job_file(args):
+    from cli.pipeline import run_pipeline
+
+    def progress(result, finished, total):
+        if result['status'] != 'done':
+            print(f"error: {result['output']}: {result.get('error')}", file=sys.stderr)
+        logging.info("[%d/%d] %s %s (%.2f s)", finished, total, result['status'],
+                     result['output'], result.get('seconds', 0))
+
+    summary = run_pipeline(args.job_file, workers=args.jobs, restart=args.restart,
+                           summary_path=args.summary, progress=progress)
+    jobs = summary['jobs']
+    print(f"{jobs['done']} hechos, {jobs['failed']} fallidos, {jobs['skipped']} ya hechos "
+          f"({summary['pages']} páginas en {summary['wall_seconds']} s). "
+          f"Resumen: {summary['summary_path']}")
+    return 1 if jobs['failed'] else 0
+
+
+def _watch(args):
+    from cli.watch import WatchService
+
+    service = WatchService(args.folder, args.output, spec_path=args.config, workers=args.jobs,
+                           settle=args.settle, poll=args.poll, poll_interval=args.poll_interval,
+                           metrics_path=args.metrics)
+    print(f"Vigilando {service.watcher.root} (Ctrl+C para terminar)", file=sys.stderr)
+    service.run()
+    metrics = service.metrics
+    print(f"{metrics.processed} lotes procesados, {metrics.failed} fallidos", file=sys.stderr)
+    return 0
+
+
+def _serve(args):
+    from cli.server import serve
+
+    def ready(server):
+        host, port = server.server_address[:2]
+        print(f"Escuchando en http://{host}:{port} (Ctrl+C para terminar)", file=sys.stderr)
+
+    serve(args.host, args.port, workers=args.jobs, max_jobs=args.max_jobs,
+          max_upload_mb=args.max_upload_mb, ready=ready)
+    return 0
+
+
+def _startup(args):
+    import json
+    from cli.startup import format_report, measure_startup
+
+    result = measure_startup(max(1, args.runs), args.open)
+    print(json.dumps(result, indent=2) if args.json else format_report(result))
+    return 0 if result['first_window_seconds'] else 1
+
+
+def _bench(args):
+    from cli import benchmark
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in benchmark.KINDS]
+    if unknown:
+        raise ValueError(f"tipo de documento desconocido: {', '.join(unknown)}")
+    baseline = benchmark.load_results(args.baseline) if args.baseline else None
+
+    def progress(key, result):
+        logging.info("%s: %.2f ms", key, result['median'] * 1000)
+
+    results = benchmark.run_benchmarks(sizes, kinds, max(1, args.repeat), args.corpus,
+                                       args.filter, progress)
+    if args.output:
+        benchmark.write_results(results, args.output)
+    if baseline is None:
+        print(benchmark.format_results(results))
+        return 0
+
+    rows = benchmark.compare(results, baseline, args.threshold)
+    print(benchmark.format_comparison(rows, results, baseline))
+    return 1 if any(row['status'] == 'regression' for row in rows) else 0
+
+
+def _split(args):
+    import time
+    import fitz  # PyMuPDF
+    from cli.commands import parse_pages
+    from logic import split
+
+    if not os.path.isfile(args.input):
+        raise OSError(f"no existe: {args.input}")
+    with fitz.open(args.input) as doc:
+        page_count = len(doc)
+        toc = doc.get_toc()
+
+    start = time.perf_counter()
+    if args.every:
+        parts = split.plan_every(page_count, args.every)
+    elif args.bookmarks:
+        parts = split.plan_by_bookmarks(toc, page_count)
+    elif args.ranges:
+        parts = split.plan_ranges([parse_pages(spec, page_count) for spec in args.ranges])
+    else:
+        parts = split.plan_by_separators(page_count, split.detect_separators(args.input, jobs=args.jobs))
+    tasks = split.build_tasks(args.input, parts, args.output, toc)
+
+    failed = 0
+    for result in split.split_document(tasks, args.jobs):
+        if result['ok']:
+            logging.info("%s (%d páginas, %.2f s)", result['output'], result['pages'], result['seconds'])
+        else:
+            failed += 1
+            print(f"error: {result['output']}: {result['error']}", file=sys.stderr)
+    print(f"{len(tasks) - failed} partes en {args.output} ({time.perf_counter() - start:.2f} s)")
+    return 1 if failed or not tasks else 0
+
+
+def _export_images(args):
+    import time
+    import fitz  # PyMuPDF
+    from cli.commands import parse_pages
+    from logic import page_export
+
+    if not os.path.isfile(args.input):
+        raise OSError(f"no existe: {args.input}")
+    with fitz.open(args.input) as doc:
+        page_count = len(doc)
+
+    start = time.perf_counter()
+    tasks = page_export.build_tasks(args.input, parse_pages(args.pages, page_count), args.output,
+                                    image_format=args.format, dpi=args.dpi, quality=args.quality)
+    failed = 0
+    total_bytes = 0
+    for result in page_export.export_pages(tasks, args.jobs):
+        if result['ok']:
+            total_bytes += result['bytes']
+            logging.info("%s (%.2f s)", result['output'], result['seconds'])
+        else:
+            failed += 1
+            print(f"error: {result['output']}: {result['error']}", file=sys.stderr)
+    print(f"{len(tasks) - failed} imágenes en {args.output} "
+          f"({total_bytes / 1048576:.1f} MB, {time.perf_counter() - start:.2f} s)")
+    return 1 if failed or not tasks else 0
+
+
+def _search(args):
+    import json
+    import time
+    import fitz  # PyMuPDF
+    from logic.search import IndexBuilder, IndexStore, SearchIndex
+
+    missing = [p for p in args.inputs if not os.path.isfile(p)]
+    if missing:
+        raise OSError(f"no existe: {', '.join(missing)}")
+
+    # Los archivos se indexan uno tras otro, como si estuvieran fusionados
+    index = SearchIndex()
+    builder = IndexBuilder(index, None if args.no_cache else IndexStore(), workers=args.jobs)
+    starts = []
+    try:
+        start = time.perf_counter()
+        for path in args.inputs:
+            with fitz.open(path) as doc:
+                count = len(doc)
+            starts.append((index.page_count, path))
+            builder.index_file(path, index.page_count, count)
+        builder.wait()
+        logging.info("Índice de %d páginas en %.2f s", index.page_count, time.perf_counter() - start)
+    finally:
+        builder.shutdown()
+
+    start = time.perf_counter()
+    hits = index.search(args.query, max(1, args.max_hits))
+    logging.info("%d aciertos en %.2f ms", len(hits), (time.perf_counter() - start) * 1000)
+
+    for hit in hits:
+        offset, path = next(item for item in reversed(starts) if item[0] <= hit['page'])
+        hit['file'] = path
+        hit['page'] = hit['page'] - offset + 1
+    if args.json:
+        print(json.dumps(hits, indent=2, ensure_ascii=False))
+    else:
+        for hit in hits:
+            rects = "; ".join(",".join(f"{v:g}" for v in rect) for rect in hit['rects'])
+            print(f"{hit['file']}:{hit['page']}: {hit['text']}  [{rects}]")
+    return 0 if hits else 1
+
+
+# =============================================================================
+# OPERACIONES QUE COMBINAN VARIAS ENTRADAS
+# =============================================================================
+
+def _combine(args, add):
+    output = resolve_output("combined", args.output, False)
+    session = PDFSession()
+    try:
+        added = add(session)
+        if not session.page_count:
+            print("error: no se pudo añadir ninguna entrada", file=sys.stderr)
+            return 1
+        if added < len(args.inputs):
+            print(f"aviso: solo se añadieron {added} de {len(args.inputs)} entradas", file=sys.stderr)
+        return 0 if session.save(output) else 1
+    finally:
+        session.close()
+
+
+def _merge(args):
+    def add(session):
+        session.open(args.inputs[0])
+        return 1 + session.merge(args.inputs[1:])
+    return _combine(args, add)
+
+
+def _images_to_pdf(args):
+    def add(session):
+        missing = [p for p in args.inputs if not os.path.isfile(p)]
+        if missing:
+            raise OSError(f"no existe: {', '.join(missing)}")
+        return session.add_images(args.inputs, args.max_dpi)
+    return _combine(args, add)
+
+
+def _docs_to_pdf(args):
+    return _combine(args, lambda session: session.add_documents(args.inputs))
+
+
+COMBINE_COMMANDS = {
+    'merge': _merge,
+    'images-to-pdf': _images_to_pdf,
+    'docs-to-pdf': _docs_to_pdf,
+}
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,513 @@
+"""
+Ejecución de trabajos descritos en un archivo JSON o TOML.
+
+Un archivo de trabajo describe una vez el proceso (entradas -> fusión ->
+tamaño de página -> blanco y negro -> marcadores -> perfil de guardado) y se
+ejecuta sobre miles de documentos con un pool de procesos. Ejemplo en JSON:
+
+    {
+        "name": "facturas",
+        "inputs": {"glob": "entrada/*.pdf", "output_dir": "salida"},
+        "pipeline": {
+            "normalize": {"size": "A4"},
+            "grayscale": true,
+            "bookmarks": {"mode": "filenames"},
+            "save": {"profile": "compact"}
+        },
+        "limits": {"timeout": 300, "max_memory_mb": 2048, "max_pages": 5000},
+        "workers": 4
+    }
+
+Las entradas se indican de dos formas:
+- "inputs": {"glob": ..., "output_dir": ...} crea un trabajo por archivo;
+  con "output" en lugar de "output_dir", fusiona todos en un solo PDF.
+- "jobs": [{"inputs": [...], "output": ...}, ...] lista los trabajos.
+Cada trabajo fusiona sus entradas en orden; pueden ser PDFs, imágenes o
+documentos de oficina. Las rutas relativas parten del directorio del archivo.
+
+Los trabajos terminados se anotan en un registro (checkpoint) para que una
+ejecución interrumpida continúe donde se quedó, y al final se escribe un
+resumen JSON con los tiempos de cada etapa.
+"""
+import glob
+import hashlib
+import json
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from logic.session import PDFSession
+from logic.workers import default_workers
+
+# Tamaños de página conocidos (en puntos)
+PAGE_SIZES = {
+    'A3': (842, 1191),
+    'A4': (595, 842),
+    'A5': (420, 595),
+    'LETTER': (612, 792),
+    'LEGAL': (612, 1008),
+}
+
+# Perfiles de guardado: opciones de Document.save
+SAVE_PROFILES = {
+    'default': {},
+    'compact': {'garbage': 4, 'clean': True, 'deflate_images': True, 'deflate_fonts': True},
+    'archive': {'garbage': 3, 'deflate_images': True, 'deflate_fonts': True},
+}
+SAVE_OPTIONS = ('garbage', 'clean', 'deflate', 'deflate_images', 'deflate_fonts',
+                'expand', 'pretty', 'ascii', 'no_new_id')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+DOCUMENT_EXTENSIONS = ('.doc', '.docx', '.odt', '.rtf')
+
+# Orden de las etapas en el resumen
+STAGES = ('load', 'normalize', 'grayscale', 'bookmarks', 'render', 'save')
+
+
+class JobTimeout(Exception):
+    pass
+
+
+# =============================================================================
+# LECTURA DEL ARCHIVO DE TRABAJO
+# =============================================================================
+
+def load_spec(path):
+    """Lee un archivo de trabajo JSON o TOML"""
+    if path.lower().endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("Para leer TOML se necesita Python 3.11 o el paquete tomli")
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+
+    spec['base_dir'] = os.path.dirname(os.path.abspath(path))
+    spec.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+    spec.setdefault('pipeline', {})
+    spec.setdefault('limits', {})
+    return spec
+
+
+def expand_jobs(spec):
+    """
+    Construye la lista de trabajos del archivo.
+    Cada trabajo es un dict con 'id', 'inputs' y 'output'.
+    """
+    base_dir = spec['base_dir']
+
+    def resolve(path):
+        return os.path.normpath(os.path.join(base_dir, os.path.expanduser(path)))
+
+    jobs = []
+    for job in spec.get('jobs', []):
+        jobs.append({
+            'inputs': [resolve(p) for p in job['inputs']],
+            'output': resolve(job['output']),
+        })
+
+    source = spec.get('inputs')
+    if source:
+        patterns = source['glob'] if isinstance(source['glob'], list) else [source['glob']]
+        paths = []
+        for pattern in patterns:
+            paths.extend(sorted(glob.glob(resolve(pattern), recursive=True)))
+
+        if 'output' in source:
+            jobs.append({'inputs': paths, 'output': resolve(source['output'])})
+        else:
+            output_dir = resolve(source.get('output_dir', "."))
+            for path in paths:
+                name = os.path.splitext(os.path.basename(path))[0] + ".pdf"
+                jobs.append({'inputs': [path], 'output': os.path.join(output_dir, name)})
+
+    # El id depende de las entradas, la salida y las etapas: si cambia el
+    # proceso, los trabajos ya hechos se repiten
+    pipeline_key = json.dumps(spec['pipeline'], sort_keys=True)
+    for job in jobs:
+        key = json.dumps([job['inputs'], job['output'], pipeline_key])
+        job['id'] = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return jobs
+
+
+def parse_page_size(options):
+    """Tamaño destino de la etapa normalize: {"size": "A4"} o {"width", "height"}"""
+    if 'size' in options:
+        name = options['size'].upper()
+        if name not in PAGE_SIZES:
+            raise ValueError(f"Tamaño de página desconocido: {options['size']}")
+        width, height = PAGE_SIZES[name]
+    else:
+        width, height = float(options['width']), float(options['height'])
+    if options.get('landscape'):
+        width, height = height, width
+    return width, height
+
+
+def save_options(options):
+    """Opciones de guardado de la etapa save (perfil y opciones sueltas)"""
+    profile = options.get('profile', 'default')
+    if profile not in SAVE_PROFILES:
+        raise ValueError(f"Perfil de guardado desconocido: {profile}")
+    result = dict(SAVE_PROFILES[profile])
+    result.update({k: v for k, v in options.items() if k in SAVE_OPTIONS})
+    return result
+
+
+# =============================================================================
+# EJECUCIÓN DE UN TRABAJO (en un proceso trabajador)
+# =============================================================================
+
+def _init_worker(limits):
+    """Aplica a cada proceso trabajador el límite de memoria"""
+    # Ctrl+C lo gestiona el proceso principal, que espera a los trabajos en curso
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    max_memory_mb = limits.get('max_memory_mb')
+    if not max_memory_mb:
+        return
+    try:
+        import resource
+    except ImportError:  # Windows: sin límite de memoria
+        return
+    limit = int(max_memory_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _on_timeout(signum, frame):
+    raise JobTimeout()
+
+
+def run_job(job, pipeline, limits):
+    """
+    Ejecuta un trabajo completo y retorna un dict serializable con el
+    resultado y el tiempo de cada etapa.
+    """
+    result = {'id': job['id'], 'output': job['output'], 'status': 'failed', 'stages': {}}
+    start = time.perf_counter()
+
+    timeout = limits.get('timeout')
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.alarm(int(timeout))
+
+    session = PDFSession()
+    try:
+        _run_stages(session, job, pipeline, limits, result['stages'])
+        result['status'] = 'done'
+        result['pages'] = session.page_count
+    except JobTimeout:
+        result['error'] = f"tiempo límite superado ({timeout} s)"
+    except MemoryError:
+        result['error'] = "límite de memoria superado"
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+        session.close()
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _run_stages(session, job, pipeline, limits, timings):
+    def timed(stage, fn, *args):
+        stage_start = time.perf_counter()
+        value = fn(*args)
+        timings[stage] = time.perf_counter() - stage_start
+        return value
+
+    segments = timed('load', _load_inputs, session, job['inputs'])
+    if not session.page_count:
+        raise ValueError("ninguna entrada se pudo cargar")
+
+    max_pages = limits.get('max_pages')
+    if max_pages and session.page_count > max_pages:
+        raise ValueError(f"{session.page_count} páginas superan el límite de {max_pages}")
+
+    if pipeline.get('normalize'):
+        width, height = parse_page_size(pipeline['normalize'])
+        timed('normalize', session.normalize_size, session.all_pages(), width, height)
+
+    if pipeline.get('grayscale'):
+        timed('grayscale', session.grayscale, session.all_pages())
+
+    bookmarks = pipeline.get('bookmarks')
+    if bookmarks:
+        timed('bookmarks', _apply_bookmarks, session, bookmarks, segments)
+
+    # Las transformaciones se marcan en sus etapas pero se aplican aquí
+    timed('render', session.apply_changes)
+
+    os.makedirs(os.path.dirname(job['output']) or ".", exist_ok=True)
+    options = save_options(pipeline.get('save', {}))
+    if not timed('save', session.save, job['output'], options):
+        raise OSError(f"no se pudo guardar {job['output']}")
+
+
+def _input_kind(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    if ext in DOCUMENT_EXTENSIONS:
+        return 'document'
+    return 'pdf'
+
+
+def _load_inputs(session, inputs):
+    """
+    Carga las entradas en orden. Las imágenes y documentos consecutivos se
+    añaden juntos para aprovechar la conversión en paralelo.
+    Retorna (título, primera página, última página) de cada entrada (1-based).
+    """
+    segments = []
+    index = 0
+    while index < len(inputs):
+        kind = _input_kind(inputs[index])
+        group_end = index + 1
+        if kind != 'pdf':
+            while group_end < len(inputs) and _input_kind(inputs[group_end]) == kind:
+                group_end += 1
+        group = inputs[index:group_end]
+
+        first_page = session.page_count + 1
+        if kind == 'image':
+            session.add_images(group)
+        elif kind == 'document':
+            session.add_documents(group)
+        elif session.doc is None:
+            session.open(group[0])
+        else:
+            session.merge(group)
+
+        # Un grupo de imágenes o documentos se marca con su primer archivo
+        title = os.path.splitext(os.path.basename(group[0]))[0]
+        if session.page_count >= first_page:
+            segments.append((title, first_page, session.page_count))
+        index = group_end
+    return segments
+
+
+def _apply_bookmarks(session, options, segments):
+    """
+    Etapa de marcadores:
+    - "keep": conserva los marcadores de las entradas (por defecto).
+    - "none": elimina todos.
+    - "filenames": un marcador por entrada con los suyos anidados debajo.
+    - "file": sustituye los marcadores por los de un JSON [nivel, título, página].
+    """
+    mode = options.get('mode', 'keep')
+    toc = session.bookmark_manager.get_toc()
+
+    if mode == 'none':
+        session.set_bookmarks([])
+    elif mode == 'filenames':
+        new_toc = []
+        for title, first_page, last_page in segments:
+            new_toc.append([1, title, first_page])
+            new_toc.extend([entry[0] + 1, entry[1], entry[2]] for entry in toc
+                           if first_page <= entry[2] <= last_page)
+        session.set_bookmarks(new_toc)
+    elif mode == 'file':
+        from cli.commands import load_toc
+        session.set_bookmarks(load_toc(options['toc']))
+    elif mode != 'keep':
+        raise ValueError(f"Modo de marcadores desconocido: {mode}")
+
+
+# =============================================================================
+# REGISTRO DE PROGRESO Y RESUMEN
+# =============================================================================
+
+class CheckpointLog:
+    """
+    Registro JSONL de trabajos terminados. Se añade una línea por trabajo
+    en cuanto termina, así que sobrevive a una interrupción.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = {}
+        self._file = None
+
+    def load(self):
+        """Lee los trabajos ya terminados (el último registro de cada id manda)"""
+        self.completed = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Línea a medio escribir al interrumpirse
+                    if record.get('status') == 'done':
+                        self.completed[record['id']] = record
+                    else:
+                        self.completed.pop(record.get('id'), None)
+        except OSError:
+            pass
+
+    def is_done(self, job):
+        return job['id'] in self.completed and os.path.exists(job['output'])
+
+    def record(self, result):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+
+
+def _stage_stats(values):
+    values = sorted(values)
+    count = len(values)
+    return {
+        'count': count,
+        'total': round(sum(values), 4),
+        'mean': round(sum(values) / count, 4),
+        'p50': round(values[count // 2], 4),
+        'p95': round(values[min(count - 1, int(count * 0.95))], 4),
+        'max': round(values[-1], 4),
+    }
+
+
+def build_summary(name, results, skipped, wall_seconds):
+    """Resumen JSON de una ejecución con estadísticas por etapa"""
+    stage_times = {}
+    for result in results:
+        for stage, seconds in result['stages'].items():
+            stage_times.setdefault(stage, []).append(seconds)
+
+    done = [r for r in results if r['status'] == 'done']
+    failed = [r for r in results if r['status'] != 'done']
+    pages = sum(r.get('pages', 0) for r in done)
+
+    return {
+        'name': name,
+        'jobs': {
+            'total': len(results) + skipped,
+            'done': len(done),
+            'failed': len(failed),
+            'skipped': skipped,
+        },
+        'pages': pages,
+        'wall_seconds': round(wall_seconds, 3),
+        'pages_per_second': round(pages / wall_seconds, 2) if wall_seconds else 0,
+        'stages': {stage: _stage_stats(stage_times[stage])
+                   for stage in STAGES if stage in stage_times},
+        'failures': [{'output': r['output'], 'error': r.get('error')} for r in failed[:100]],
+    }
+
+
+# =============================================================================
+# EJECUCIÓN DEL ARCHIVO COMPLETO
+# =============================================================================
+
+def run_pipeline(spec_path, workers=None, restart=False, summary_path=None, progress=None):
+    """
+    Ejecuta un archivo de trabajo. Los trabajos se reparten entre un pool de
+    procesos con un número limitado de trabajos en curso.
+    progress(result, finished, total) se llama al terminar cada trabajo.
+    Retorna el resumen.
+    """
+    spec = load_spec(spec_path)
+    jobs = expand_jobs(spec)
+    pipeline, limits = spec['pipeline'], spec['limits']
+
+    # Validar las opciones antes de lanzar ningún proceso
+    if pipeline.get('normalize'):
+        parse_page_size(pipeline['normalize'])
+    save_options(pipeline.get('save', {}))
+
+    base_name = os.path.splitext(spec_path)[0]
+    checkpoint = CheckpointLog(_resolve(spec, spec.get('checkpoint'), base_name + ".checkpoint.jsonl"))
+    summary_path = summary_path or _resolve(spec, spec.get('summary'), base_name + ".summary.json")
+
+    if restart:
+        checkpoint.clear()
+    checkpoint.load()
+    pending = [job for job in jobs if not checkpoint.is_done(job)]
+    skipped = len(jobs) - len(pending)
+
+    workers = workers or spec.get('workers') or default_workers(limit=os.cpu_count() or 1)
+    start = time.perf_counter()
+    results = []
+    try:
+        for result in _run_pool(pending, pipeline, limits, workers):
+            checkpoint.record(result)
+            results.append(result)
+            if progress:
+                progress(result, len(results), len(pending))
+    finally:
+        checkpoint.close()
+
+    summary = build_summary(spec['name'], results, skipped, time.perf_counter() - start)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    summary['summary_path'] = summary_path
+    return summary
+
+
+def _resolve(spec, path, default):
+    return os.path.join(spec['base_dir'], path) if path else default
+
+
+def _run_pool(jobs, pipeline, limits, workers):
+    """
+    Produce los resultados según terminan. Como mucho hay 2 trabajos en curso
+    por proceso, así que la memoria no crece con el número de trabajos.
+    Si un proceso muere (p. ej. lo mata el sistema por memoria), sus trabajos
+    se marcan como fallidos y se crea un pool nuevo para el resto.
+    """
+    queue = list(reversed(jobs))
+    max_in_flight = workers * 2
+
+    while queue:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(limits,))
+        in_flight = {}
+        broken = False
+        try:
+            while queue or in_flight:
+                while queue and len(in_flight) < max_in_flight and not broken:
+                    job = queue.pop()
+                    in_flight[executor.submit(run_job, job, pipeline, limits)] = job
+
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = in_flight.pop(future)
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        yield {'id': job['id'], 'output': job['output'], 'status': 'failed',
+                               'stages': {}, 'error': "el proceso trabajador terminó inesperadamente"}
+                if broken and not in_flight:
+                    break
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
@@ -0,0 +1,585 @@
+"""
+Servicio HTTP local para que otras herramientas usen easyPDF sin lanzar
+un proceso por operación.
+
+Endpoints (todas las páginas son 1-based):
+    GET    /health                      estado del servicio
+    POST   /uploads                     sube un archivo (cuerpo = archivo) -> {"id": ...}
+    DELETE /uploads/<id>                elimina un archivo subido
+    POST   /merge                       JSON {"files": [ids], "bookmarks": "keep"|"filenames",
+                                             "titles": [...]} -> PDF
+    POST   /reorder?order=3,1,2         cuerpo = PDF (o ?file=<id>) -> PDF; también &reverse=1
+    POST   /transform?rotate=left&scale=0.5&margins=20&grayscale=1&pages=1-3 -> PDF
+    POST   /render?page=1&dpi=150       -> PNG de la página
+    POST   /thumbnail?page=1&size=200   -> PNG con el lado mayor de size píxeles
+
+Los cuerpos se leen y se envían por bloques a través de archivos temporales,
+así que el tamaño de los PDFs no afecta a la memoria del servidor. El trabajo
+se hace en un pool de procesos que se arranca al iniciar el servicio y se
+mantiene caliente (fitz ya importado); si un trabajo supera el tiempo límite,
+el pool se sustituye por otro y sus procesos se terminan. Solo escucha en
+localhost por defecto.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cli.commands import parse_order, parse_pages
+from logic.workers import default_workers
+
+CHUNK_SIZE = 256 * 1024
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_UPLOAD_MB = 200
+
+# Segundos que una petición espera un hueco antes de responder 503
+QUEUE_TIMEOUT = 30
+
+# Segundos que se conservan los archivos subidos
+UPLOAD_TTL = 600
+
+# Extensiones que se aceptan para los archivos subidos (?suffix=)
+UPLOAD_SUFFIX = re.compile(r"^\.[A-Za-z0-9]{1,8}$")
+
+
+class ServiceError(Exception):
+    """Error que se devuelve al cliente con un código HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# =============================================================================
+# TRABAJOS (se ejecutan en los procesos del pool)
+# =============================================================================
+
+def _init_service_worker():
+    """Importa fitz y la sesión al arrancar cada proceso, no en la primera petición"""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import fitz  # noqa: F401
+    import logic.session  # noqa: F401
+
+
+def _warm_up(_):
+    return os.getpid()
+
+
+def _open_session(path):
+    from logic.session import PDFSession
+    return PDFSession().open(path)
+
+
+def _save_session(session, out_path):
+    if not session.save(out_path):
+        raise ValueError("no se pudo guardar el PDF")
+    return {'pages': session.page_count}
+
+
+def job_merge(paths, out_path, bookmarks="keep", titles=None):
+    from logic.session import PDFSession
+    session = PDFSession()
+    try:
+        segments = []
+        for path in paths:
+            first_page = session.page_count + 1
+            if session.doc is None:
+                session.open(path)
+            elif not session.merge([path]):
+                raise ValueError(f"no se pudo fusionar {os.path.basename(path)}")
+            segments.append(first_page)
+
+        if bookmarks == "filenames":
+            toc = session.bookmark_manager.get_toc()
+            new_toc = []
+            for index, first_page in enumerate(segments):
+                last_page = segments[index + 1] - 1 if index + 1 < len(segments) else session.page_count
+                title = titles[index] if titles and index < len(titles) else f"Documento {index + 1}"
+                new_toc.append([1, str(title), first_page])
+                new_toc.extend([lvl + 1, text, page] for lvl, text, page, *_ in toc
+                               if first_page <= page <= last_page)
+            session.set_bookmarks(new_toc)
+        return _save_session(session, out_path)
+    finally:
+        session.close()
+
+
+def job_reorder(path, out_path, order=None, reverse=False):
+    session = _open_session(path)
+    try:
+        session.reorder(parse_order(order, session.page_count, reverse))
+        return _save_session(session, out_path)
+    finally:
+        session.close()
+
+
+def job_transform(path, out_path, params):
+    session = _open_session(path)
+    try:
+        pages = parse_pages(params.get('pages'), session.page_count)
+        if params.get('rotate'):
+            session.rotate(pages, params['rotate'])
+        if params.get('scale'):
+            session.scale(pages, float(params['scale']))
+        if params.get('margins'):
+            margin = float(params['margins'])
+            session.margins(pages, margin, margin, margin, margin)
+        if params.get('grayscale') in ("1", "true", "yes"):
+            session.grayscale(pages)
+        return _save_session(session, out_path)
+    finally:
+        session.close()
+
+
+def job_render(path, out_path, page=1, dpi=150.0, max_side=None):
+    import fitz
+    doc = fitz.open(path)
+    try:
+        if not 1 <= page <= len(doc):
+            raise ValueError(f"la página {page} no existe (el documento tiene {len(doc)})")
+        rect = doc[page - 1].rect
+        scale = max_side / max(rect.width, rect.height) if max_side else dpi / 72.0
+        pix = doc[page - 1].get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+        pix.save(out_path, output="png")
+        return {'width': pix.width, 'height': pix.height}
+    finally:
+        doc.close()
+
+
+# =============================================================================
+# SERVICIO
+# =============================================================================
+
+class PDFService:
+    """
+    Estado compartido por las peticiones: el pool de procesos, los huecos
+    para trabajos simultáneos y los archivos subidos.
+    """
+
+    def __init__(self, workers=None, max_jobs=None, max_upload_bytes=None, job_timeout=300):
+        self.workers = workers or default_workers(limit=os.cpu_count() or 1)
+        self.max_jobs = max_jobs or self.workers * 2
+        self.max_upload_bytes = max_upload_bytes or DEFAULT_MAX_UPLOAD_MB * 1024 * 1024
+        self.job_timeout = job_timeout
+
+        self.executor = self._start_pool()
+        self.temp_dir = tempfile.mkdtemp(prefix="easypdf-http-")
+
+        self._slots = threading.BoundedSemaphore(self.max_jobs)
+        self._running = 0
+        self._uploads = {}  # id -> (ruta, momento de subida)
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+
+    def _start_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_service_worker)
+        # Arrancar todos los procesos ya, para que la primera petición no espere
+        list(executor.map(_warm_up, range(self.workers)))
+        return executor
+
+    def _replace_pool(self, old):
+        """
+        Sustituye el pool old (con un trabajo colgado o un proceso caído) por
+        uno nuevo y termina sus procesos. Future.cancel() no detiene un
+        trabajo que ya se está ejecutando, y matar un solo proceso rompe el
+        pool entero, así que se cambia completo. Los demás trabajos que
+        estaban en old fallan o se cancelan y run() los repite.
+        """
+        with self._pool_lock:
+            if self.executor is not old:
+                return  # Otro hilo ya lo sustituyó
+            self.executor = self._start_pool()
+        # ProcessPoolExecutor no permite terminar sus procesos (hasta Python
+        # 3.14); se usan los que guarda en _processes
+        processes = list((getattr(old, "_processes", None) or {}).values())
+        old.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+        for process in processes:
+            process.join()
+
+    def _submit(self, fn, args):
+        """(pool, future) del trabajo en el pool actual"""
+        while True:
+            executor = self.executor
+            try:
+                return executor, executor.submit(fn, *args)
+            except RuntimeError:
+                # Pool roto o cerrado mientras se sustituía: usar el nuevo
+                if executor is self.executor:
+                    raise
+
+    # -------------------------------------------------------------------------
+    # Archivos temporales y subidas
+    # -------------------------------------------------------------------------
+
+    def temp_path(self, suffix):
+        return os.path.join(self.temp_dir, uuid.uuid4().hex + suffix)
+
+    def add_upload(self, path):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = (path, time.monotonic())
+        return upload_id
+
+    def get_upload(self, upload_id):
+        with self._lock:
+            entry = self._uploads.get(upload_id)
+        if not entry:
+            raise ServiceError(404, f"no existe el archivo subido {upload_id}")
+        return entry[0]
+
+    def remove_upload(self, upload_id):
+        with self._lock:
+            entry = self._uploads.pop(upload_id, None)
+        if entry:
+            _remove(entry[0])
+        return entry is not None
+
+    def expire_uploads(self):
+        limit = time.monotonic() - UPLOAD_TTL
+        with self._lock:
+            expired = [k for k, (_, created) in self._uploads.items() if created < limit]
+            paths = [self._uploads.pop(k)[0] for k in expired]
+        for path in paths:
+            _remove(path)
+
+    # -------------------------------------------------------------------------
+    # Trabajos
+    # -------------------------------------------------------------------------
+
+    @property
+    def running(self):
+        return self._running
+
+    def run(self, fn, *args):
+        """Ejecuta un trabajo en el pool respetando el máximo de trabajos simultáneos"""
+        if not self._slots.acquire(timeout=QUEUE_TIMEOUT):
+            raise ServiceError(503, "demasiados trabajos en curso, inténtalo más tarde")
+        with self._lock:
+            self._running += 1
+        try:
+            for attempt in range(2):
+                executor, future = self._submit(fn, args)
+                try:
+                    return future.result(timeout=self.job_timeout)
+                except FutureTimeoutError:
+                    # Si ya se está ejecutando no basta con cancelarlo, y el
+                    # hueco no se libera hasta que su proceso ha terminado
+                    if not future.cancel():
+                        self._replace_pool(executor)
+                    raise ServiceError(504, "el trabajo superó el tiempo límite")
+                except (BrokenProcessPool, CancelledError):
+                    # Se cayó un proceso o el pool se sustituyó por un trabajo
+                    # colgado (los que esperaban turno en él se cancelan): se
+                    # repite una vez en el pool nuevo
+                    self._replace_pool(executor)
+                    if attempt:
+                        raise ServiceError(503, "los procesos del servicio se reiniciaron, "
+                                                "inténtalo de nuevo")
+                except (ValueError, RuntimeError) as e:
+                    raise ServiceError(422, str(e))
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "easyPDF"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def handle_expect_100(self):
+        """Con "Expect: 100-continue" se rechaza una subida demasiado grande antes de recibirla"""
+        length = self.headers.get("Content-Length")
+        # Se ejecuta antes de _dispatch: los errores se responden aquí
+        try:
+            too_large = length is not None and int(length) > self.service.max_upload_bytes
+        except ValueError:
+            self.close_connection = True
+            self._send_json(400, {'error': f"Content-Length no válido: {length!r}"})
+            return False
+        if too_large:
+            self.close_connection = True
+            self._send_json(413, {'error': f"el cuerpo supera el máximo de "
+                                           f"{self.service.max_upload_bytes} bytes"})
+            return False
+        return super().handle_expect_100()
+
+    def log_message(self, format, *args):
+        import logging
+        logging.getLogger("easypdf").info("%s - %s", self.address_string(), format % args)
+
+    # -------------------------------------------------------------------------
+    # Enrutado
+    # -------------------------------------------------------------------------
+
+    def do_GET(self):
+        self._dispatch({'/health': self._health})
+
+    def do_POST(self):
+        self._dispatch({
+            '/uploads': self._upload,
+            '/merge': self._merge,
+            '/reorder': self._reorder,
+            '/transform': self._transform,
+            '/render': self._render,
+            '/thumbnail': self._thumbnail,
+        })
+
+    def do_DELETE(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/uploads/"):
+            self._dispatch({url.path: self._delete_upload})
+        else:
+            self._dispatch({})
+
+    def _dispatch(self, routes):
+        url = urlparse(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self._temp_files = []
+        self.service.expire_uploads()
+        try:
+            route = routes.get(url.path)
+            if route is None:
+                raise ServiceError(404, f"ruta desconocida: {url.path}")
+            route()
+        except ServiceError as e:
+            self._discard_body()
+            self._send_json(e.status, {'error': str(e)})
+        except (ValueError, KeyError) as e:
+            self._discard_body()
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            self._discard_body()
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+        finally:
+            for path in self._temp_files:
+                _remove(path)
+
+    # -------------------------------------------------------------------------
+    # Endpoints
+    # -------------------------------------------------------------------------
+
+    def _health(self):
+        self._send_json(200, {
+            'status': 'ok',
+            'workers': self.service.workers,
+            'running_jobs': self.service.running,
+            'max_jobs': self.service.max_jobs,
+        })
+
+    def _upload(self):
+        suffix = self.query.get('suffix', ".pdf")
+        if not UPLOAD_SUFFIX.match(suffix):
+            raise ServiceError(400, f"extensión no válida: {suffix!r} (p. ej. .pdf o .docx)")
+        path = self._receive_body(suffix, keep=True)
+        upload_id = self.service.add_upload(path)
+        self._send_json(201, {'id': upload_id, 'size': os.path.getsize(path)})
+
+    def _delete_upload(self):
+        upload_id = urlparse(self.path).path.rsplit("/", 1)[-1]
+        if not self.service.remove_upload(upload_id):
+            raise ServiceError(404, f"no existe el archivo subido {upload_id}")
+        self._send_json(200, {'deleted': upload_id})
+
+    def _merge(self):
+        request = json.loads(self._read_small_body() or b"{}")
+        files = request.get('files') or []
+        if len(files) < 1:
+            raise ServiceError(400, "se necesita al menos un archivo en 'files'")
+        paths = [self.service.get_upload(upload_id) for upload_id in files]
+        out_path = self._new_temp(".pdf")
+        result = self.service.run(job_merge, paths, out_path,
+                                  request.get('bookmarks', "keep"), request.get('titles'))
+        self._send_file(out_path, "application/pdf", result)
+
+    def _reorder(self):
+        out_path = self._new_temp(".pdf")
+        reverse = self.query.get('reverse') in ("1", "true", "yes")
+        result = self.service.run(job_reorder, self._input_pdf(), out_path,
+                                  self.query.get('order'), reverse)
+        self._send_file(out_path, "application/pdf", result)
+
+    def _transform(self):
+        out_path = self._new_temp(".pdf")
+        result = self.service.run(job_transform, self._input_pdf(), out_path, self.query)
+        self._send_file(out_path, "application/pdf", result)
+
+    def _render(self):
+        out_path = self._new_temp(".png")
+        page = int(self.query.get('page', 1))
+        dpi = float(self.query.get('dpi', 150))
+        if not dpi > 0:
+            raise ServiceError(400, f"dpi debe ser mayor que 0: {dpi}")
+        dpi = min(600.0, dpi)
+        result = self.service.run(job_render, self._input_pdf(), out_path, page, dpi)
+        self._send_file(out_path, "image/png", result)
+
+    def _thumbnail(self):
+        out_path = self._new_temp(".png")
+        page = int(self.query.get('page', 1))
+        size = int(self.query.get('size', 200))
+        if size <= 0:
+            raise ServiceError(400, f"size debe ser mayor que 0: {size}")
+        size = min(2000, size)
+        result = self.service.run(job_render, self._input_pdf(), out_path, page, None, size)
+        self._send_file(out_path, "image/png", result)
+
+    # -------------------------------------------------------------------------
+    # Cuerpos de petición y respuesta
+    # -------------------------------------------------------------------------
+
+    def _new_temp(self, suffix):
+        path = self.service.temp_path(suffix)
+        self._temp_files.append(path)
+        return path
+
+    def _input_pdf(self):
+        """El PDF de entrada: un archivo subido (?file=id) o el cuerpo de la petición"""
+        if 'file' in self.query:
+            return self.service.get_upload(self.query['file'])
+        return self._receive_body(".pdf")
+
+    def _receive_body(self, suffix, keep=False):
+        """Guarda el cuerpo en un archivo temporal, por bloques"""
+        path = self.service.temp_path(suffix)
+        if not keep:
+            self._temp_files.append(path)
+        try:
+            with open(path, "wb") as f:
+                for chunk in self._iter_body():
+                    f.write(chunk)
+        except ServiceError:
+            _remove(path)
+            raise
+        if os.path.getsize(path) == 0:
+            _remove(path)
+            raise ServiceError(400, "la petición no tiene cuerpo")
+        return path
+
+    def _read_small_body(self, limit=1024 * 1024):
+        return b"".join(self._iter_body(limit))
+
+    def _iter_body(self, limit=None):
+        """Lee el cuerpo (con Content-Length o chunked) sin pasar del límite"""
+        limit = limit or self.service.max_upload_bytes
+        self._body_consumed = True
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            received = 0
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # Trailers hasta la línea vacía
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                received += size
+                if received > limit:
+                    self.close_connection = True
+                    raise ServiceError(413, f"el cuerpo supera el máximo de {limit} bytes")
+                remaining = size
+                while remaining:
+                    chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ServiceError(400, "cuerpo incompleto")
+                    remaining -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise ServiceError(411, "falta Content-Length")
+        remaining = int(length)
+        if remaining > limit:
+            # No se lee el cuerpo: se cierra la conexión tras responder
+            self.close_connection = True
+            raise ServiceError(413, f"el cuerpo supera el máximo de {limit} bytes")
+        while remaining:
+            chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ServiceError(400, "cuerpo incompleto")
+            remaining -= len(chunk)
+            yield chunk
+
+    def _discard_body(self):
+        """Si una petición falla antes de leer el cuerpo, la conexión no se reutiliza"""
+        if not getattr(self, "_body_consumed", False) and (
+                self.headers.get("Content-Length") not in (None, "0")
+                or self.headers.get("Transfer-Encoding")):
+            self.close_connection = True
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path, content_type, info=None):
+        """Envía un archivo por bloques"""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        for key, value in (info or {}).items():
+            self.send_header(f"X-EasyPDF-{key.capitalize()}", str(value))
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+
+class PDFServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        self.service = service
+        super().__init__(address, RequestHandler)
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=None, max_jobs=None,
+          max_upload_mb=DEFAULT_MAX_UPLOAD_MB, ready=None):
+    """
+    Arranca el servicio y atiende peticiones hasta Ctrl+C.
+    ready(server) se llama cuando ya acepta conexiones.
+    """
+    service = PDFService(workers, max_jobs, int(max_upload_mb * 1024 * 1024))
+    server = PDFServer((host, port), service)
+    try:
+        if ready:
+            ready(server)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,178 @@
+"""
+Medición del arranque de la interfaz gráfica.
+
+Lanza `main.py` en un proceso nuevo (con `python -X importtime`) tantas
+veces como se indique y mide cuánto tarda en aparecer la ventana. Además
+resume el tiempo de importación de cada módulo de primer nivel. Si se indica
+un PDF, también lo abre y mide la primera página visible y la carga completa.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Variable de entorno con la que main.py avisa al mostrar la ventana
+STARTUP_PROBE_ENV = "EASYPDF_STARTUP_PROBE"
+STARTUP_OPEN_ENV = "EASYPDF_STARTUP_OPEN"
+FIRST_WINDOW_MARKER = "EASYPDF_FIRST_WINDOW"
+OPEN_METRICS_MARKER = "EASYPDF_OPEN_METRICS"
+
+STARTUP_TIMEOUT = 30
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def report_first_window(root, app):
+    """
+    Llamado por main.py dentro del proceso medido: escribe la marca cuando
+    la ventana ya se ha dibujado, abre el PDF indicado (si lo hay) y cierra
+    la aplicación.
+    """
+    open_path = os.environ.get(STARTUP_OPEN_ENV)
+
+    def on_loaded(event):
+        print(OPEN_METRICS_MARKER, json.dumps(app.open_metrics), flush=True)
+        root.after(0, root.destroy)
+
+    def on_map(event):
+        if event.widget is not root:
+            return
+        root.unbind("<Map>")
+        root.update_idletasks()
+        print(FIRST_WINDOW_MARKER, flush=True)
+        if open_path:
+            root.bind("<<DocumentLoaded>>", on_loaded)
+            root.after(0, app.open_pdf, open_path)
+        else:
+            root.after(0, root.destroy)
+
+    root.bind("<Map>", on_map)
+
+
+def parse_importtime(text):
+    """
+    Lee la salida de -X importtime.
+    Retorna {módulo: (propio_ms, acumulado_ms)} de los módulos de primer nivel
+    (los que importa directamente el programa, con sus dependencias dentro).
+    """
+    modules = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        # El nombre va sangrado dos espacios por nivel de anidamiento
+        name = parts[2].rstrip()
+        if name[1:2] == " ":
+            continue
+        modules[name.strip()] = (int(parts[0]) / 1000.0, int(parts[1]) / 1000.0)
+    return modules
+
+
+def measure_once(open_path=None):
+    """
+    Un arranque: retorna (segundos hasta la ventana o None, importaciones,
+    tiempos de apertura del PDF o None, error)
+    """
+    env = dict(os.environ)
+    env[STARTUP_PROBE_ENV] = "1"
+    if open_path:
+        env[STARTUP_OPEN_ENV] = os.path.abspath(open_path)
+
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", MAIN_SCRIPT],
+            stdout=subprocess.PIPE, stderr=stderr, env=env, text=True
+        )
+        first_window = None
+        open_metrics = None
+        try:
+            for line in process.stdout:
+                if line.strip() == FIRST_WINDOW_MARKER:
+                    first_window = time.perf_counter() - start
+                elif line.startswith(OPEN_METRICS_MARKER):
+                    open_metrics = json.loads(line[len(OPEN_METRICS_MARKER):])
+            process.wait(timeout=STARTUP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+        stderr.seek(0)
+        text = stderr.read()
+
+    error = None
+    if first_window is None:
+        # Sin pantalla (o si falla el arranque) solo hay tiempos de importación
+        lines = [l for l in text.splitlines() if not l.startswith("import time:")]
+        error = lines[-1] if lines else f"el proceso terminó con código {process.returncode}"
+    return first_window, parse_importtime(text), open_metrics, error
+
+
+def _summary(values):
+    values = sorted(values)
+    if not values:
+        return None
+    return {
+        'min': round(values[0], 3),
+        'median': round(values[len(values) // 2], 3),
+        'max': round(values[-1], 3),
+    }
+
+
+def measure_startup(runs=3, open_path=None):
+    """
+    Mide varios arranques. Retorna un dict con los tiempos hasta la primera
+    ventana, el tiempo medio de importación de cada módulo de primer nivel y,
+    si se indica open_path, los tiempos de apertura de ese PDF.
+    """
+    windows = []
+    imports = {}
+    opens = {}
+    error = None
+    for _ in range(runs):
+        first_window, modules, open_metrics, run_error = measure_once(open_path)
+        if first_window is not None:
+            windows.append(first_window)
+        for stage, seconds in (open_metrics or {}).items():
+            opens.setdefault(stage, []).append(seconds)
+        error = error or run_error
+        for name, (own, cumulative) in modules.items():
+            imports.setdefault(name, []).append(cumulative)
+
+    breakdown = sorted(((name, sum(v) / len(v)) for name, v in imports.items()),
+                       key=lambda item: item[1], reverse=True)
+    return {
+        'runs': runs,
+        'first_window_seconds': _summary(windows),
+        'open_seconds': {stage: _summary(values) for stage, values in opens.items()} or None,
+        'imports_ms': [{'module': name, 'cumulative': round(ms, 1)} for name, ms in breakdown],
+        'error': error if not windows else None,
+    }
+
+
+def format_report(result, top=15):
+    lines = []
+    window = result['first_window_seconds']
+    if window:
+        lines.append(f"Primera ventana ({result['runs']} arranques): "
+                     f"mediana {window['median'] * 1000:.0f} ms "
+                     f"(mín {window['min'] * 1000:.0f}, máx {window['max'] * 1000:.0f})")
+    else:
+        lines.append(f"No se pudo abrir la ventana: {result['error']}")
+
+    for stage, label in (('first_pixel', "Primera página visible"), ('outline', "Índice cargado"),
+                         ('fully_loaded', "Documento completo")):
+        times = (result.get('open_seconds') or {}).get(stage)
+        if times:
+            lines.append(f"{label}: mediana {times['median'] * 1000:.0f} ms "
+                         f"(mín {times['min'] * 1000:.0f}, máx {times['max'] * 1000:.0f})")
+
+    total = sum(entry['cumulative'] for entry in result['imports_ms'])
+    lines.append(f"Importaciones de primer nivel: {total:.0f} ms")
+    for entry in result['imports_ms'][:top]:
+        lines.append(f"  {entry['cumulative']:8.1f} ms  {entry['module']}")
+    return "\n".join(lines)
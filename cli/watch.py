@@ -0,0 +1,356 @@
+"""
+Modo vigilancia: procesa automáticamente lo que se deja en una carpeta.
+
+Cada elemento de la carpeta vigilada es un lote:
+- una subcarpeta se fusiona en un solo PDF (sus archivos en orden alfabético),
+- un archivo suelto se procesa por separado.
+Un lote se procesa cuando sus archivos dejan de cambiar durante unos
+segundos (la copia ha terminado), y se vuelve a procesar si cambia después.
+
+Los cambios se detectan con watchdog (inotify en Linux) si está instalado
+y, si no, revisando la carpeta periódicamente. En carpetas de red conviene
+forzar la revisión periódica (--poll), porque los eventos no siempre llegan.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from cli.pipeline import (DOCUMENT_EXTENSIONS, IMAGE_EXTENSIONS, CheckpointLog,
+                          _init_worker, load_spec, run_job, save_options)
+from logic.workers import default_workers
+
+# Proceso por defecto: fusionar, un marcador por archivo y guardado compacto
+DEFAULT_PIPELINE = {
+    'bookmarks': {'mode': 'filenames'},
+    'save': {'profile': 'compact'},
+}
+
+SUPPORTED_EXTENSIONS = ('.pdf',) + IMAGE_EXTENSIONS + DOCUMENT_EXTENSIONS
+
+# Archivos que dejan los programas mientras copian o editan
+TEMPORARY_SUFFIXES = ('.tmp', '.part', '.crdownload', '.partial', '.swp')
+
+# Con eventos, revisión completa de seguridad cada este número de segundos
+EVENT_RESCAN_INTERVAL = 60
+
+# Latencias recientes que se usan para las estadísticas
+LATENCY_WINDOW = 500
+
+# Ventana (en segundos) para calcular páginas por segundo
+THROUGHPUT_WINDOW = 60
+
+
+def _is_candidate(name):
+    lower = name.lower()
+    if name.startswith(('.', '~$')) or lower.endswith(TEMPORARY_SUFFIXES):
+        return False
+    return lower.endswith(SUPPORTED_EXTENSIONS)
+
+
+class FolderWatcher:
+    """
+    Detecta lotes nuevos o modificados en una carpeta y decide cuándo han
+    terminado de escribirse: su firma (rutas, tamaños y fechas) no cambia
+    durante settle segundos.
+    """
+
+    def __init__(self, root, settle=5.0, ignore=()):
+        self.root = os.path.abspath(root)
+        self.settle = settle
+        self.ignore = {os.path.abspath(p) for p in ignore}
+
+        self._dirty = {}        # lote -> (firma, momento del último cambio)
+        self._first_seen = {}   # lote -> momento en que se vio el primer cambio
+        self._processed = {}    # lote -> firma ya procesada (o en proceso)
+        self._lock = threading.Lock()
+
+    def batch_for_path(self, path):
+        """Retorna el lote al que pertenece una ruta (o None si está fuera)"""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == "." or rel.startswith(".."):
+            return None
+        top = rel.split(os.sep, 1)[0]
+        if os.path.join(self.root, top) in self.ignore:
+            return None
+        return top
+
+    def mark(self, path):
+        """Anota un cambio en una ruta (llamado desde el hilo de eventos)"""
+        batch = self.batch_for_path(path)
+        if batch is not None:
+            with self._lock:
+                self._dirty.setdefault(batch, (None, time.monotonic()))
+
+    def scan(self):
+        """Revisa toda la carpeta y anota todos los lotes como posibles cambios"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for name in names:
+                if os.path.join(self.root, name) not in self.ignore:
+                    self._dirty.setdefault(name, (None, now))
+
+    def pending(self):
+        """Número de lotes con cambios que aún no se han procesado"""
+        with self._lock:
+            return len(self._dirty)
+
+    def collect_ready(self, limit):
+        """
+        Retorna hasta limit lotes listos: [(lote, entradas, firma, primer cambio)].
+        Los lotes que no caben siguen pendientes (así el pool nunca se satura).
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            batches = list(self._dirty.items())
+
+        for batch, (last_signature, changed_at) in batches:
+            inputs, signature = self._signature(batch)
+            with self._lock:
+                if not inputs or signature == self._processed.get(batch):
+                    # Lote vacío, eliminado o ya procesado tal como está
+                    self._dirty.pop(batch, None)
+                    self._first_seen.pop(batch, None)
+                    continue
+                self._first_seen.setdefault(batch, changed_at)
+                if signature != last_signature:
+                    self._dirty[batch] = (signature, now)
+                    continue
+                if now - changed_at < self.settle or len(ready) >= limit:
+                    continue
+                del self._dirty[batch]
+                self._processed[batch] = signature
+                ready.append((batch, inputs, signature, self._first_seen.pop(batch)))
+        return ready
+
+    def set_processed(self, batch, signature):
+        with self._lock:
+            self._processed[batch] = signature
+
+    def _signature(self, batch):
+        path = os.path.join(self.root, batch)
+        files = []
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                files.extend(os.path.join(dirpath, f) for f in sorted(filenames) if _is_candidate(f))
+        elif _is_candidate(batch):
+            files.append(path)
+
+        signature = []
+        inputs = []
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue  # Eliminado mientras se revisaba
+            inputs.append(file_path)
+            signature.append((os.path.relpath(file_path, self.root), stat.st_size, stat.st_mtime_ns))
+        return inputs, json.dumps(signature)
+
+
+class WatchMetrics:
+    """Métricas del modo vigilancia, escritas periódicamente en un JSON"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.started = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.pages = 0
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._recent_pages = deque()  # (momento, páginas)
+
+    def record(self, result, latency):
+        now = time.monotonic()
+        if result['status'] == 'done':
+            self.processed += 1
+            self.pages += result.get('pages', 0)
+            self._recent_pages.append((now, result.get('pages', 0)))
+        else:
+            self.failed += 1
+        self.latencies.append(latency)
+
+    def snapshot(self):
+        now = time.monotonic()
+        while self._recent_pages and now - self._recent_pages[0][0] > THROUGHPUT_WINDOW:
+            self._recent_pages.popleft()
+        recent = sum(pages for _, pages in self._recent_pages)
+        latencies = sorted(self.latencies)
+
+        return {
+            'updated': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'processed': self.processed,
+            'failed': self.failed,
+            'pages': self.pages,
+            'pages_per_second': round(recent / THROUGHPUT_WINDOW, 2),
+            'latency_seconds': {
+                'last': round(self.latencies[-1], 2) if latencies else None,
+                'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2)
+                if latencies else None,
+            },
+        }
+
+    def write(self):
+        if not self.path:
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+class WatchService:
+    """
+    Bucle del modo vigilancia: detecta lotes listos, los reparte entre un
+    pool de procesos con un máximo de trabajos en curso y registra métricas.
+    """
+
+    def __init__(self, watch_dir, output_dir, spec_path=None, workers=None, settle=5.0,
+                 poll=False, poll_interval=2.0, metrics_path=None, metrics_interval=5.0):
+        spec = load_spec(spec_path) if spec_path else {'pipeline': DEFAULT_PIPELINE, 'limits': {}}
+        self.pipeline = spec['pipeline']
+        self.limits = spec['limits']
+        save_options(self.pipeline.get('save', {}))
+
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = workers or spec.get('workers') or default_workers(limit=os.cpu_count() or 1)
+        self.max_in_flight = self.workers * 2
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.metrics_interval = metrics_interval
+
+        self.watcher = FolderWatcher(watch_dir, settle, ignore=[self.output_dir])
+        self.metrics = WatchMetrics(metrics_path)
+        self.checkpoint = CheckpointLog(os.path.join(self.output_dir, ".easypdf-watch.jsonl"))
+        self._stop = threading.Event()
+        self._observer = None
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Vigila la carpeta hasta que se llame a stop() (o Ctrl+C)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._restore_processed()
+        if not self.poll:
+            self._observer = _start_observer(self.watcher.root, self.watcher.mark)
+
+        executor = self._new_executor()
+        in_flight = {}
+        next_scan = next_metrics = 0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now >= next_scan:
+                    self.watcher.scan()
+                    interval = EVENT_RESCAN_INTERVAL if self._observer else self.poll_interval
+                    next_scan = now + interval
+
+                free = self.max_in_flight - len(in_flight)
+                if free > 0:
+                    for batch, inputs, signature, first_seen in self.watcher.collect_ready(free):
+                        job = self._job_for(batch, inputs, signature)
+                        future = executor.submit(run_job, job, self.pipeline, self.limits)
+                        in_flight[future] = (batch, signature, first_seen)
+
+                if in_flight:
+                    finished, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                    if self._collect(finished, in_flight):
+                        executor.shutdown(wait=True)
+                        executor = self._new_executor()
+                else:
+                    self._stop.wait(0.5)
+
+                self.metrics.queue_depth = self.watcher.pending()
+                self.metrics.in_flight = len(in_flight)
+                if time.monotonic() >= next_metrics:
+                    self.metrics.write()
+                    next_metrics = time.monotonic() + self.metrics_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Terminar los lotes en curso antes de salir
+            if in_flight:
+                self._collect(list(in_flight), in_flight)
+            executor.shutdown(wait=True)
+            if self._observer:
+                self._observer.stop()
+                self._observer.join()
+            self.checkpoint.close()
+            self.metrics.in_flight = 0
+            self.metrics.write()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.limits,))
+
+    def _job_for(self, batch, inputs, signature):
+        is_folder = os.path.isdir(os.path.join(self.watcher.root, batch))
+        name = batch if is_folder else os.path.splitext(batch)[0]
+        return {
+            'id': batch,
+            'signature': signature,
+            'inputs': inputs,
+            'output': os.path.join(self.output_dir, name + ".pdf"),
+        }
+
+    def _collect(self, finished, in_flight):
+        """Registra los lotes terminados. Retorna True si el pool se rompió"""
+        broken = False
+        for future in finished:
+            batch, signature, first_seen = in_flight.pop(future)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken = True
+                result = {'id': batch, 'output': None, 'status': 'failed', 'stages': {},
+                          'error': "el proceso trabajador terminó inesperadamente"}
+
+            # Un lote fallido no se reintenta hasta que vuelva a cambiar
+            result['signature'] = signature
+            self.checkpoint.record(result)
+            self.metrics.record(result, time.monotonic() - first_seen)
+        return broken
+
+    def _restore_processed(self):
+        """Evita reprocesar al reiniciar los lotes que no han cambiado"""
+        self.checkpoint.load()
+        for batch, record in self.checkpoint.completed.items():
+            if os.path.exists(record.get('output', "")):
+                self.watcher.set_processed(batch, record.get('signature'))
+
+
+def _start_observer(root, callback):
+    """Arranca la vigilancia por eventos si watchdog está instalado"""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            callback(event.src_path)
+            dest_path = getattr(event, "dest_path", None)
+            if dest_path:
+                callback(dest_path)
+
+    observer = Observer()
+    observer.schedule(Handler(), root, recursive=True)
+    observer.start()
+    return observer
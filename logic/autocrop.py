@@ -0,0 +1,154 @@
+"""
+Módulo para recortar automáticamente los márgenes en blanco de las páginas.
+
+El recuadro del contenido sale de las posiciones del texto, los trazos y
+las imágenes, sin renderizar. Solo las páginas con imágenes (escaneos), en
+las que la imagen ocupa la página entera, se renderizan en gris a baja
+resolución para localizar la tinta. El recorte se aplica fijando el
+cropbox, así que el contenido no se vuelve a rasterizar. Los recuadros se
+calculan en tandas repartidas entre procesos trabajadores.
+
+Los recuadros van en coordenadas de la página sin rotar, relativas a la
+esquina de su cropbox actual (las de get_text y get_drawings).
+"""
+import os
+
+from logic.blank_pages import INK_DELTA, MIN_PAPER_LEVEL, WHITE_FILL
+from logic.tracing import annotate
+from logic.workers import cached_document, document_source, process_map
+
+# Resolución a la que se renderizan las páginas con imágenes
+CROP_DPI = 50
+# Espacio (en puntos) que se deja alrededor del contenido
+DEFAULT_PADDING = 6
+# Un recorte que quita menos que esto (en puntos) por cada lado no se aplica
+MIN_CROP = 1
+# Páginas por tarea
+CHUNK_PAGES = 64
+
+
+# =============================================================================
+# RECUADRO DEL CONTENIDO
+# =============================================================================
+
+def _union(boxes):
+    boxes = [box for box in boxes if box[2] > box[0] and box[3] > box[1]]
+    if not boxes:
+        return None
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def vector_bbox(page):
+    """Recuadro del texto y los trazos visibles (None si no hay nada)"""
+    boxes = [tuple(word[:4]) for word in page.get_text("words") if word[4].strip()]
+    for drawing in page.get_drawings():
+        fill = drawing.get('fill')
+        if drawing.get('color') is None and (fill is None or min(fill) >= WHITE_FILL):
+            continue  # Fondo blanco
+        boxes.append(tuple(drawing['rect']))
+    return _union(boxes)
+
+
+def render_bbox(page):
+    """Recuadro de la tinta renderizando la página (None si está en blanco)"""
+    import fitz  # PyMuPDF
+    from PIL import Image, ImageFilter
+
+    pix = page.get_pixmap(dpi=CROP_DPI, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    histogram = img.histogram()
+    paper = max(range(256), key=histogram.__getitem__)
+    if paper < MIN_PAPER_LEVEL:
+        return None  # Fondo oscuro: no se sabe qué es papel
+
+    # Máscara de tinta sin motas sueltas (ruido del escáner)
+    threshold = paper - INK_DELTA
+    mask = img.point(lambda v: 255 if v < threshold else 0).filter(ImageFilter.MedianFilter(3))
+    box = mask.getbbox()
+    if box is None:
+        return None
+
+    # De píxeles de la página renderizada (rotada) a coordenadas sin rotar
+    scale = pix.width / page.rect.width
+    rect = fitz.Rect(box[0] / scale, box[1] / scale, box[2] / scale, box[3] / scale)
+    return tuple(rect * page.derotation_matrix)
+
+
+def content_bbox(page):
+    """Recuadro del contenido de una página (None si está en blanco)"""
+    if page.get_images(full=False):
+        return _union([box for box in (render_bbox(page), vector_bbox(page)) if box])
+    return vector_bbox(page)
+
+
+def page_bboxes(task):
+    """Recuadros de varias páginas (en un proceso trabajador): [(página, recuadro)]"""
+    path, pages = task
+    doc = cached_document(path)
+    return [(page_num, content_bbox(doc[page_num])) for page_num in pages]
+
+
+def find_bboxes(doc, pages, jobs=None, progress=None):
+    """{página: recuadro o None} de las páginas indicadas de doc"""
+    pages = sorted(set(pages))
+    bboxes = {}
+    source, is_temp = document_source(doc)
+    try:
+        tasks = [(source, pages[i:i + CHUNK_PAGES]) for i in range(0, len(pages), CHUNK_PAGES)]
+        for _, result, error in process_map(page_bboxes, tasks, jobs):
+            if error is not None:
+                raise error
+            bboxes.update(result)
+            if progress is not None:
+                progress(len(bboxes), len(pages))
+    finally:
+        if is_temp:
+            os.remove(source)
+    return bboxes
+
+
+# =============================================================================
+# RECORTE
+# =============================================================================
+
+def crop_box(page, bbox, padding=DEFAULT_PADDING):
+    """
+    Cropbox nuevo (coordenadas del mediabox, como Page.set_cropbox) para
+    dejar solo bbox más padding, sin salir del cropbox actual. None si el
+    recorte no quita nada.
+    """
+    import fitz  # PyMuPDF
+
+    current = page.cropbox
+    rect = fitz.Rect(bbox) + (-padding, -padding, padding, padding)
+    rect = (rect + (current.x0, current.y0, current.x0, current.y0)) & current
+    if rect.is_empty:
+        return None
+    if (rect.x0 - current.x0 < MIN_CROP and rect.y0 - current.y0 < MIN_CROP
+            and current.x1 - rect.x1 < MIN_CROP and current.y1 - rect.y1 < MIN_CROP):
+        return None
+    return rect
+
+
+def plan_crops(doc, pages=None, uniform=False, padding=DEFAULT_PADDING, jobs=None, progress=None):
+    """
+    Calcula el recorte de cada página: {página: cropbox}. Con uniform,
+    todas usan la unión de los recuadros (mismo tamaño y posición relativa
+    en todas). Las páginas en blanco y las que no cambian no aparecen.
+    """
+    pages = list(range(len(doc))) if pages is None else sorted(set(pages))
+    bboxes = find_bboxes(doc, pages, jobs, progress)
+    if uniform:
+        union = _union([box for box in bboxes.values() if box])
+        bboxes = {page_num: union for page_num, box in bboxes.items() if box}
+
+    crops = {}
+    for page_num, box in bboxes.items():
+        if box is None:
+            continue
+        rect = crop_box(doc[page_num], box, padding)
+        if rect is not None:
+            crops[page_num] = rect
+    annotate(pages=len(pages), cropped=len(crops))
+    return crops
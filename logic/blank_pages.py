@@ -0,0 +1,130 @@
+"""
+Módulo para encontrar páginas en blanco (p. ej. los reversos vacíos de un
+escaneo a doble cara).
+
+Las páginas con texto no están en blanco y las que no tienen imágenes ni
+trazos visibles lo están, sin necesidad de renderizarlas. El resto se
+renderiza en gris a baja resolución y se mide la tinta: los píxeles
+bastante más oscuros que el papel (el tono más frecuente, que en un escaneo
+no es blanco puro), sin contar los bordes, donde suelen quedar sombras y
+taladros. Las páginas se reparten en tandas entre procesos trabajadores.
+"""
+import os
+
+from logic.tracing import annotate
+from logic.workers import cached_document, document_source, process_map
+
+# Resolución a la que se renderizan las páginas que hay que medir
+BLANK_DPI = 36
+# Fracción de cada borde que no se mira
+EDGE_MARGIN = 0.05
+# Diferencia con el tono del papel a partir de la que un píxel es tinta
+INK_DELTA = 64
+# Un papel más oscuro que esto no es una página en blanco
+MIN_PAPER_LEVEL = 128
+# Fracción de píxeles con tinta por debajo de la cual la página está en blanco
+DEFAULT_MAX_INK = 0.002
+# Rellenos más claros que esto (en los tres canales) cuentan como fondo
+WHITE_FILL = 0.98
+# Páginas por tarea
+CHUNK_PAGES = 64
+
+
+# =============================================================================
+# MEDICIÓN
+# =============================================================================
+
+def has_visible_drawings(page):
+    """True si la página tiene trazos o rellenos que no sean blancos"""
+    for drawing in page.get_drawings():
+        if drawing.get('color') is not None:
+            return True
+        fill = drawing.get('fill')
+        if fill is not None and min(fill) < WHITE_FILL:
+            return True
+    return False
+
+
+def ink_coverage(page):
+    """Fracción de la página (sin los bordes) cubierta de tinta, renderizándola"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=BLANK_DPI, colorspace=fitz.csGRAY, alpha=False)
+    img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    dx, dy = int(img.width * EDGE_MARGIN), int(img.height * EDGE_MARGIN)
+    histogram = img.crop((dx, dy, img.width - dx, img.height - dy)).histogram()
+    total = sum(histogram)
+    if not total:
+        return 0.0
+
+    paper = max(range(256), key=histogram.__getitem__)
+    if paper < MIN_PAPER_LEVEL:
+        return 1.0
+    return sum(histogram[:max(0, paper - INK_DELTA)]) / total
+
+
+def page_ink(page):
+    """
+    Tinta de una página: None si tiene texto (no está en blanco), 0.0 si no
+    tiene nada que dibujar y, si no, la medida tras renderizarla.
+    """
+    if page.get_text("text").strip():
+        return None
+    if not page.get_images(full=False) and not has_visible_drawings(page):
+        return 0.0
+    return ink_coverage(page)
+
+
+def is_blank_page(page, max_ink=DEFAULT_MAX_INK):
+    ink = page_ink(page)
+    return ink is not None and ink <= max_ink
+
+
+def scan_pages(task):
+    """Páginas en blanco de entre las indicadas (en un proceso trabajador): [(página, tinta)]"""
+    path, pages, max_ink = task
+    doc = cached_document(path)
+    blank = []
+    for page_num in pages:
+        ink = page_ink(doc[page_num])
+        if ink is not None and ink <= max_ink:
+            blank.append((page_num, ink))
+    return blank
+
+
+def chunk_tasks(source, pages, max_ink=DEFAULT_MAX_INK):
+    """Reparte las páginas en tareas para scan_pages"""
+    pages = sorted(set(pages))
+    return [(source, pages[i:i + CHUNK_PAGES], max_ink) for i in range(0, len(pages), CHUNK_PAGES)]
+
+
+# =============================================================================
+# BÚSQUEDA
+# =============================================================================
+
+def find_blank_pages(doc, page_order=None, max_ink=DEFAULT_MAX_INK, jobs=None, progress=None):
+    """
+    Páginas en blanco de doc en el orden page_order (por defecto, el del
+    documento). Retorna {posición: tinta}. progress(hechas, total) se
+    llama tras cada tanda.
+    """
+    order = list(page_order) if page_order is not None else list(range(len(doc)))
+    source, is_temp = document_source(doc)
+    blank = {}
+    try:
+        tasks = chunk_tasks(source, order, max_ink)
+        done = 0
+        for task, result, error in process_map(scan_pages, tasks, jobs):
+            if error is not None:
+                raise error
+            blank.update(result)
+            done += len(task[1])
+            if progress is not None:
+                progress(done, len(set(order)))
+    finally:
+        if is_temp:
+            os.remove(source)
+
+    annotate(pages=len(order), blank=len(blank))
+    return {position: blank[page_num] for position, page_num in enumerate(order) if page_num in blank}
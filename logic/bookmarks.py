@@ -1,8 +1,10 @@
 """
 Módulo para manejo de marcadores (TOC - Table of Contents).
 """
+from logic.tracing import traced_class
 
 
+@traced_class("bookmarks")
 class BookmarkManager:
     """Maneja las operaciones de marcadores del PDF"""
 
@@ -82,14 +84,18 @@ class BookmarkManager:
             return []
 
         # Crear mapeo de página original -> posición en el orden actual
+        # (la primera, si la página está duplicada)
         page_to_position = {}
         for pos, page_num in enumerate(page_order):
-            page_to_position[page_num + 1] = pos + 1  # TOC usa 1-indexed
+            page_to_position.setdefault(page_num + 1, pos + 1)  # TOC usa 1-indexed
 
-        # Crear lista de TOC con posiciones actualizadas para ordenar
+        # Crear lista de TOC con posiciones actualizadas para ordenar; los
+        # marcadores de páginas eliminadas no se muestran (se descartan al guardar)
         toc_with_positions = []
         for i, (lvl, title, page) in enumerate(self.toc):
-            display_page = page_to_position.get(page, page)
+            display_page = page_to_position.get(page)
+            if display_page is None:
+                continue
             toc_with_positions.append((i, lvl, title, page, display_page))
 
         # Ordenar por posición actual (cómo se verá en el PDF final)
@@ -0,0 +1,140 @@
+"""
+Módulo con una caché en disco de documentos ya convertidos a PDF.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+# Tamaño máximo por defecto de la caché (en bytes)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir():
+    """Directorio de caché del usuario según el sistema operativo"""
+    if os.name == 'nt':
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "easypdf", "conversions")
+
+
+class ConversionCache:
+    """
+    Guarda el PDF resultante de cada conversión, indexado por el hash del
+    archivo original y la identidad del conversor. Cuando se supera
+    max_bytes se eliminan las entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def source_digest(self, source_path):
+        """Hash del contenido de un documento original"""
+        h = hashlib.sha256()
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def key_for(self, digest, converter_id):
+        """Clave de un documento (por su hash) convertido con un conversor dado"""
+        h = hashlib.sha256()
+        h.update(converter_id.encode("utf-8"))
+        h.update(b"\0")
+        h.update(digest.encode("ascii"))
+        return h.hexdigest()
+
+    def get(self, *keys):
+        """Retorna la ruta del PDF en caché de la primera clave que exista, o None"""
+        for key in keys:
+            path = self._entry_path(key)
+            try:
+                # Marcar como usado recientemente para el LRU
+                os.utime(path)
+            except OSError:
+                continue
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def put(self, key, pdf_path):
+        """
+        Mueve un PDF recién convertido a la caché.
+        Retorna la ruta dentro de la caché o None si no se pudo guardar.
+        """
+        if self.max_bytes <= 0:
+            return None
+
+        temp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Copiar a un temporal del mismo directorio y renombrar: así otro
+            # proceso nunca ve un PDF a medio escribir
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            shutil.move(pdf_path, temp_path)
+            path = self._entry_path(key)
+            os.replace(temp_path, path)
+            os.utime(path)
+        except OSError:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+            return None
+
+        # La entrada recién guardada no se elimina aunque supere max_bytes:
+        # quien la ha guardado aún tiene que leerla
+        self._evict(keep=path)
+        return path
+
+    def clear(self):
+        """Elimina todas las entradas"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".pdf")
+
+    def _evict(self, keep=None):
+        """Elimina las entradas más antiguas (salvo keep) hasta respetar max_bytes"""
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    for entry in it:
+                        if not entry.name.endswith(".pdf"):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total += stat.st_size
+            except OSError:
+                return
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_bytes:
+                    break
@@ -0,0 +1,219 @@
+"""
+Módulo para encontrar páginas repetidas en un documento.
+
+Cada página se resume en dos huellas: un hash perceptivo de 256 bits (dHash:
+el sentido del degradado entre píxeles vecinos de una miniatura en gris de
+17x16) y un hash de su texto y de dónde tiene imágenes. Dos páginas con el
+mismo texto, las imágenes en el mismo sitio y miniaturas parecidas son la
+misma; las páginas sin texto (escaneos) se comparan solo por la imagen. Las
+huellas se calculan en un pool de procesos salvo las de páginas cuya
+miniatura ya está en la caché de renderizado, y la búsqueda de parecidas usa
+un índice por bandas de bits en lugar de comparar todas las parejas.
+"""
+import hashlib
+import os
+
+from logic.tracing import annotate
+from logic.workers import cached_document, document_source, process_map
+
+# Lado del hash perceptivo: HASH_SIZE x HASH_SIZE bits (con 8x8 las páginas
+# de texto escaneadas se parecen demasiado entre sí)
+HASH_SIZE = 16
+# Ancho (en píxeles) al que se renderiza cada página para calcular el hash
+RENDER_WIDTH = 96
+# Bits distintos que se toleran entre las miniaturas de dos páginas iguales
+# (también con el mismo texto: una imagen de más o de menos las distingue)
+DEFAULT_MAX_DISTANCE = 12
+# Páginas por tarea
+CHUNK_PAGES = 64
+
+
+# =============================================================================
+# HUELLAS
+# =============================================================================
+
+def image_hash(img):
+    """dHash de una imagen PIL: 1 si cada píxel es más claro que el de su derecha"""
+    from PIL import Image
+
+    small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def pixmap_hash(pix):
+    """dHash de un pixmap de PyMuPDF (gris o RGB, sin alfa)"""
+    from PIL import Image
+
+    mode = "L" if pix.n == 1 else "RGB"
+    return image_hash(Image.frombytes(mode, (pix.width, pix.height), pix.samples))
+
+
+def text_hash(text, images=()):
+    """
+    Hash del texto sin tener en cuenta los espacios y de los rectángulos
+    (x0, y0, x1, y1) de las imágenes, en puntos enteros (None si no hay
+    texto). El dHash apenas cambia con una imagen de más en una zona
+    blanca, así que esa diferencia se comprueba aquí.
+    """
+    text = " ".join(text.split())
+    if not text:
+        return None
+    h = hashlib.blake2b(text.encode("utf-8"), digest_size=8)
+    for bbox in images:
+        h.update(("\0" + ",".join(str(v) for v in bbox)).encode("ascii"))
+    return h.hexdigest()
+
+
+def page_fingerprint(page, pix=None):
+    """(hash perceptivo, hash del texto) de una página. pix: miniatura ya renderizada"""
+    import fitz  # PyMuPDF
+
+    if pix is None:
+        scale = RENDER_WIDTH / max(page.rect.width, 1)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    images = sorted(tuple(round(v) for v in info['bbox']) for info in page.get_image_info())
+    return pixmap_hash(pix), text_hash(page.get_text("text"), images)
+
+
+def fingerprint_pages(task):
+    """Huellas de varias páginas (en un proceso trabajador): [(página, phash, texto)]"""
+    path, pages = task
+    doc = cached_document(path)
+    return [(page_num, *page_fingerprint(doc[page_num])) for page_num in pages]
+
+
+# =============================================================================
+# AGRUPACIÓN
+# =============================================================================
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _bands(max_distance):
+    """
+    Cortes del hash en max_distance + 1 bandas: si dos hashes difieren en
+    max_distance bits o menos, al menos una banda es idéntica.
+    """
+    count = min(max_distance + 1, HASH_SIZE * HASH_SIZE)
+    bits = HASH_SIZE * HASH_SIZE
+    edges = [bits * i // count for i in range(count + 1)]
+    return [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+
+
+def group_duplicates(records, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Agrupa las páginas repetidas. records: [(clave, phash, hash del texto)]
+    en el orden del documento. Dos páginas son la misma si su texto es
+    idéntico y sus miniaturas difieren en max_distance bits o menos.
+    Retorna [[clave original, repetidas...]], solo los grupos con más de
+    una página.
+    """
+    bands = _bands(max_distance)
+    groups = {}           # clave del original -> claves de la misma página
+    by_text = {}          # hash del texto -> [(clave, phash)] de originales
+    by_band = {}          # (banda, valor) -> [(clave, phash)] de originales sin texto
+
+    for key, phash, thash in records:
+        if thash is None and phash == 0:
+            continue  # Página uniforme (en blanco): no se considera repetida
+
+        original = None
+        if thash is not None:
+            for candidate, candidate_hash in by_text.get(thash, ()):
+                if hamming(phash, candidate_hash) <= max_distance:
+                    original = candidate
+                    break
+        else:
+            for band, (shift, mask) in enumerate(bands):
+                for candidate, candidate_hash in by_band.get((band, (phash >> shift) & mask), ()):
+                    if hamming(phash, candidate_hash) <= max_distance:
+                        original = candidate
+                        break
+                if original is not None:
+                    break
+
+        if original is not None:
+            groups[original].append(key)
+            continue
+
+        groups[key] = [key]
+        if thash is not None:
+            by_text.setdefault(thash, []).append((key, phash))
+        else:
+            for band, (shift, mask) in enumerate(bands):
+                by_band.setdefault((band, (phash >> shift) & mask), []).append((key, phash))
+
+    return [group for group in groups.values() if len(group) > 1]
+
+
+# =============================================================================
+# BÚSQUEDA
+# =============================================================================
+
+def fingerprint_document(doc, pages, jobs=None, thumbnail_scale=None, progress=None):
+    """
+    Huellas de las páginas indicadas de doc: {página: (phash, hash del texto)}.
+    Si se indica thumbnail_scale, las páginas con la miniatura a esa escala
+    en la caché de renderizado se resuelven aquí mismo sin renderizar.
+    progress(hechas, total) se llama según avanza.
+    """
+    from logic.render_cache import render_cache
+
+    pages = sorted(set(pages))
+    fingerprints = {}
+    if thumbnail_scale:
+        for page_num in pages:
+            page = doc[page_num]
+            pix = render_cache.peek(doc, page, thumbnail_scale)
+            if pix is not None:
+                fingerprints[page_num] = page_fingerprint(page, pix)
+
+    missing = [page_num for page_num in pages if page_num not in fingerprints]
+    annotate(pages=len(pages), cached=len(pages) - len(missing))
+    if progress is not None:
+        progress(len(fingerprints), len(pages))
+    if not missing:
+        return fingerprints
+
+    source, is_temp = document_source(doc)
+    try:
+        tasks = [(source, missing[i:i + CHUNK_PAGES]) for i in range(0, len(missing), CHUNK_PAGES)]
+        for _, result, error in process_map(fingerprint_pages, tasks, jobs):
+            if error is not None:
+                raise error
+            for page_num, phash, thash in result:
+                fingerprints[page_num] = (phash, thash)
+            if progress is not None:
+                progress(len(fingerprints), len(pages))
+    finally:
+        if is_temp:
+            os.remove(source)
+    return fingerprints
+
+
+def find_duplicates(doc, page_order=None, max_distance=DEFAULT_MAX_DISTANCE, jobs=None,
+                    thumbnail_scale=None, progress=None):
+    """
+    Páginas repetidas de doc en el orden page_order (por defecto, el del
+    documento). Retorna los grupos como listas de posiciones: la primera es
+    la original y el resto, sus repeticiones.
+    """
+    order = list(page_order) if page_order is not None else list(range(len(doc)))
+    fingerprints = fingerprint_document(doc, order, jobs, thumbnail_scale, progress)
+    groups = group_duplicates(
+        [(position, *fingerprints[page_num]) for position, page_num in enumerate(order)],
+        max_distance)
+    annotate(groups=len(groups))
+    return groups
+
+
+def format_groups(groups):
+    """Una línea por grupo con las páginas 1-based: '3 = 1' (la 3 repite la 1)"""
+    return "\n".join(f"{', '.join(str(p + 1) for p in group[1:])} = {group[0] + 1}" for group in groups)
@@ -0,0 +1,180 @@
+"""
+Módulo para preparar imágenes que se insertan directamente como páginas PDF.
+"""
+import io
+from PIL import Image
+
+# Resolución supuesta cuando la imagen no la indica (la misma que usa MuPDF)
+DEFAULT_DPI = 96
+
+# Orientación EXIF -> rotación (antihoraria) que deja la imagen derecha
+EXIF_ORIENTATION_TAG = 0x0112
+EXIF_ROTATIONS = {3: 180, 6: 270, 8: 90}
+
+# Imágenes (no JPEG) con más píxeles se insertan por franjas
+LARGE_IMAGE_PIXELS = 40_000_000
+
+# Píxeles de cada franja al insertar por franjas
+STRIP_PIXELS = 4_000_000
+
+# Formatos que MuPDF inserta directamente (JPEG y JPEG2000 sin recodificar)
+NATIVE_FORMATS = ("JPEG", "JPEG2000", "PNG", "BMP", "GIF", "TIFF", "PPM")
+
+
+def prepare_image(path, max_dpi=None):
+    """
+    Lee una imagen y calcula el tamaño de página que le corresponde.
+    Pensada para ejecutarse en hilos trabajadores: no toca ningún documento.
+
+    Si max_dpi está definido y la imagen lo supera, se reduce a esa
+    resolución. En otro caso se conservan los bytes originales (un JPEG
+    se inserta sin recodificar).
+
+    Retorna un dict con 'data', 'width', 'height' (en puntos) y 'rotate'.
+    Los TIFF multipágina y las imágenes muy grandes retornan
+    {'streamed': True}: deben insertarse con iter_image_pages().
+    """
+    with Image.open(path) as img:
+        if _needs_streaming(img):
+            return {'streamed': True}
+
+        px_width, px_height = img.size
+        xdpi, ydpi = _image_dpi(img)
+        rotate = EXIF_ROTATIONS.get(_exif_orientation(img), 0)
+
+        # Tamaño de la página en puntos (1 punto = 1/72 pulgadas)
+        width = px_width * 72.0 / xdpi
+        height = px_height * 72.0 / ydpi
+
+        if max_dpi and max(xdpi, ydpi) > max_dpi:
+            factor = max_dpi / max(xdpi, ydpi)
+            new_size = (max(1, round(px_width * factor)), max(1, round(px_height * factor)))
+            data = _downscale(img, new_size)
+        elif img.format not in NATIVE_FORMATS:
+            # Formatos que MuPDF no reconoce (p. ej. WebP): se pasan a PNG
+            data = _encode(img, "PNG")
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+
+    if rotate in (90, 270):
+        width, height = height, width
+
+    return {
+        'data': data,
+        'width': width,
+        'height': height,
+        'rotate': rotate,
+    }
+
+
+def iter_image_pages(path, max_dpi=None):
+    """
+    Recorre los fotogramas de una imagen (p. ej. un TIFF multipágina) de uno
+    en uno y produce un dict por página con 'width', 'height', 'rotate' y
+    'strips': iterador de (arriba, abajo, bytes), con arriba/abajo como
+    fracción de la altura de la página.
+
+    Solo hay un fotograma decodificado en memoria a la vez, y cada uno se
+    codifica por franjas para que ni los buffers ni los streams del PDF
+    crezcan con el tamaño de la imagen.
+    """
+    with Image.open(path) as img:
+        for index in range(getattr(img, "n_frames", 1)):
+            img.seek(index)
+            yield _prepare_frame(img, max_dpi)
+
+
+def _needs_streaming(img):
+    """Comprueba si la imagen debe insertarse fotograma a fotograma"""
+    if getattr(img, "n_frames", 1) > 1 and img.format == "TIFF":
+        return True
+    # Un JPEG grande se inserta sin decodificar, no hace falta trocearlo
+    width, height = img.size
+    return img.format != "JPEG" and width * height > LARGE_IMAGE_PIXELS
+
+
+def _prepare_frame(img, max_dpi):
+    """Prepara el fotograma actual de img para insertarlo por franjas"""
+    px_width, px_height = img.size
+    xdpi, ydpi = _image_dpi(img)
+    width = px_width * 72.0 / xdpi
+    height = px_height * 72.0 / ydpi
+
+    # Los TIFF comprimidos con JPEG se mantienen en JPEG; el resto, sin pérdida
+    lossy = img.info.get("compression") in ("jpeg", "tiff_jpeg")
+    fmt = "JPEG" if lossy else "PNG"
+
+    frame = _normalize_mode(img, fmt)
+    if max_dpi and max(xdpi, ydpi) > max_dpi:
+        factor = max_dpi / max(xdpi, ydpi)
+        size = (max(1, round(px_width * factor)), max(1, round(px_height * factor)))
+        frame = frame.resize(size, Image.Resampling.LANCZOS)
+
+    return {
+        'width': width,
+        'height': height,
+        'rotate': 0,
+        'strips': _iter_strips(frame, fmt),
+    }
+
+
+def _iter_strips(frame, fmt):
+    """Divide un fotograma en franjas horizontales codificadas por separado"""
+    px_width, px_height = frame.size
+    rows = max(1, STRIP_PIXELS // max(1, px_width))
+
+    for top in range(0, px_height, rows):
+        bottom = min(px_height, top + rows)
+        strip = frame.crop((0, top, px_width, bottom))
+        yield top / px_height, bottom / px_height, _encode(strip, fmt)
+
+
+def _normalize_mode(img, fmt):
+    """Convierte a un modo que el formato de salida pueda guardar"""
+    if fmt == "JPEG" and img.mode not in ("RGB", "L", "CMYK"):
+        return img.convert("RGB")
+    if img.mode not in ("RGB", "L", "RGBA", "LA", "1", "P"):
+        return img.convert("RGBA" if "A" in img.getbands() else "RGB")
+    return img
+
+
+def _image_dpi(img):
+    """Resolución (x, y) declarada por la imagen, o DEFAULT_DPI"""
+    dpi = img.info.get("dpi")
+    try:
+        xdpi, ydpi = float(dpi[0]), float(dpi[1])
+    except (TypeError, ValueError, IndexError):
+        return DEFAULT_DPI, DEFAULT_DPI
+    # Algunos archivos declaran 0 o 1 ppp: no son resoluciones reales
+    if xdpi <= 1 or ydpi <= 1:
+        return DEFAULT_DPI, DEFAULT_DPI
+    return xdpi, ydpi
+
+
+def _exif_orientation(img):
+    try:
+        return img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+
+
+def _downscale(img, size):
+    """Reduce la imagen y la recodifica en su formato (JPEG o PNG)"""
+    fmt = "JPEG" if img.format == "JPEG" else "PNG"
+
+    if fmt == "JPEG":
+        # Decodificar directamente a menor escala cuando el JPEG lo permite
+        img.draft(img.mode, size)
+
+    resized = _normalize_mode(img, fmt).resize(size, Image.Resampling.LANCZOS)
+    return _encode(resized, fmt)
+
+
+def _encode(img, fmt):
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        _normalize_mode(img, fmt).save(out, "JPEG", quality=85, optimize=True)
+    else:
+        _normalize_mode(img, fmt).save(out, "PNG")
+    return out.getvalue()
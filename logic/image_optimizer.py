@@ -0,0 +1,237 @@
+"""
+Módulo para optimizar las imágenes de un PDF.
+
+Cada imagen (una vez por xref, aunque aparezca en muchas páginas) se reduce
+a la resolución objetivo según el tamaño más grande al que se dibuja y se
+vuelve a comprimir: JPEG para fotografías, escala de grises si no tiene
+color y 1 bit por píxel para escaneos en blanco y negro. La decodificación
+y la compresión se hacen en un pool de procesos; el proceso principal solo
+sustituye los streams en el documento según llegan los resultados, con un
+número acotado de resultados en memoria.
+"""
+import io
+import os
+import time
+import zlib
+
+from logic.tracing import annotate
+from logic.workers import cached_document, document_source, process_map
+
+DEFAULT_TARGET_DPI = 150
+DEFAULT_JPEG_QUALITY = 75
+# Una imagen solo se sustituye si el resultado ocupa al menos esto menos
+MIN_SAVING = 0.10
+# No se reduce si la escala resultante es mayor que esta (no compensa)
+MAX_DOWNSAMPLE_SCALE = 0.9
+# Desviación de croma (0-255) por debajo de la cual un píxel se considera gris
+GRAY_TOLERANCE = 8
+# Fracción de píxeles que pueden incumplir las detecciones (ruido del escáner)
+DETECTION_OUTLIERS = 0.002
+# Tonos intermedios: una imagen gris casi sin ellos es blanco y negro
+BITONAL_RANGE = (48, 208)
+
+
+# =============================================================================
+# INVENTARIO (proceso principal)
+# =============================================================================
+
+def collect_images(doc):
+    """
+    Imágenes del documento, una entrada por xref, con el tamaño máximo al
+    que se dibujan (en puntos). Retorna {xref: info}.
+    """
+    images = {}
+    for page in doc:
+        for xref, smask, width, height, bpc, colorspace, _, _, image_filter, *_ in page.get_images(full=True):
+            info = images.get(xref)
+            if info is None:
+                info = images[xref] = {
+                    'xref': xref, 'width': width, 'height': height, 'bpc': bpc,
+                    'colorspace': colorspace, 'filter': image_filter, 'smask': smask,
+                    'placed_width': 0.0, 'placed_height': 0.0,
+                }
+            for rect in page.get_image_rects(xref):
+                info['placed_width'] = max(info['placed_width'], rect.width)
+                info['placed_height'] = max(info['placed_height'], rect.height)
+    return images
+
+
+def target_scale(info, target_dpi):
+    """
+    Escala que deja la imagen a target_dpi en el mayor tamaño al que se
+    dibuja (1.0 si ya está por debajo o no se sabe dónde se dibuja).
+    """
+    if not target_dpi or not info['placed_width'] or not info['placed_height']:
+        return 1.0
+    scale = max(target_dpi * info['placed_width'] / 72 / info['width'],
+                target_dpi * info['placed_height'] / 72 / info['height'])
+    return scale if scale < MAX_DOWNSAMPLE_SCALE else 1.0
+
+
+def can_optimize(doc, info):
+    """Descarta máscaras, imágenes de 1 bit (ya son compactas) y las que se decodifican con Decode"""
+    if info['bpc'] == 1 or info['bpc'] > 8:
+        return False
+    for key in ("ImageMask", "Decode"):
+        kind, value = doc.xref_get_key(info['xref'], key)
+        if kind != "null" and value not in ("false", ""):
+            return False
+    return True
+
+
+# =============================================================================
+# COMPRESIÓN (en procesos trabajadores)
+# =============================================================================
+
+def _is_gray(img):
+    """True si una imagen RGB no tiene color (salvo ruido)"""
+    total = img.width * img.height
+    _, cb, cr = img.convert("YCbCr").split()
+    for channel in (cb, cr):
+        histogram = channel.histogram()
+        colored = total - sum(histogram[128 - GRAY_TOLERANCE:129 + GRAY_TOLERANCE])
+        if colored > total * DETECTION_OUTLIERS:
+            return False
+    return True
+
+
+def _is_bitonal(img):
+    """True si una imagen en escala de grises es casi toda blanca o negra"""
+    low, high = BITONAL_RANGE
+    midtones = sum(img.histogram()[low:high])
+    return midtones <= img.width * img.height * DETECTION_OUTLIERS * 10
+
+
+def _encode(img, jpeg_quality, bitonal):
+    """Comprime la imagen. Retorna (datos, claves del diccionario de imagen)"""
+    if bitonal:
+        bits = img.point(lambda v: 255 if v >= 128 else 0, mode="1")
+        # En modo "1" de PIL y en DeviceGray de 1 bit, 1 es blanco
+        return zlib.compress(bits.tobytes(), 9), {
+            'Filter': "/FlateDecode", 'ColorSpace': "/DeviceGray", 'BitsPerComponent': "1"}
+
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=jpeg_quality, optimize=True)
+    colorspace = "/DeviceGray" if img.mode == "L" else "/DeviceRGB"
+    return buffer.getvalue(), {'Filter': "/DCTDecode", 'ColorSpace': colorspace, 'BitsPerComponent': "8"}
+
+
+def recompress_image(task):
+    """
+    Decodifica, reduce y vuelve a comprimir una imagen. Se ejecuta en un
+    proceso trabajador. Retorna el resultado con los datos nuevos, o sin
+    ellos si no compensa sustituirla.
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    path, xref, scale, jpeg_quality = task
+    start = time.perf_counter()
+    result = {'xref': xref, 'data': None}
+    try:
+        doc = cached_document(path)
+        result['before'] = len(doc.xref_stream_raw(xref))
+
+        pix = fitz.Pixmap(doc, xref)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)  # La transparencia va en su propia SMask
+        if pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        img = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+        del pix
+
+        # Se detecta antes de reducir: el suavizado añade tonos intermedios
+        if img.mode == "RGB" and _is_gray(img):
+            img = img.convert("L")
+        bitonal = img.mode == "L" and _is_bitonal(img)
+        if scale < 1.0:
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+
+        data, keys = _encode(img, jpeg_quality, bitonal)
+        result['action'] = ("1 bit" if keys['BitsPerComponent'] == "1"
+                            else "gris" if img.mode == "L" else "color")
+        if scale < 1.0:
+            result['action'] += f", reducida al {scale * 100:.0f} %"
+        if len(data) <= result['before'] * (1 - MIN_SAVING):
+            keys['Width'], keys['Height'] = str(img.width), str(img.height)
+            result['data'], result['keys'] = data, keys
+    except Exception as e:
+        result['error'] = str(e)
+    result['after'] = len(result['data']) if result['data'] else result.get('before', 0)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+# =============================================================================
+# OPTIMIZACIÓN
+# =============================================================================
+
+def replace_image_stream(doc, xref, data, keys):
+    """Sustituye en el sitio el stream de una imagen (mismo xref, nuevas claves)"""
+    doc.update_stream(xref, data, compress=0)
+    for key, value in keys.items():
+        doc.xref_set_key(xref, key, value)
+    for key in ("DecodeParms", "Decode", "Intent"):
+        doc.xref_set_key(xref, key, "null")
+
+
+def optimize_images(doc, target_dpi=DEFAULT_TARGET_DPI, jpeg_quality=DEFAULT_JPEG_QUALITY,
+                    jobs=None, progress=None):
+    """
+    Optimiza las imágenes de doc en el sitio. progress(hechas, total) se
+    llama tras cada imagen. Retorna un informe con los bytes de las
+    imágenes antes y después y el resultado de cada una.
+    """
+    from logic.render_cache import render_cache
+
+    start = time.perf_counter()
+    images = [info for info in collect_images(doc).values() if can_optimize(doc, info)]
+    report = {'images': len(images), 'replaced': 0, 'failed': 0,
+              'bytes_before': 0, 'bytes_after': 0, 'per_image': []}
+    if not images:
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+    source, is_temp = document_source(doc)
+    try:
+        tasks = [(source, info['xref'], target_scale(info, target_dpi), jpeg_quality) for info in images]
+        for done, (task, result, error) in enumerate(process_map(recompress_image, tasks, jobs), 1):
+            if error is not None:
+                result = {'xref': task[1], 'data': None, 'error': str(error), 'after': 0, 'seconds': 0.0}
+            report['bytes_before'] += result.get('before', 0)
+            report['bytes_after'] += result['after']
+            if 'error' in result:
+                report['failed'] += 1
+            elif result['data'] is not None:
+                replace_image_stream(doc, result['xref'], result['data'], result['keys'])
+                report['replaced'] += 1
+            result.pop('data', None)
+            result.pop('keys', None)
+            report['per_image'].append(result)
+            if progress is not None:
+                progress(done, len(tasks))
+    finally:
+        if is_temp:
+            os.remove(source)
+
+    render_cache.discard_document(doc)
+    annotate(images=len(images), bytes=report['bytes_before'] - report['bytes_after'])
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def format_report(report, details=False):
+    before, after = report['bytes_before'], report['bytes_after']
+    saved = (1 - after / before) * 100 if before else 0
+    lines = [f"{report['images']} imágenes, {report['replaced']} sustituidas, {report['failed']} con error: "
+             f"{before / 1048576:.2f} MB -> {after / 1048576:.2f} MB ({saved:.0f} % menos) "
+             f"en {report['seconds']:.2f} s"]
+    if details:
+        for item in report['per_image']:
+            status = item.get('error') or item.get('action', "")
+            if 'error' not in item and item['after'] == item.get('before'):
+                status += " (sin cambios)"
+            lines.append(f"  xref {item['xref']:>6}: {item.get('before', 0) / 1024:9.1f} KB -> "
+                         f"{item['after'] / 1024:9.1f} KB  {item['seconds'] * 1000:7.1f} ms  {status}")
+    return "\n".join(lines)
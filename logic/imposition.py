@@ -0,0 +1,217 @@
+"""
+Módulo para imponer páginas en hojas de impresión: varias por cara (N-up) o
+en cuadernillo para plegar y grapar por el centro.
+
+Las páginas se colocan con Page.show_pdf_page, que las incrusta como
+XObjects de formulario: el contenido sigue siendo vectorial, cada página de
+origen se copia una sola vez aunque aparezca en varias hojas y no se
+renderiza nada. Las páginas se toman en el orden de page_order.
+"""
+import fitz  # PyMuPDF
+
+from logic.tracing import annotate
+
+# Hoja por defecto (A4 vertical, en puntos); la orientación se elige sola
+DEFAULT_SHEET = (595, 842)
+# Páginas por cara -> (columnas, filas) con la hoja apaisada
+NUP_GRIDS = {
+    2: (2, 1),
+    4: (2, 2),
+    6: (3, 2),
+    8: (4, 2),
+    9: (3, 3),
+    16: (4, 4),
+}
+
+
+# =============================================================================
+# GEOMETRÍA
+# =============================================================================
+
+def fit_rect(cell, width, height, align="center"):
+    """
+    Rectángulo con la proporción width x height lo más grande posible dentro
+    de cell, centrado en vertical y pegado a la izquierda, a la derecha o
+    centrado en horizontal según align.
+    """
+    scale = min(cell.width / width, cell.height / height)
+    w, h = width * scale, height * scale
+    if align == "left":
+        x0 = cell.x0
+    elif align == "right":
+        x0 = cell.x1 - w
+    else:
+        x0 = cell.x0 + (cell.width - w) / 2
+    y0 = cell.y0 + (cell.height - h) / 2
+    return fitz.Rect(x0, y0, x0 + w, y0 + h)
+
+
+def grid_cells(width, height, cols, rows, margin=0, gutter=0):
+    """Celdas de una rejilla cols x rows, de izquierda a derecha y de arriba abajo"""
+    cell_w = (width - 2 * margin - (cols - 1) * gutter) / cols
+    cell_h = (height - 2 * margin - (rows - 1) * gutter) / rows
+    if cell_w <= 0 or cell_h <= 0:
+        raise ValueError("Los márgenes y el medianil no dejan sitio para las páginas")
+    return [fitz.Rect(margin + col * (cell_w + gutter), margin + row * (cell_h + gutter),
+                      margin + col * (cell_w + gutter) + cell_w, margin + row * (cell_h + gutter) + cell_h)
+            for row in range(rows) for col in range(cols)]
+
+
+def sheet_grid(width, height, cols, rows):
+    """Rejilla en una hoja: cols x rows es la de la hoja apaisada; en vertical se gira"""
+    return (rows, cols) if height > width else (cols, rows)
+
+
+def sheet_orientation(sheet_size, cols, rows, page_size, margin=0, gutter=0, landscape=None):
+    """
+    (ancho, alto) de la hoja. Con landscape=None se elige la orientación en
+    la que las páginas de tamaño page_size salen más grandes.
+    """
+    short, long = sorted(sheet_size)
+    if landscape is not None:
+        return (long, short) if landscape else (short, long)
+
+    def page_scale(size):
+        cell = grid_cells(size[0], size[1], *sheet_grid(size[0], size[1], cols, rows), margin, gutter)[0]
+        return min(cell.width / page_size[0], cell.height / page_size[1])
+
+    return max(((long, short), (short, long)), key=page_scale)
+
+
+# =============================================================================
+# ESQUEMAS DE IMPOSICIÓN
+# Posiciones 0-based del orden de páginas; None es un hueco en blanco
+# =============================================================================
+
+def nup_sheets(count, per_sheet):
+    """Posiciones de cada cara con per_sheet páginas por cara"""
+    return [[p if p < count else None for p in range(start, start + per_sheet)]
+            for start in range(0, count, per_sheet)]
+
+
+def booklet_sides(count, signature=0):
+    """
+    Caras de un cuadernillo: [(izquierda, derecha, hoja, hojas)], donde hoja
+    es el número de hoja dentro de su pliego (0 la exterior) y hojas, las
+    que tiene el pliego. Cada hoja da dos caras (anverso y reverso). Con
+    signature se hacen pliegos de ese número de hojas que se cosen uno tras
+    otro; con 0, un solo pliego. Los huecos hasta completar múltiplos de 4
+    quedan al final.
+    """
+    per_signature = 4 * signature if signature > 0 else ((count + 3) // 4) * 4
+    sides = []
+    for first in range(0, count, per_signature):
+        pages = min(per_signature, ((count - first + 3) // 4) * 4)
+        sheets = pages // 4
+
+        def position(offset):
+            return first + offset if first + offset < count else None
+
+        for sheet in range(sheets):
+            # Anverso: última y primera; reverso: segunda y penúltima
+            sides.append((position(pages - 1 - 2 * sheet), position(2 * sheet), sheet, sheets))
+            sides.append((position(2 * sheet + 1), position(pages - 2 - 2 * sheet), sheet, sheets))
+    return sides
+
+
+# =============================================================================
+# IMPOSICIÓN
+# =============================================================================
+
+def _reference_size(doc, order):
+    """Tamaño de la primera página, con el que se elige la orientación"""
+    rect = doc[order[0]].rect
+    return rect.width, rect.height
+
+
+def impose_nup(doc, page_order=None, per_sheet=2, sheet_size=DEFAULT_SHEET, landscape=None,
+               margin=0, gutter=0):
+    """
+    Coloca per_sheet páginas por cara en una rejilla. Retorna el documento
+    nuevo y {posición: cara} (0-based) para rehacer los marcadores.
+    """
+    if per_sheet not in NUP_GRIDS:
+        raise ValueError(f"Páginas por cara no admitidas: {per_sheet} "
+                         f"(se admiten {', '.join(str(n) for n in NUP_GRIDS)})")
+    order = list(page_order) if page_order is not None else list(range(len(doc)))
+    if not order:
+        raise ValueError("No hay páginas que imponer")
+
+    cols, rows = NUP_GRIDS[per_sheet]
+    width, height = sheet_orientation(sheet_size, cols, rows, _reference_size(doc, order),
+                                      margin, gutter, landscape)
+    cells = grid_cells(width, height, *sheet_grid(width, height, cols, rows), margin, gutter)
+
+    out = fitz.open()
+    placements = {}
+    for sheet_num, positions in enumerate(nup_sheets(len(order), per_sheet)):
+        sheet = out.new_page(width=width, height=height)
+        for cell, position in zip(cells, positions):
+            if position is None:
+                continue
+            page_num = order[position]
+            rect = doc[page_num].rect
+            sheet.show_pdf_page(fit_rect(cell, rect.width, rect.height), doc, page_num)
+            placements.setdefault(position, sheet_num)
+
+    annotate(pages=len(order), sheets=len(out))
+    return out, placements
+
+
+def impose_booklet(doc, page_order=None, sheet_size=DEFAULT_SHEET, signature=0, creep=0,
+                   gutter=0, margin=0):
+    """
+    Impone las páginas en cuadernillo: dos por cara, en el orden en que
+    quedan al imprimir a doble cara (volteo por el lado corto), plegar y
+    grapar. Cada página se pega al lomo con gutter puntos entre las dos. creep
+    es cuánto se acercan al lomo las páginas de la hoja más interior de cada
+    pliego (las intermedias, en proporción) para compensar que al plegar
+    sobresalen por el corte. Retorna el documento nuevo y {posición: cara}.
+    """
+    order = list(page_order) if page_order is not None else list(range(len(doc)))
+    if not order:
+        raise ValueError("No hay páginas que imponer")
+
+    width, height = sheet_orientation(sheet_size, 2, 1, _reference_size(doc, order),
+                                      margin, gutter, landscape=True)
+    left_cell, right_cell = grid_cells(width, height, 2, 1, margin, gutter)
+
+    out = fitz.open()
+    placements = {}
+    for side_num, (left, right, sheet, sheets) in enumerate(booklet_sides(len(order), signature)):
+        side = out.new_page(width=width, height=height)
+        shift = creep * sheet / (sheets - 1) if sheets > 1 else 0
+        for position, cell, align, dx in ((left, left_cell, "right", shift),
+                                          (right, right_cell, "left", -shift)):
+            if position is None:
+                continue
+            page_num = order[position]
+            rect = doc[page_num].rect
+            target = fit_rect(cell, rect.width, rect.height, align) + (dx, 0, dx, 0)
+            side.show_pdf_page(target, doc, page_num)
+            placements.setdefault(position, side_num)
+
+    annotate(pages=len(order), sheets=len(out))
+    return out, placements
+
+
+def remap_toc(toc, placements):
+    """
+    Marcadores para el documento impuesto. toc: [nivel, título, página] con
+    la página 1-based en el orden de page_order. Los niveles se ajustan para
+    que la jerarquía siga siendo válida si el orden de las caras cambia.
+    """
+    entries = []
+    for index, (lvl, title, page, *_) in enumerate(toc):
+        side = placements.get(page - 1)
+        if side is not None:
+            entries.append((side + 1, index, lvl, title))
+    entries.sort()
+
+    new_toc = []
+    previous = 0
+    for side, _, lvl, title in entries:
+        lvl = max(1, min(lvl, previous + 1))
+        new_toc.append([lvl, title, side])
+        previous = lvl
+    return new_toc
@@ -0,0 +1,252 @@
+"""
+Módulo de contabilidad de memoria.
+
+Lleva la cuenta de los bytes vivos por categoría (miniaturas, vista previa,
+estados originales de edición, caché de renderizado, documentos abiertos) y
+aplica un presupuesto global: cuando se supera, se pide a las cachés
+registradas que liberen entradas, empezando por las más baratas de rehacer.
+
+Opcionalmente usa tracemalloc para medir cuánta memoria deja cada operación
+registrada por las trazas (logic/tracing.py).
+"""
+import os
+import threading
+import weakref
+from collections import deque
+
+from logic.tracing import tracer
+
+# Presupuesto global por defecto (se puede cambiar con EASYPDF_MEMORY_BUDGET_MB)
+DEFAULT_BUDGET_MB = 512
+BUDGET_ENV = "EASYPDF_MEMORY_BUDGET_MB"
+TRACEMALLOC_ENV = "EASYPDF_TRACEMALLOC"
+
+# Categorías conocidas (se muestran en este orden)
+CATEGORIES = ('thumbnails', 'preview', 'edit_snapshots', 'render_cache', 'documents')
+
+# Operaciones con medición de tracemalloc que se conservan
+MAX_OPERATION_SNAPSHOTS = 50
+# Líneas de código con más memoria que se guardan por operación
+SNAPSHOT_TOP = 5
+# Se miden los spans hasta esta profundidad: el comando o acción de la
+# interfaz (0) y las operaciones que lanza directamente (1)
+SNAPSHOT_DEPTH = 1
+
+
+def _budget_from_environment():
+    try:
+        return int(float(os.environ[BUDGET_ENV]) * 1024 * 1024)
+    except (KeyError, ValueError):
+        return DEFAULT_BUDGET_MB * 1024 * 1024
+
+
+class MemoryAccountant:
+    """
+    Registro de bytes vivos por categoría y clave. Quien reserva memoria
+    llama a track(); quien la libera, a untrack(). Las cachés que pueden
+    soltar memoria se registran con register_evictor().
+    """
+
+    def __init__(self, budget_bytes=None):
+        self.budget_bytes = budget_bytes if budget_bytes is not None else _budget_from_environment()
+        self.entries = {}
+        self.evictions = 0
+        self.operation_snapshots = deque(maxlen=MAX_OPERATION_SNAPSHOTS)
+        self._totals = {}
+        self._evictors = []
+        self._lock = threading.RLock()
+        self._enforce_lock = threading.Lock()
+        self._probe = None
+
+    # =========================================================================
+    # CONTABILIDAD
+    # =========================================================================
+
+    def track(self, category, key, nbytes):
+        """Anota (o actualiza) los bytes de una entrada y aplica el presupuesto"""
+        with self._lock:
+            entries = self.entries.setdefault(category, {})
+            self._totals[category] = self._totals.get(category, 0) - entries.get(key, 0) + nbytes
+            entries[key] = nbytes
+        self.enforce()
+
+    def untrack(self, category, key):
+        """Retira una entrada liberada"""
+        with self._lock:
+            nbytes = self.entries.get(category, {}).pop(key, None)
+            if nbytes is not None:
+                self._totals[category] -= nbytes
+
+    def untrack_owner(self, category, owner):
+        """Retira las entradas con clave (owner, ...) de una categoría"""
+        with self._lock:
+            entries = self.entries.get(category, {})
+            for key in [key for key in entries if isinstance(key, tuple) and key[0] == owner]:
+                self._totals[category] -= entries.pop(key)
+
+    def untrack_all(self, category):
+        """Retira todas las entradas de una categoría"""
+        with self._lock:
+            self.entries.pop(category, None)
+            self._totals[category] = 0
+
+    def usage(self):
+        """Bytes vivos de cada categoría"""
+        with self._lock:
+            usage = {category: self._totals.get(category, 0) for category in CATEGORIES}
+            for category, total in self._totals.items():
+                usage.setdefault(category, total)
+            return usage
+
+    def total(self):
+        with self._lock:
+            return sum(self._totals.values())
+
+    # =========================================================================
+    # PRESUPUESTO
+    # =========================================================================
+
+    def register_evictor(self, evict, priority=0):
+        """
+        Registra una función evict(bytes_a_liberar) -> bytes liberados.
+        Se llama primero a las de menor prioridad. Si es un método, se
+        guarda una referencia débil para no mantener vivo su objeto.
+        """
+        if hasattr(evict, "__self__"):
+            ref = weakref.WeakMethod(evict)
+        else:
+            ref = lambda: evict
+        with self._lock:
+            self._evictors.append((priority, ref))
+            self._evictors.sort(key=lambda item: item[0])
+
+    def enforce(self):
+        """Libera memoria de las cachés hasta quedar dentro del presupuesto"""
+        if self.total() <= self.budget_bytes:
+            return
+        # Las cachés toman su propio lock: no llamarlas con el nuestro tomado
+        if not self._enforce_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                evictors = list(self._evictors)
+            for priority, ref in evictors:
+                excess = self.total() - self.budget_bytes
+                if excess <= 0:
+                    break
+                evict = ref()
+                if evict is None:
+                    with self._lock:
+                        self._evictors.remove((priority, ref))
+                    continue
+                if evict(excess):
+                    self.evictions += 1
+        finally:
+            self._enforce_lock.release()
+
+    def set_budget(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.enforce()
+
+    # =========================================================================
+    # TRACEMALLOC
+    # =========================================================================
+
+    @property
+    def tracemalloc_enabled(self):
+        return self._probe is not None
+
+    def start_tracemalloc(self, frames=1):
+        """
+        Empieza a medir con tracemalloc la memoria de cada operación de primer
+        nivel registrada por las trazas (que se activan si no lo estaban).
+        """
+        import tracemalloc
+
+        if self._probe is not None:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._probe = _TracemallocProbe(self)
+        tracer.probes.append(self._probe)
+        if not tracer.enabled:
+            tracer.start()
+
+    def stop_tracemalloc(self):
+        import tracemalloc
+
+        if self._probe is None:
+            return
+        tracer.probes.remove(self._probe)
+        self._probe = None
+        tracemalloc.stop()
+
+    def report(self):
+        """Estado actual: uso por categoría, presupuesto y operaciones medidas"""
+        return {
+            'budget_bytes': self.budget_bytes,
+            'total_bytes': self.total(),
+            'categories': self.usage(),
+            'evictions': self.evictions,
+            'operations': list(self.operation_snapshots),
+        }
+
+
+class _TracemallocProbe:
+    """Compara instantáneas de tracemalloc al abrir y cerrar los spans de primer nivel"""
+
+    def __init__(self, accountant):
+        self.accountant = accountant
+
+    def _snapshot(self):
+        import tracemalloc
+
+        # Sin las instantáneas anteriores, que también ocupan memoria
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+
+    def begin(self, span, depth):
+        if depth <= SNAPSHOT_DEPTH:
+            span['_snapshot'] = self._snapshot()
+
+    def end(self, span):
+        before = span.pop('_snapshot', None)
+        if before is None:
+            return
+        stats = self._snapshot().compare_to(before, "lineno")
+        net = sum(stat.size_diff for stat in stats)
+        span['args']['alloc_bytes'] = net
+        self.accountant.operation_snapshots.append({
+            'operation': span['name'],
+            'net_bytes': net,
+            'top': [(str(stat.traceback[0]), stat.size_diff)
+                    for stat in sorted(stats, key=lambda s: s.size_diff, reverse=True)[:SNAPSHOT_TOP]],
+        })
+
+
+# Contabilidad única del proceso
+memory = MemoryAccountant()
+
+
+def start_from_environment():
+    """Activa tracemalloc si EASYPDF_TRACEMALLOC está definida"""
+    if os.environ.get(TRACEMALLOC_ENV):
+        memory.start_tracemalloc()
+        return True
+    return False
+
+
+def format_report(report):
+    lines = [f"Memoria contabilizada: {report['total_bytes'] / 1048576:.1f} MB "
+             f"de {report['budget_bytes'] / 1048576:.0f} MB "
+             f"({report['evictions']} liberaciones por presupuesto)"]
+    for category, nbytes in report['categories'].items():
+        lines.append(f"  {category:<16} {nbytes / 1048576:10.2f} MB")
+    operations = sorted(report['operations'], key=lambda op: op['net_bytes'], reverse=True)
+    if operations:
+        lines.append("Operaciones que más memoria retienen (tracemalloc):")
+        for op in operations[:10]:
+            lines.append(f"  {op['net_bytes'] / 1024:10.1f} KB  {op['operation']}")
+            for location, size in op['top'][:3]:
+                lines.append(f"      {size / 1024:8.1f} KB  {location}")
+    return "\n".join(lines)
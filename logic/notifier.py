@@ -0,0 +1,23 @@
+"""
+Módulo para avisar al usuario desde la lógica sin depender de la interfaz.
+"""
+import logging
+
+logger = logging.getLogger("easypdf")
+
+
+class Notifier:
+    """
+    Recibe los avisos de la lógica (errores, advertencias, confirmaciones).
+    Por defecto los escribe en el log; la interfaz gráfica lo sustituye por
+    uno que muestra diálogos.
+    """
+
+    def info(self, title, message):
+        logger.info("%s: %s", title, message)
+
+    def warning(self, title, message):
+        logger.warning("%s: %s", title, message)
+
+    def error(self, title, message):
+        logger.error("%s: %s", title, message)
@@ -0,0 +1,373 @@
+"""
+Módulo para convertir documentos de oficina a PDF con un grupo de
+instancias de LibreOffice en modo headless.
+"""
+import hashlib
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+# Posibles ubicaciones de LibreOffice
+SOFFICE_PATHS = [
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    "/usr/bin/soffice",  # Linux
+    "/usr/bin/libreoffice",  # Linux alternativo
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",  # macOS
+]
+
+# Filtro de exportación para documentos de texto (.doc, .docx, .odt, .rtf)
+PDF_EXPORT_FILTER = "writer_pdf_Export"
+
+# Tiempo máximo para que una instancia nueva acepte conexiones
+STARTUP_TIMEOUT = 30
+
+CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
+
+def find_soffice():
+    """Retorna la ruta del ejecutable de LibreOffice o None"""
+    for path in SOFFICE_PATHS:
+        if os.path.exists(path):
+            return path
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+def _uno_available():
+    try:
+        import uno  # noqa: F401  (solo existe con el Python de LibreOffice)
+        return True
+    except ImportError:
+        return False
+
+
+class LibreOfficeInstance:
+    """
+    Una instancia de LibreOffice con su propio perfil de usuario.
+
+    Si el módulo `uno` está disponible, la instancia queda arrancada y
+    recibe los documentos por un pipe UNO (sin coste de arranque por
+    documento). Si no, cada conversión lanza `soffice --convert-to`, pero
+    reutilizando un perfil ya inicializado y sin bloquear a las demás
+    instancias.
+    """
+
+    def __init__(self, soffice_exe, timeout=60):
+        self.soffice_exe = soffice_exe
+        self.timeout = timeout
+        self.jobs_done = 0
+        self.profile_dir = tempfile.mkdtemp(prefix="easypdf-lo-")
+        self.use_uno = _uno_available()
+        self._process = None
+        self._desktop = None
+        self._pipe_name = f"easypdf_{uuid.uuid4().hex}"
+
+    @property
+    def profile_url(self):
+        path = self.profile_dir.replace("\\", "/")
+        return "file:///" + path.lstrip("/")
+
+    def convert(self, doc_path, output_dir):
+        """Convierte un documento y retorna la ruta del PDF o None"""
+        base_name = os.path.splitext(os.path.basename(doc_path))[0]
+        pdf_path = os.path.join(output_dir, base_name + ".pdf")
+
+        if self.use_uno:
+            self._convert_uno(doc_path, pdf_path)
+        else:
+            self._convert_cli(doc_path, output_dir)
+
+        self.jobs_done += 1
+        return pdf_path if os.path.exists(pdf_path) else None
+
+    def close(self):
+        """Termina el proceso y elimina el perfil"""
+        self._desktop = None
+        if self._process and self._process.poll() is None:
+            _kill_process_tree(self._process)
+        self._process = None
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    # -------------------------------------------------------------------------
+    # Conversión por línea de comandos
+    # -------------------------------------------------------------------------
+
+    def _convert_cli(self, doc_path, output_dir):
+        cmd = [
+            self.soffice_exe,
+            f"-env:UserInstallation={self.profile_url}",
+            "--headless", "--norestore", "--nologo",
+            "--convert-to", "pdf",
+            "--outdir", output_dir,
+            doc_path
+        ]
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=CREATION_FLAGS,
+            start_new_session=(os.name != 'nt')
+        )
+        try:
+            process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            _kill_process_tree(process)
+            raise
+
+    # -------------------------------------------------------------------------
+    # Conversión con una instancia residente (UNO)
+    # -------------------------------------------------------------------------
+
+    def _convert_uno(self, doc_path, pdf_path):
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+
+        desktop = self._ensure_started()
+
+        # Si la llamada UNO se cuelga, matar el proceso la desbloquea
+        watchdog = threading.Timer(self.timeout, self._kill_hung)
+        watchdog.start()
+        try:
+            document = desktop.loadComponentFromURL(
+                uno.systemPathToFileUrl(os.path.abspath(doc_path)), "_blank", 0,
+                (prop("Hidden", True), prop("ReadOnly", True)))
+            try:
+                document.storeToURL(
+                    uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                    (prop("FilterName", PDF_EXPORT_FILTER),))
+            finally:
+                document.close(True)
+        finally:
+            watchdog.cancel()
+
+        if self._process is None:
+            raise subprocess.TimeoutExpired(doc_path, self.timeout)
+
+    def _ensure_started(self):
+        """Arranca la instancia residente si no está en marcha"""
+        if self._desktop is not None and self._process and self._process.poll() is None:
+            return self._desktop
+
+        import uno
+
+        self._process = subprocess.Popen(
+            [
+                self.soffice_exe,
+                f"-env:UserInstallation={self.profile_url}",
+                "--headless", "--invisible", "--norestore", "--nologo",
+                "--nodefault", "--nofirststartwizard",
+                f"--accept=pipe,name={self._pipe_name};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=CREATION_FLAGS,
+            start_new_session=(os.name != 'nt')
+        )
+
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local)
+        url = f"uno:pipe,name={self._pipe_name};urp;StarOffice.ComponentContext"
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                ctx = resolver.resolve(url)
+                break
+            except Exception:
+                if time.monotonic() > deadline or self._process.poll() is not None:
+                    self.close()
+                    raise RuntimeError("LibreOffice no aceptó la conexión")
+                time.sleep(0.2)
+
+        self._desktop = ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", ctx)
+        return self._desktop
+
+    def _kill_hung(self):
+        if self._process:
+            _kill_process_tree(self._process)
+        self._process = None
+        self._desktop = None
+
+
+class LibreOfficePool:
+    """
+    Grupo de instancias de LibreOffice, cada una con su perfil aislado,
+    que convierten documentos en paralelo. Las instancias se reciclan
+    tras max_jobs conversiones o cuando una conversión se cuelga.
+    """
+
+    def __init__(self, soffice_exe=None, size=None, max_jobs=50, timeout=60):
+        self.soffice_exe = soffice_exe or find_soffice()
+        self.size = size or max(1, min(4, os.cpu_count() or 1))
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+
+        # LIFO: reutilizar la instancia más caliente. Un None avisa a quien
+        # espera de que hay un hueco para crear una instancia
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Las instancias se terminan al cerrar el pool, al liberarlo o al
+        # salir del programa (sin que atexit lo mantenga vivo hasta entonces)
+        self._finalizer = weakref.finalize(self, _close_instances, self._all)
+
+    @property
+    def available(self):
+        return self.soffice_exe is not None
+
+    def identity(self):
+        """
+        Identifica el conversor y su versión (para la caché de conversiones).
+        Usa el archivo de versión de la instalación o, si no existe, la
+        fecha y tamaño del ejecutable, que cambian al actualizar.
+        """
+        if not self.available:
+            return "libreoffice:none"
+
+        exe = os.path.realpath(self.soffice_exe)
+        program_dir = os.path.dirname(exe)
+        for name in ("versionrc", "version.ini"):
+            version_file = os.path.join(program_dir, name)
+            try:
+                with open(version_file, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:16]
+                return f"libreoffice:{exe}:{digest}"
+            except OSError:
+                continue
+
+        try:
+            stat = os.stat(exe)
+            return f"libreoffice:{exe}:{stat.st_size}:{int(stat.st_mtime)}"
+        except OSError:
+            return f"libreoffice:{exe}"
+
+    def convert(self, doc_path, output_dir):
+        """
+        Convierte un documento con la primera instancia libre.
+        Se puede llamar desde varios hilos a la vez.
+        Retorna la ruta del PDF o None.
+        """
+        if not self.available:
+            return None
+
+        instance = self._acquire()
+        healthy = True
+        try:
+            return instance.convert(doc_path, output_dir)
+        except Exception:
+            healthy = False
+            return None
+        finally:
+            self._release(instance, healthy)
+
+    def close(self):
+        """Termina todas las instancias"""
+        with self._lock:
+            self._closed = True
+        self._finalizer()
+
+    def _new_instance(self):
+        """
+        Crea una instancia para un hueco ya contado en _created. Si falla,
+        libera el hueco y despierta a quien espere para que lo intente él.
+        """
+        try:
+            instance = LibreOfficeInstance(self.soffice_exe, self.timeout)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self._all.append(instance)
+        return instance
+
+    def _acquire(self):
+        while True:
+            try:
+                instance = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    create = self._created < self.size
+                    if create:
+                        self._created += 1
+                if create:
+                    return self._new_instance()
+                instance = self._idle.get()
+            if instance is not None:
+                return instance
+
+    def _release(self, instance, healthy):
+        if healthy and instance.jobs_done < self.max_jobs and not self._closed:
+            self._idle.put(instance)
+            return
+
+        # Reciclar: cerrar la instancia y poner otra nueva en su lugar
+        instance.close()
+        with self._lock:
+            if instance in self._all:
+                self._all.remove(instance)
+            if self._closed:
+                self._created -= 1
+                return
+        self._idle.put(self._new_instance())
+
+
+def _close_instances(instances):
+    """Termina las instancias de un pool (lista compartida con el pool)"""
+    while instances:
+        instances.pop().close()
+
+
+# Pool compartido por todo el proceso (se crea al usarlo)
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """
+    Pool de LibreOffice del proceso: todas las sesiones y trabajos lo
+    reutilizan, así que las instancias siguen calientes entre uno y otro.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = LibreOfficePool()
+        return _shared_pool
+
+
+def _kill_process_tree(process):
+    """Mata un proceso de LibreOffice junto con sus hijos (soffice.bin)"""
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           capture_output=True, creationflags=CREATION_FLAGS)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except Exception:
+        try:
+            process.kill()
+        except Exception:
+            pass
+    try:
+        process.wait(timeout=5)
+    except Exception:
+        pass
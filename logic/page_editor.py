@@ -1,9 +1,16 @@
 """
 Módulo para edición de páginas: rotación, redimensionado, márgenes y B/N.
 """
+import weakref
+
 import fitz  # PyMuPDF
 
+from logic.memory import memory
+from logic.render_cache import render_cache
+from logic.tracing import annotate, traced_class
+
 
+@traced_class("page_editor")
 class PageEditor:
     """Maneja las operaciones de edición de páginas del PDF"""
 
@@ -13,6 +20,10 @@ class PageEditor:
         self.pending_transforms = {}
         # Almacena el estado original de las páginas para preview
         self.original_states = {}
+        # Si falta memoria, las imágenes originales se descartan (la vista
+        # "antes" muestra entonces la página actual)
+        memory.register_evictor(self._evict_original_images, priority=1)
+        weakref.finalize(self, memory.untrack_owner, 'edit_snapshots', id(self))
 
     def save_original_state(self, doc, page_num):
         """Guarda el estado original de una página para comparación"""
@@ -34,26 +45,49 @@ class PageEditor:
             'original_rotation': page.rotation,
             'original_rect': page.rect
         }
+        memory.track('edit_snapshots', (id(self), page_num),
+                     len(self.original_states[page_num]['pixmap_bytes']))
 
     def get_original_pixmap_data(self, page_num):
         """Obtiene los datos del pixmap original de una página"""
-        return self.original_states.get(page_num)
+        state = self.original_states.get(page_num)
+        if state and state['pixmap_bytes'] is None:
+            return None  # Imagen descartada por falta de memoria
+        return state
 
     def clear_original_state(self, page_num):
         """Limpia el estado original de una página"""
         if page_num in self.original_states:
             del self.original_states[page_num]
+            memory.untrack('edit_snapshots', (id(self), page_num))
 
-    def rotate_page(self, doc, page_num, direction):
+    def _evict_original_images(self, nbytes):
+        """
+        Descarta imágenes originales hasta liberar nbytes. Se conserva el
+        resto del estado (rotación y tamaño originales).
+        """
+        freed = 0
+        for page_num, state in self.original_states.items():
+            if freed >= nbytes:
+                break
+            if state['pixmap_bytes'] is not None:
+                freed += len(state['pixmap_bytes'])
+                state['pixmap_bytes'] = None
+                memory.untrack('edit_snapshots', (id(self), page_num))
+        return freed
+
+    def rotate_page(self, doc, page_num, direction, keep_original=True):
         """
         Rota una página 90 grados.
         direction: 'left' (-90) o 'right' (+90)
+        keep_original: guardar el estado previo para la vista "antes/después"
         """
         if not doc or page_num < 0 or page_num >= len(doc):
             return False
 
         # Guardar estado original antes de la primera modificación
-        self.save_original_state(doc, page_num)
+        if keep_original:
+            self.save_original_state(doc, page_num)
 
         page = doc[page_num]
         current_rotation = page.rotation
@@ -66,6 +100,22 @@ class PageEditor:
         page.set_rotation(new_rotation)
         return True
 
+    def crop_page(self, doc, page_num, cropbox, keep_original=True):
+        """
+        Recorta una página fijando su cropbox (en coordenadas del mediabox,
+        como Page.set_cropbox). El contenido no se rasteriza.
+        """
+        if not doc or page_num < 0 or page_num >= len(doc):
+            return False
+
+        if keep_original:
+            self.save_original_state(doc, page_num)
+
+        page = doc[page_num]
+        page.set_cropbox(cropbox)
+        render_cache.discard_page(doc, page.xref)
+        return True
+
     def get_page_rotation(self, doc, page_num):
         """Obtiene la rotación actual de una página"""
         if not doc or page_num < 0 or page_num >= len(doc):
@@ -164,6 +214,22 @@ class PageEditor:
         """Comprueba si hay transformaciones pendientes"""
         return bool(self.pending_transforms)
 
+    def remap_pages(self, order):
+        """
+        Traslada las transformaciones pendientes al nuevo orden, como
+        Document.select(order): la nueva página i es la antigua order[i].
+        Las copias de una página reciben sus mismas transformaciones y las
+        de páginas eliminadas se descartan. Los estados originales (solo
+        para la vista "antes") no se trasladan.
+        """
+        transforms = {}
+        for new_page, old_page in enumerate(order):
+            if old_page in self.pending_transforms:
+                transforms[new_page] = dict(self.pending_transforms[old_page])
+        self.pending_transforms = transforms
+        for page_num in list(self.original_states):
+            self.clear_original_state(page_num)
+
     def apply_all_transforms(self, doc):
         """
         Aplica todas las transformaciones pendientes al documento.
@@ -172,6 +238,8 @@ class PageEditor:
         if not doc:
             return
 
+        annotate(pages=len(self.pending_transforms))
+
         # Procesar páginas en orden inverso para no afectar índices
         for page_num in sorted(self.pending_transforms.keys(), reverse=True):
             if page_num >= len(doc):
@@ -191,6 +259,8 @@ class PageEditor:
 
         # Limpiar transformaciones y estados originales después de aplicar
         self.pending_transforms = {}
+        for page_num in self.original_states:
+            memory.untrack('edit_snapshots', (id(self), page_num))
         self.original_states = {}
 
     def _apply_transforms_to_page(self, doc, page_num, scale, grayscale, margins):
@@ -233,9 +303,10 @@ class PageEditor:
             margins['top'] + content_height
         )
 
-        # Limpiar la página actual
+        # Limpiar la página actual (el cropbox se toma del mediabox ya
+        # guardado: con new_rect, el redondeo puede dejarlo fuera por décimas)
         page.set_mediabox(new_rect)
-        page.set_cropbox(new_rect)
+        page.set_cropbox(page.mediabox)
         page.clean_contents()
 
         # Rellenar fondo blanco
@@ -246,6 +317,7 @@ class PageEditor:
 
         # Insertar la imagen renderizada en el área de contenido
         page.insert_image(content_rect, stream=img_bytes)
+        render_cache.discard_page(doc, page.xref)
 
     def get_preview_with_transforms(self, doc, page_num, preview_scale=0.5):
         """
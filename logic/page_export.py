@@ -0,0 +1,106 @@
+"""
+Módulo para exportar páginas como imágenes (PNG, JPEG, WebP o TIFF).
+
+Cada página se renderiza como en PDFHandler.get_page_pixmap (matriz de
+escala dpi/72, RGB y sin transparencia) y la escribe el mismo proceso
+trabajador que la renderiza, así que al proceso principal solo vuelve un
+resumen. Como mucho hay unas pocas páginas en vuelo por trabajador, de modo
+que la memoria no depende del número de páginas.
+"""
+import os
+import time
+
+from logic.workers import BackgroundJob, cached_document, process_map
+
+# Formato -> (formato de PIL, extensión, opciones de guardado)
+FORMATS = {
+    'png': ("PNG", "png", {}),
+    'jpeg': ("JPEG", "jpg", {'optimize': True}),
+    'webp': ("WEBP", "webp", {'method': 4}),
+    'tiff': ("TIFF", "tif", {'compression': "tiff_deflate"}),
+}
+DEFAULT_FORMAT = 'png'
+DEFAULT_DPI = 150
+DEFAULT_QUALITY = 85
+# Resolución máxima admitida (una página A4 a 1200 ppp ocupa ~400 MB en RGB)
+MAX_DPI = 1200
+
+
+def output_path(output_dir, base_name, number, image_format):
+    """Nombre de la imagen de una página: base_0001.png"""
+    return os.path.join(output_dir, f"{base_name}_{number:04d}.{FORMATS[image_format][1]}")
+
+
+def build_tasks(source, positions, output_dir, page_order=None, base_name=None,
+                image_format=DEFAULT_FORMAT, dpi=DEFAULT_DPI, quality=DEFAULT_QUALITY):
+    """
+    Prepara una tarea por página. positions son posiciones 0-based del orden
+    final (page_order las traduce a páginas del archivo); las imágenes se
+    numeran por posición.
+    """
+    if image_format not in FORMATS:
+        raise ValueError(f"Formato no admitido: {image_format}")
+    if not 1 <= dpi <= MAX_DPI:
+        raise ValueError(f"La resolución debe estar entre 1 y {MAX_DPI} ppp")
+    base_name = base_name or os.path.splitext(os.path.basename(source))[0]
+    return [{
+        'source': source,
+        'page': page_order[position] if page_order else position,
+        'output': output_path(output_dir, base_name, position + 1, image_format),
+        'format': image_format,
+        'dpi': dpi,
+        'quality': quality,
+    } for position in positions]
+
+
+def export_page(task):
+    """
+    Renderiza y escribe una página. Se ejecuta en un proceso trabajador:
+    recibe y retorna solo datos serializables.
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    start = time.perf_counter()
+    result = {'output': task['output'], 'page': task['page'], 'ok': False}
+    try:
+        doc = cached_document(task['source'])
+        scale = task['dpi'] / 72
+        pix = doc[task['page']].get_pixmap(matrix=fitz.Matrix(scale, scale))
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        del pix
+
+        pil_format, _, options = FORMATS[task['format']]
+        options = dict(options, dpi=(task['dpi'], task['dpi']))
+        if task['format'] in ('jpeg', 'webp'):
+            options['quality'] = task['quality']
+        img.save(task['output'], pil_format, **options)
+        result['ok'] = True
+        result['bytes'] = os.path.getsize(task['output'])
+        result['size'] = img.size
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def export_pages(tasks, jobs=None, cancel=None):
+    """
+    Exporta las páginas en paralelo. Produce el resultado de cada una en
+    orden: {'output', 'page', 'ok', 'bytes' o 'error', 'seconds'}.
+    cancel es un threading.Event opcional para abandonar lo que quede.
+    """
+    if tasks:
+        os.makedirs(os.path.dirname(os.path.abspath(tasks[0]['output'])), exist_ok=True)
+    for task, result, error in process_map(export_page, tasks, jobs, cancel):
+        if error is not None:
+            result = {'output': task['output'], 'page': task['page'], 'ok': False,
+                      'error': str(error), 'seconds': 0.0}
+        yield result
+
+
+class ExportJob(BackgroundJob):
+    """Exportación en un hilo aparte, para la interfaz"""
+
+    def __init__(self, make_tasks, jobs=None):
+        super().__init__(make_tasks, export_pages, jobs, name="export")
@@ -1,29 +1,43 @@
 """
 Módulo para manejo del orden de páginas.
 """
+from logic.tracing import annotate, traced_class
 
 
+@traced_class("page_order")
 class PageOrderManager:
     """Maneja el reordenamiento de páginas del PDF"""
 
     def __init__(self):
         self.page_order = []
+        # Páginas que tiene el documento (puede haber más que posiciones si
+        # se han eliminado algunas)
+        self.page_count = 0
 
     def initialize(self, num_pages):
         """Inicializa el orden con las páginas del documento"""
         self.page_order = list(range(num_pages))
+        self.page_count = num_pages
 
     def get_order(self):
         """Retorna el orden actual de páginas"""
         return self.page_order
 
-    def set_order(self, order):
-        """Establece un orden específico"""
+    def set_order(self, order, page_count=None):
+        """
+        Establece un orden específico. page_count es el número de páginas
+        del documento; si no se indica, se deduce del orden.
+        """
         self.page_order = order
+        if page_count is None:
+            page_count = max(order) + 1 if order else 0
+        self.page_count = page_count
 
     def extend(self, new_pages):
         """Añade nuevas páginas al final"""
         self.page_order.extend(new_pages)
+        if self.page_order:
+            self.page_count = max(self.page_count, max(self.page_order) + 1)
 
     def move_up(self, idx):
         """Mueve una página una posición hacia arriba"""
@@ -41,39 +55,116 @@ class PageOrderManager:
             return True
         return False
 
+    # =========================================================================
+    # ELIMINAR, DUPLICAR E INSERTAR
+    # Solo cambian el orden: el documento se modifica al guardar, con un único
+    # Document.select. Las posiciones son índices 0-based del orden actual.
+    # =========================================================================
+
+    def delete(self, positions):
+        """Elimina las páginas en esas posiciones. Retorna cuántas se eliminaron"""
+        positions = {p for p in positions if 0 <= p < len(self.page_order)}
+        if len(positions) >= len(self.page_order):
+            raise ValueError("No se pueden eliminar todas las páginas")
+        if positions:
+            self.page_order = [page for pos, page in enumerate(self.page_order) if pos not in positions]
+        return len(positions)
+
+    def duplicate(self, positions):
+        """
+        Duplica las páginas en esas posiciones; cada copia queda justo
+        después de su original. Retorna las posiciones de las copias.
+        """
+        positions = {p for p in positions if 0 <= p < len(self.page_order)}
+        if not positions:
+            return []
+        new_order, copies = [], []
+        for pos, page in enumerate(self.page_order):
+            new_order.append(page)
+            if pos in positions:
+                copies.append(len(new_order))
+                new_order.append(page)
+        self.page_order = new_order
+        return copies
+
+    def insert_blank(self, doc, position, count=1, width=None, height=None):
+        """
+        Inserta páginas en blanco en la posición indicada. Se añaden al final
+        del documento y solo se colocan en su sitio al guardar. Si no se
+        indica el tamaño se usa el de la página vecina (o A4).
+        Retorna las páginas del documento añadidas.
+        """
+        position = max(0, min(position, len(self.page_order)))
+        if width is None or height is None:
+            if self.page_order:
+                neighbour = doc[self.page_order[min(position, len(self.page_order) - 1)]].rect
+                width, height = neighbour.width, neighbour.height
+            else:
+                width, height = 595, 842  # A4
+
+        first = len(doc)
+        for _ in range(count):
+            doc.new_page(-1, width=width, height=height)
+        new_pages = list(range(first, len(doc)))
+        self.page_order[position:position] = new_pages
+        self.page_count = len(doc)
+        return new_pages
+
+    # =========================================================================
+    # APLICAR
+    # =========================================================================
+
     def has_changes(self):
         """Comprueba si el orden ha cambiado respecto al original"""
-        return self.page_order != list(range(len(self.page_order)))
+        return self.page_order != list(range(self.page_count))
+
+    def page_mapping(self):
+        """Página del documento -> primera posición en la que aparece (1-indexed, como el TOC)"""
+        mapping = {}
+        for new_pos, old_page in enumerate(self.page_order):
+            mapping.setdefault(old_page + 1, new_pos + 1)
+        return mapping
+
+    def remap_toc(self, toc):
+        """
+        Traduce las páginas de los marcadores al nuevo orden, en una sola
+        pasada. Los marcadores de páginas eliminadas se descartan; los de
+        páginas duplicadas apuntan a la primera copia.
+        """
+        page_mapping = self.page_mapping()
+        new_toc = [[lvl, title, page_mapping[old_page]]
+                   for lvl, title, old_page, *_ in toc if old_page in page_mapping]
+        # Ordenar TOC por nueva página
+        new_toc.sort(key=lambda x: (x[2], x[0]))
+        return new_toc
 
     def apply_reorder(self, doc, toc):
         """
-        Aplica el reordenamiento de páginas al documento y actualiza marcadores.
-        Retorna el TOC actualizado.
+        Aplica el orden (con eliminaciones y duplicados) al documento y
+        actualiza marcadores. Retorna el TOC actualizado.
         """
         if not self.has_changes():
             return toc
 
-        # Crear mapeo de página original -> nueva posición
-        page_mapping = {}
-        for new_pos, old_page in enumerate(self.page_order):
-            page_mapping[old_page + 1] = new_pos + 1  # TOC usa 1-indexed
+        new_toc = self.remap_toc(toc)
 
-        # Actualizar números de página en el TOC
-        new_toc = []
-        for lvl, title, old_page in toc:
-            if old_page in page_mapping:
-                new_toc.append([lvl, title, page_mapping[old_page]])
+        # Document.select repite el mismo objeto página en las duplicadas;
+        # se hacen antes copias reales para poder transformarlas por separado
+        order = list(self.page_order)
+        seen = set()
+        for pos, page in enumerate(order):
+            if page in seen:
+                doc.fullcopy_page(page)
+                order[pos] = len(doc) - 1
             else:
-                new_toc.append([lvl, title, old_page])
-
-        # Ordenar TOC por nueva página
-        new_toc.sort(key=lambda x: (x[2], x[0]))
+                seen.add(page)
 
         # Reordenar las páginas del documento
-        doc.select(self.page_order)
+        doc.select(order)
+        annotate(pages=len(order), copies=len(order) - len(seen))
 
         # Resetear orden después de aplicar
-        self.page_order = list(range(len(doc)))
+        self.initialize(len(doc))
 
         return new_toc
 
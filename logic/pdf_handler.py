@@ -2,41 +2,68 @@
 Módulo para manejo de archivos PDF: carga, guardado y fusión.
 """
 import os
-import subprocess
 import tempfile
+import time
+import weakref
 import fitz  # PyMuPDF
-from tkinter import filedialog, messagebox
 
+from logic.conversion_cache import ConversionCache
+from logic.image_import import iter_image_pages, prepare_image
+from logic.memory import memory
+from logic.notifier import Notifier
+from logic.office_converter import shared_pool
+from logic.perf_stats import perf_stats
+from logic.render_cache import render_cache
+from logic.resource_dedup import ResourceDeduplicator
+from logic.tracing import annotate, traced_class
+from logic.workers import ordered_map
 
+# Identidad en la caché de las conversiones hechas con Microsoft Word
+# (docx2pdf y COM usan el mismo motor)
+WORD_CONVERTER = "word"
+
+
+@traced_class("pdf_handler")
 class PDFHandler:
     """Maneja las operaciones de archivos PDF"""
 
-    def __init__(self):
+    def __init__(self, notifier=None):
         self.doc = None
-
-    def load(self):
+        # Avisos al usuario (diálogos en la interfaz, log en modo consola)
+        self.notifier = notifier or Notifier()
+        # Unifica fuentes, imágenes y perfiles de color repetidos al fusionar
+        self.deduplicator = ResourceDeduplicator()
+        # PDFs ya convertidos, para no repetir conversiones
+        self.conversion_cache = ConversionCache()
+        weakref.finalize(self, memory.untrack, 'documents', id(self))
+
+    @property
+    def office_pool(self):
+        """Instancias de LibreOffice para convertir documentos (compartidas por el proceso)"""
+        return shared_pool()
+
+    def load(self, path):
         """Carga un archivo PDF y retorna el documento y su TOC"""
-        path = filedialog.askopenfilename(filetypes=[("PDF", "*.pdf")])
         if not path:
             return None, None
 
-        self.doc = fitz.open(path)
-        toc = self.doc.get_toc()
-        return self.doc, toc
+        doc = self.open_document(path)
+        return doc, self.get_toc(doc)
 
-    def merge(self, current_doc, current_toc, current_page_order):
+    def open_document(self, path):
         """
-        Fusiona otro PDF con el actual (método legacy).
-        Retorna: (doc, toc, page_order) actualizados o None si se cancela
+        Abre un PDF sin leer su índice, que en documentos grandes es lento.
+        Permite mostrar la primera página antes de cargar el resto.
         """
-        path = filedialog.askopenfilename(
-            title="Selecciona PDF para fusionar",
-            filetypes=[("PDF", "*.pdf")]
-        )
-        if not path:
-            return None
+        self.doc = fitz.open(path)
+        self.deduplicator.reset()
+        # Estimación: el tamaño del archivo abierto
+        memory.track('documents', id(self), os.path.getsize(path) if os.path.isfile(path) else 0)
+        return self.doc
 
-        return self.merge_single(current_doc, current_toc, current_page_order, path)
+    def get_toc(self, doc):
+        """Lee el índice (marcadores) del documento"""
+        return doc.get_toc() if doc else []
 
     def merge_single(self, current_doc, current_toc, current_page_order, path):
         """
@@ -46,18 +73,20 @@ class PDFHandler:
         try:
             new_doc = fitz.open(path)
         except Exception as e:
-            messagebox.showerror("Error", f"No se pudo abrir el PDF:\n{e}")
+            self.notifier.error("Error", f"No se pudo abrir el PDF:\n{e}")
             return None
 
         if not current_doc:
             # Si no hay documento cargado, este se convierte en el principal
             self.doc = new_doc
+            self.deduplicator.reset()
             toc = new_doc.get_toc()
             page_order = list(range(len(new_doc)))
             return self.doc, toc, page_order
 
         # Fusionar: añadir páginas del nuevo documento
         current_page_count = len(current_doc)
+        first_xref = current_doc.xref_length()
 
         # Obtener TOC del nuevo documento y ajustar números de página
         new_toc = new_doc.get_toc()
@@ -68,6 +97,9 @@ class PDFHandler:
         # Insertar todas las páginas del nuevo documento
         current_doc.insert_pdf(new_doc)
 
+        # Compartir los recursos que ya existían en el documento
+        self.deduplicator.process(current_doc, current_page_count, first_xref)
+
         # Actualizar el orden de páginas
         new_pages = list(range(current_page_count, len(current_doc)))
         current_page_order.extend(new_pages)
@@ -76,9 +108,11 @@ class PDFHandler:
 
         return current_doc, current_toc, current_page_order
 
-    def add_images_as_pages(self, current_doc, current_page_order, image_paths):
+    def add_images_as_pages(self, current_doc, current_page_order, image_paths, max_dpi=None):
         """
         Añade imágenes como nuevas páginas al PDF.
+        Las imágenes se leen y preparan en hilos trabajadores y se insertan
+        sin recodificar (salvo que superen max_dpi).
         Retorna: (doc, page_order, added_count) o None si falla
         """
         if not image_paths:
@@ -92,69 +126,123 @@ class PDFHandler:
 
         added_count = 0
 
-        for img_path in image_paths:
+        prepared_images = ordered_map(lambda path: prepare_image(path, max_dpi), image_paths)
+        for img_path, prepared, error in prepared_images:
+            current_page_count = len(current_doc)
             try:
-                # Abrir la imagen con PyMuPDF
-                img_doc = fitz.open(img_path)
-
-                # Convertir imagen a PDF
-                # PyMuPDF puede manejar imágenes directamente
-                pdf_bytes = img_doc.convert_to_pdf()
-                img_doc.close()
+                self._insert_image_file(current_doc, img_path, prepared, error, max_dpi)
+                added_count += 1
+            except Exception as e:
+                self.notifier.warning("Aviso", f"No se pudo añadir la imagen:\n{img_path}\n\nError: {e}")
 
-                # Abrir los bytes como documento PDF
-                img_pdf = fitz.open("pdf", pdf_bytes)
+            # Actualizar orden de páginas (incluye las de un TIFF incompleto)
+            current_page_order.extend(range(current_page_count, len(current_doc)))
 
-                # Obtener tamaño de página actual
-                current_page_count = len(current_doc)
+        if added_count > 0:
+            return current_doc, current_page_order, added_count
 
-                # Insertar la página de imagen
-                current_doc.insert_pdf(img_pdf)
+        return None
 
-                img_pdf.close()
+    def _insert_image_file(self, doc, img_path, prepared, error, max_dpi):
+        """Inserta todas las páginas de un archivo de imagen ya preparado"""
+        if error is None and prepared.get('streamed'):
+            # TIFF multipágina o imagen enorme: fotograma a fotograma
+            for frame in iter_image_pages(img_path, max_dpi):
+                self._insert_image_page(doc, frame)
+            return
 
-                # Actualizar orden de páginas
-                new_pages = list(range(current_page_count, len(current_doc)))
-                current_page_order.extend(new_pages)
+        try:
+            if error is not None:
+                raise error
+            self._insert_image_page(doc, prepared)
+        except Exception:
+            # Formato que no se puede insertar directamente
+            self._insert_image_via_pdf(doc, img_path)
 
-                added_count += 1
+    def _insert_image_page(self, doc, prepared):
+        """Crea una página del tamaño de la imagen e inserta su stream original"""
+        page = doc.new_page(width=prepared['width'], height=prepared['height'])
+        try:
+            if 'strips' in prepared:
+                width, height = prepared['width'], prepared['height']
+                for top, bottom, data in prepared['strips']:
+                    rect = fitz.Rect(0, top * height, width, bottom * height)
+                    xref = page.insert_image(rect, stream=data, keep_proportion=False)
+                    self._compress_image_stream(doc, xref)
+            else:
+                page.insert_image(page.rect, stream=prepared['data'], rotate=prepared['rotate'])
+        except Exception:
+            doc.delete_page(-1)
+            raise
 
-            except Exception as e:
-                messagebox.showwarning("Aviso", f"No se pudo añadir la imagen:\n{img_path}\n\nError: {e}")
-                continue
+    def _compress_image_stream(self, doc, xref):
+        """
+        Comprime al momento un stream de imagen que MuPDF guardó sin
+        comprimir, para que la memoria no crezca con cada franja.
+        """
+        if doc.xref_get_key(xref, "Filter")[0] != "null":
+            return
+        doc.update_stream(xref, doc.xref_stream_raw(xref), compress=True)
 
-        if added_count > 0:
-            return current_doc, current_page_order, added_count
+    def _insert_image_via_pdf(self, doc, img_path):
+        """Inserta una imagen convirtiéndola antes a PDF con MuPDF"""
+        img_doc = fitz.open(img_path)
+        pdf_bytes = img_doc.convert_to_pdf()
+        img_doc.close()
 
-        return None
+        img_pdf = fitz.open("pdf", pdf_bytes)
+        doc.insert_pdf(img_pdf)
+        img_pdf.close()
 
-    def save(self, doc, toc):
-        """Guarda el PDF con el TOC actualizado"""
+    def save(self, doc, toc, out, options=None):
+        """
+        Guarda el PDF con el TOC actualizado en la ruta out.
+        options son opciones adicionales de Document.save (garbage, clean...).
+        """
         if not doc:
-            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            self.notifier.warning("Aviso", "No hay ningún PDF cargado")
             return False
 
         try:
             doc.set_toc(toc)
         except ValueError as e:
-            messagebox.showerror("Error", f"Error en la jerarquía de marcadores:\n{e}")
+            self.notifier.error("Error", f"Error en la jerarquía de marcadores:\n{e}")
             return False
 
-        out = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
         if out:
-            doc.save(out)
-            messagebox.showinfo("OK", "PDF guardado correctamente")
+            # deflate comprime los streams que se insertaron sin comprimir
+            save_options = {'deflate': True}
+            save_options.update(options or {})
+            doc.save(out, **save_options)
+            # Con garbage, MuPDF puede renumerar los objetos del documento:
+            # las miniaturas y el índice de recursos repetidos ya no valen
+            render_cache.discard_document(doc)
+            if save_options.get('garbage'):
+                self.deduplicator.reset()
+            annotate(pages=len(doc), bytes=os.path.getsize(out))
+            self.notifier.info("OK", "PDF guardado correctamente")
             return True
         return False
 
     def get_page_pixmap(self, doc, page_num, scale=1.0):
-        """Obtiene el pixmap de una página con escala"""
+        """
+        Obtiene el pixmap de una página con escala. Las páginas ya
+        renderizadas a esa escala se toman de la caché; el pixmap devuelto
+        es compartido y no se debe modificar.
+        """
         if not doc or page_num < 0 or page_num >= len(doc):
             return None
 
         page = doc[page_num]
-        mat = fitz.Matrix(scale, scale)
-        return page.get_pixmap(matrix=mat)
+        pix = render_cache.get(doc, page, scale)
+        if pix is None:
+            start = time.perf_counter()
+            mat = fitz.Matrix(scale, scale)
+            pix = page.get_pixmap(matrix=mat)
+            perf_stats.record("pdf_handler.get_page_pixmap", time.perf_counter() - start,
+                              f"página {page_num + 1} a {scale:.2f}x")
+            render_cache.put(doc, page, scale, pix)
+        return pix
 
     def get_page_rect(self, doc, page_num):
         """Obtiene el rectángulo de una página"""
@@ -180,17 +268,26 @@ class PDFHandler:
 
         added_count = 0
 
-        for doc_path in doc_paths:
+        if self.office_pool.available:
+            # Convertir en paralelo, una instancia de LibreOffice por hilo
+            conversions = ordered_map(self._get_converted_pdf, doc_paths,
+                                      max_workers=self.office_pool.size)
+        else:
+            # Word/COM no admite varios hilos: convertir de uno en uno
+            conversions = ((p, self._get_converted_pdf(p), None) for p in doc_paths)
+
+        for doc_path, pdf_bytes, error in conversions:
             try:
-                # Convertir documento a PDF
-                pdf_path = self._convert_document_to_pdf(doc_path)
+                if error is not None:
+                    raise error
 
-                if pdf_path and os.path.exists(pdf_path):
+                if pdf_bytes:
                     # Abrir el PDF convertido
-                    converted_doc = fitz.open(pdf_path)
+                    converted_doc = fitz.open("pdf", pdf_bytes)
 
                     # Obtener tamaño de página actual
                     current_page_count = len(current_doc)
+                    first_xref = current_doc.xref_length()
 
                     # Obtener TOC del documento convertido
                     new_toc = converted_doc.get_toc()
@@ -200,25 +297,20 @@ class PDFHandler:
 
                     # Insertar las páginas
                     current_doc.insert_pdf(converted_doc)
+                    self.deduplicator.process(current_doc, current_page_count, first_xref)
 
                     converted_doc.close()
 
-                    # Eliminar archivo temporal
-                    try:
-                        os.remove(pdf_path)
-                    except:
-                        pass
-
                     # Actualizar orden de páginas
                     new_pages = list(range(current_page_count, len(current_doc)))
                     current_page_order.extend(new_pages)
 
                     added_count += 1
                 else:
-                    messagebox.showwarning("Aviso", f"No se pudo convertir:\n{doc_path}")
+                    self.notifier.warning("Aviso", f"No se pudo convertir:\n{doc_path}")
 
             except Exception as e:
-                messagebox.showwarning("Aviso", f"Error al procesar:\n{doc_path}\n\n{e}")
+                self.notifier.warning("Aviso", f"Error al procesar:\n{doc_path}\n\n{e}")
                 continue
 
         if added_count > 0:
@@ -226,83 +318,82 @@ class PDFHandler:
 
         return None
 
-    def _convert_document_to_pdf(self, doc_path):
+    def _get_converted_pdf(self, doc_path):
         """
-        Convierte un documento Word/ODT a PDF.
-        Intenta usar LibreOffice (soffice) que está disponible en la mayoría de sistemas.
+        Retorna los bytes del documento convertido a PDF, o None.
+        Si el mismo archivo ya se convirtió antes, con cualquiera de los
+        conversores que se probarían, se toma de la caché sin volver a
+        convertirlo.
         """
-        # Crear directorio temporal para el PDF de salida
-        temp_dir = tempfile.mkdtemp()
+        cache = self.conversion_cache
+        digest = cache.source_digest(doc_path)
+        cached_path = cache.get(*(cache.key_for(digest, converter_id)
+                                  for converter_id in self._converter_identities(doc_path)))
+        if cached_path:
+            data = self._read_file(cached_path)
+            if data is not None:
+                return data
+
+        # El directorio temporal se elimina siempre al terminar
+        with tempfile.TemporaryDirectory(prefix="easypdf-") as temp_dir:
+            converted = self._convert_document_to_pdf(doc_path, temp_dir)
+            if not converted or not os.path.exists(converted[0]):
+                return None
+            pdf_path, converter_id = converted
+            # Leer antes de mover el PDF a la caché: la entrada puede
+            # desaparecer enseguida si otro proceso libera espacio
+            data = self._read_file(pdf_path)
+            if data is not None:
+                # La entrada se indexa con el conversor que de verdad la produjo
+                cache.put(cache.key_for(digest, converter_id), pdf_path)
+            return data
+
+    @staticmethod
+    def _read_file(path):
+        """Contenido de un archivo, o None si ya no existe o no se puede leer"""
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
 
+    def _converter_identities(self, doc_path):
+        """Conversores que se probarían, en orden (parte de la clave de caché)"""
+        identities = []
+        if self.office_pool.available:
+            identities.append(self.office_pool.identity())
+        if doc_path.lower().endswith(('.docx', '.doc')):
+            identities.append(WORD_CONVERTER)
+        return identities
+
+    def _convert_document_to_pdf(self, doc_path, temp_dir):
+        """
+        Convierte un documento Word/ODT a PDF dentro de temp_dir.
+        Intenta usar LibreOffice (soffice) que está disponible en la mayoría de sistemas.
+        Retorna (ruta del PDF, identidad del conversor que lo produjo) o None.
+        """
         # Intentar con LibreOffice primero (funciona con todos los formatos)
         pdf_path = self._convert_with_libreoffice(doc_path, temp_dir)
         if pdf_path:
-            return pdf_path
+            return pdf_path, self.office_pool.identity()
 
         # Intentar con docx2pdf (solo Windows, solo .docx)
         if doc_path.lower().endswith(('.docx', '.doc')):
             pdf_path = self._convert_with_docx2pdf(doc_path, temp_dir)
             if pdf_path:
-                return pdf_path
+                return pdf_path, WORD_CONVERTER
 
         # Intentar con comtypes (Windows con Word instalado)
         if doc_path.lower().endswith(('.docx', '.doc')):
             pdf_path = self._convert_with_word_com(doc_path, temp_dir)
             if pdf_path:
-                return pdf_path
+                return pdf_path, WORD_CONVERTER
 
         return None
 
     def _convert_with_libreoffice(self, doc_path, output_dir):
-        """Convierte usando LibreOffice en modo headless"""
-        # Posibles ubicaciones de LibreOffice
-        soffice_paths = [
-            r"C:\Program Files\LibreOffice\program\soffice.exe",
-            r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
-            "soffice",  # Si está en PATH
-            "/usr/bin/soffice",  # Linux
-            "/usr/bin/libreoffice",  # Linux alternativo
-            "/Applications/LibreOffice.app/Contents/MacOS/soffice",  # macOS
-        ]
-
-        soffice_exe = None
-        for path in soffice_paths:
-            if os.path.exists(path) or path in ("soffice", "libreoffice"):
-                soffice_exe = path
-                break
-
-        if not soffice_exe:
-            return None
-
-        try:
-            # Ejecutar LibreOffice en modo headless
-            cmd = [
-                soffice_exe,
-                "--headless",
-                "--convert-to", "pdf",
-                "--outdir", output_dir,
-                doc_path
-            ]
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-            )
-
-            # Buscar el PDF generado
-            base_name = os.path.splitext(os.path.basename(doc_path))[0]
-            pdf_path = os.path.join(output_dir, base_name + ".pdf")
-
-            if os.path.exists(pdf_path):
-                return pdf_path
-
-        except Exception:
-            pass
-
-        return None
+        """Convierte usando el grupo de instancias de LibreOffice en modo headless"""
+        return self.office_pool.convert(doc_path, output_dir)
 
     def _convert_with_docx2pdf(self, doc_path, output_dir):
         """Convierte usando docx2pdf (requiere Microsoft Word en Windows)"""
@@ -0,0 +1,58 @@
+"""
+Módulo con estadísticas de rendimiento siempre activas.
+
+A diferencia de las trazas (logic/tracing.py), aquí solo se guarda la última
+duración de cada operación y las más recientes, así que el coste por llamada
+es mínimo y se puede dejar siempre encendido. Lo usa el panel de rendimiento
+de la interfaz.
+"""
+import functools
+import threading
+import time
+from collections import deque
+
+# Operaciones recientes que se conservan para buscar las más lentas
+RECENT_OPERATIONS = 200
+
+
+class PerfStats:
+    """Última duración por operación y las operaciones recientes"""
+
+    def __init__(self, history=RECENT_OPERATIONS):
+        self.last = {}
+        self.counts = {}
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, detail=None):
+        with self._lock:
+            self.last[name] = seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.recent.append((name, seconds, detail, time.time()))
+
+    def get_last(self, name):
+        return self.last.get(name)
+
+    def slowest(self, count=5):
+        """Las operaciones recientes más lentas: (nombre, segundos, detalle, hora)"""
+        with self._lock:
+            recent = list(self.recent)
+        return sorted(recent, key=lambda op: op[1], reverse=True)[:count]
+
+
+# Estadísticas únicas del proceso
+perf_stats = PerfStats()
+
+
+def timed(name):
+    """Decorador que anota en perf_stats la duración de cada llamada"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                perf_stats.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,127 @@
+"""
+Módulo con la caché de páginas renderizadas.
+
+Guarda los pixmaps que devuelve PDFHandler.get_page_pixmap para no volver a
+renderizar la misma página a la misma escala (p. ej. al reconstruir las
+miniaturas tras mover una página). La memoria que ocupa se anota en la
+contabilidad global y se libera cuando se supera el presupuesto.
+"""
+import itertools
+import threading
+from collections import OrderedDict
+
+from logic.memory import memory
+
+# Tamaño máximo propio de la caché (además del presupuesto global)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+CATEGORY = 'render_cache'
+
+_tokens = itertools.count(1)
+
+
+def _document_token(doc):
+    """
+    Identificador único de un documento. No se usa id(doc) porque se
+    reutiliza cuando un documento se libera y otro ocupa su lugar.
+    """
+    token = getattr(doc, "_render_cache_token", None)
+    if token is None:
+        token = next(_tokens)
+        doc._render_cache_token = token
+    return token
+
+
+class RenderCache:
+    """
+    Caché LRU de pixmaps por (documento, página, rotación, escala).
+    La página se identifica por su xref, que no cambia al reordenar; quien
+    modifica el contenido de una página debe llamar a discard_page().
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        memory.register_evictor(self.evict, priority=0)
+
+    def _key(self, doc, page, scale):
+        return (_document_token(doc), page.xref, page.rotation, round(scale, 4))
+
+    def get(self, doc, page, scale):
+        """Retorna el pixmap guardado o None"""
+        key = self._key(doc, page, scale)
+        with self._lock:
+            pix = self.entries.get(key)
+            if pix is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return pix
+
+    def peek(self, doc, page, scale):
+        """Como get(), pero sin contar aciertos ni fallos ni cambiar el orden LRU"""
+        with self._lock:
+            return self.entries.get(self._key(doc, page, scale))
+
+    def put(self, doc, page, scale, pix):
+        nbytes = pix.stride * pix.height
+        if nbytes > self.max_bytes:
+            return
+        key = self._key(doc, page, scale)
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self._forget(key, old)
+            self.entries[key] = pix
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                self._pop_oldest()
+        memory.track(CATEGORY, key, nbytes)
+
+    def discard_page(self, doc, xref):
+        """Olvida todas las versiones de una página cuyo contenido ha cambiado"""
+        token = _document_token(doc)
+        self._discard(lambda key: key[0] == token and key[1] == xref)
+
+    def discard_document(self, doc):
+        token = _document_token(doc)
+        self._discard(lambda key: key[0] == token)
+
+    def clear(self):
+        self._discard(lambda key: True)
+
+    def evict(self, nbytes):
+        """Libera al menos nbytes (las entradas usadas hace más tiempo). Retorna lo liberado"""
+        freed = 0
+        with self._lock:
+            while self.entries and freed < nbytes:
+                freed += self._pop_oldest()
+        return freed
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _discard(self, match):
+        with self._lock:
+            for key in [key for key in self.entries if match(key)]:
+                self._forget(key, self.entries.pop(key))
+
+    def _pop_oldest(self):
+        key, pix = self.entries.popitem(last=False)
+        return self._forget(key, pix)
+
+    def _forget(self, key, pix):
+        nbytes = pix.stride * pix.height
+        self.current_bytes -= nbytes
+        memory.untrack(CATEGORY, key)
+        return nbytes
+
+
+# Caché única del proceso
+render_cache = RenderCache()
@@ -0,0 +1,171 @@
+"""
+Módulo para deduplicación de recursos (fuentes, imágenes, espacios de color)
+entre documentos fusionados.
+"""
+import hashlib
+import re
+
+
+# Referencia indirecta "N G R" dentro del texto de un objeto PDF
+REF_PATTERN = re.compile(r"\b(\d+) (\d+) R\b")
+
+# Objetos que nunca se comparten aunque sean alcanzables desde los recursos
+NON_RESOURCE_PATTERN = re.compile(r"/Type\s*/(Page|Pages|Catalog|Annot)\b")
+
+# Número máximo de pasadas: cada pasada resuelve un nivel más de anidamiento
+# (p. ej. imagen -> espacio de color -> perfil ICC)
+MAX_PASSES = 8
+
+
+class ResourceDeduplicator:
+    """
+    Detecta recursos idénticos entre los PDFs fusionados y hace que todas
+    las referencias apunten a un único objeto compartido.
+
+    Solo se guarda en memoria un hash por objeto: los streams se leen de uno
+    en uno, así que funciona con fusiones de cientos de archivos.
+    """
+
+    def __init__(self):
+        self.bytes_saved = 0
+        self.objects_removed = 0
+        self._doc = None
+        self._index = {}  # clave de contenido -> xref canónico
+
+    def reset(self):
+        """Olvida el índice (al cargar un documento distinto)"""
+        self.bytes_saved = 0
+        self.objects_removed = 0
+        self._doc = None
+        self._index = {}
+
+    def process(self, doc, first_page, first_xref):
+        """
+        Deduplica los recursos de las páginas añadidas desde first_page,
+        cuyos objetos ocupan los xrefs desde first_xref.
+        Retorna los bytes ahorrados en esta llamada.
+        """
+        if doc is not self._doc:
+            # Documento nuevo: indexar primero lo que ya contenía
+            self.reset()
+            self._doc = doc
+            self._process_range(doc, 0, first_page, 1, first_xref)
+
+        return self._process_range(doc, first_page, len(doc), first_xref, doc.xref_length())
+
+    def _process_range(self, doc, first_page, last_page, first_xref, last_xref):
+        """Deduplica los recursos de un rango de páginas y de xrefs"""
+        if first_page >= last_page:
+            return 0
+
+        candidates = self._collect_resources(doc, first_page, last_page, first_xref)
+        if not candidates:
+            return 0
+
+        mapping = {}
+        digests = {}
+
+        # Iterar hasta que no aparezcan nuevos duplicados: al unificar los
+        # objetos hoja, sus padres pasan a ser idénticos en la siguiente pasada
+        for _ in range(MAX_PASSES):
+            changed = False
+            for xref in candidates:
+                if xref in mapping:
+                    continue
+                key = self._object_key(doc, xref, mapping, digests)
+                canonical = self._index.setdefault(key, xref)
+                canonical = self._resolve(canonical, mapping)
+                if canonical != xref:
+                    mapping[xref] = canonical
+                    changed = True
+            if not changed:
+                break
+
+        if not mapping:
+            return 0
+
+        # Reescribir referencias en los objetos nuevos (los anteriores
+        # nunca apuntan a objetos recién insertados)
+        for xref in range(first_xref, last_xref):
+            if xref in mapping or not self._is_live(doc, xref):
+                continue
+            source = doc.xref_object(xref, compressed=True)
+            rewritten = REF_PATTERN.sub(
+                lambda m: self._rewrite_ref(m, mapping), source)
+            if rewritten != source:
+                doc.update_object(xref, rewritten)
+
+        # Eliminar los duplicados, ya sin referencias
+        saved = 0
+        for xref in mapping:
+            saved += len(doc.xref_object(xref, compressed=True))
+            if doc.xref_is_stream(xref):
+                saved += len(doc.xref_stream_raw(xref) or b"")
+            doc.update_object(xref, "null")
+
+        self.bytes_saved += saved
+        self.objects_removed += len(mapping)
+        return saved
+
+    def _collect_resources(self, doc, first_page, last_page, first_xref):
+        """Retorna los xrefs alcanzables desde los /Resources de las páginas"""
+        pending = []
+        for page_num in range(first_page, last_page):
+            kind, value = doc.xref_get_key(doc[page_num].xref, "Resources")
+            if kind in ("xref", "dict"):
+                pending.extend(self._refs(value, first_xref))
+
+        seen = set()
+        while pending:
+            xref = pending.pop()
+            if xref in seen or not self._is_live(doc, xref):
+                continue
+            source = doc.xref_object(xref, compressed=True)
+            if NON_RESOURCE_PATTERN.search(source):
+                continue
+            seen.add(xref)
+            pending.extend(self._refs(source, first_xref))
+
+        return sorted(seen)
+
+    def _object_key(self, doc, xref, mapping, digests):
+        """Calcula el hash del contenido de un objeto con referencias resueltas"""
+        source = doc.xref_object(xref, compressed=True)
+        normalized = REF_PATTERN.sub(lambda m: self._rewrite_ref(m, mapping), source)
+
+        h = hashlib.sha256(normalized.encode("utf-8", "surrogatepass"))
+        if doc.xref_is_stream(xref):
+            if xref not in digests:
+                raw = doc.xref_stream_raw(xref) or b""
+                digests[xref] = hashlib.sha256(raw).digest()
+            h.update(b"stream")
+            h.update(digests[xref])
+        return h.digest()
+
+    def _rewrite_ref(self, match, mapping):
+        xref = int(match.group(1))
+        target = self._resolve(xref, mapping)
+        if target == xref:
+            return match.group(0)
+        return "%d 0 R" % target
+
+    @staticmethod
+    def _resolve(xref, mapping):
+        while xref in mapping:
+            xref = mapping[xref]
+        return xref
+
+    @staticmethod
+    def _refs(source, first_xref):
+        return [int(m.group(1)) for m in REF_PATTERN.finditer(source)
+                if int(m.group(1)) >= first_xref]
+
+    @staticmethod
+    def _is_live(doc, xref):
+        """Comprueba que el xref existe y no es un objeto nulo"""
+        if xref <= 0 or xref >= doc.xref_length():
+            return False
+        try:
+            return doc.xref_object(xref, compressed=True) != "null"
+        except Exception:
+            return False
@@ -0,0 +1,536 @@
+"""
+Módulo de búsqueda de texto en el documento abierto.
+
+El texto de las páginas se extrae en procesos trabajadores (cada uno abre el
+PDF de origen por su cuenta) y se guarda en un índice invertido en memoria:
+palabra -> páginas -> posiciones. Así una consulta solo mira las páginas que
+contienen las palabras buscadas y responde en milisegundos aunque el
+documento tenga miles de páginas.
+
+Las páginas del índice tienen un identificador propio que no depende de su
+posición: al fusionar se añaden páginas nuevas y al reordenar o eliminar solo
+se actualiza la lista de posiciones, sin reconstruir el índice. El texto de
+cada archivo se puede guardar en disco, indexado por la huella del archivo,
+para no volver a extraerlo la próxima vez que se abra.
+"""
+import bisect
+import hashlib
+import itertools
+import logging
+import marshal
+import os
+import string
+import sys
+import tempfile
+import threading
+import unicodedata
+import zlib
+from array import array
+from concurrent.futures import as_completed
+
+from logic.conversion_cache import default_cache_dir
+from logic.workers import default_workers, process_pool
+
+logger = logging.getLogger("easypdf")
+
+# Cambiar si cambia el formato de las páginas guardadas
+INDEX_VERSION = 1
+# Páginas por tarea de extracción
+CHUNK_PAGES = 32
+# Tamaño máximo del índice guardado en disco (todas las entradas)
+DEFAULT_STORE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_HITS = 1000
+
+CHUNK_SIZE = 1024 * 1024
+
+# Página sin texto
+EMPTY_PAGE = ("", "", b"")
+
+
+# =============================================================================
+# EXTRACCIÓN (en procesos trabajadores)
+# =============================================================================
+
+def normalize(text):
+    """Minúsculas, sin tildes y sin puntuación en los extremos"""
+    if text.isascii():
+        return text.lower().strip(string.punctuation)
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    start, end = 0, len(text)
+    while start < end and not text[start].isalnum():
+        start += 1
+    while end > start and not text[end - 1].isalnum():
+        end -= 1
+    return text[start:end]
+
+
+def tokenize(query):
+    return [token for token in (normalize(part) for part in query.split()) if token]
+
+
+def page_words(page):
+    """
+    Palabras de una página en forma compacta (fácil de pasar entre procesos
+    y de guardar): (palabras, tokens, coordenadas). Las palabras y sus tokens
+    van separados por saltos de línea y las coordenadas son floats de 32 bits,
+    cuatro por palabra.
+    """
+    words = page.get_text("words")
+    if not words:
+        return EMPTY_PAGE
+    coords = array("f")
+    for word in words:
+        coords.extend(word[:4])
+    return ("\n".join(word[4] for word in words),
+            "\n".join(normalize(word[4]) for word in words),
+            coords.tobytes())
+
+
+def extract_words(path, pages):
+    """Extrae las palabras de las páginas indicadas. Retorna [(página, palabras)]"""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(path)
+    try:
+        return [(page_num, page_words(doc[page_num])) for page_num in pages]
+    finally:
+        doc.close()
+
+
+def fingerprint(path):
+    """Huella del contenido de un archivo"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# =============================================================================
+# ÍNDICE INVERTIDO
+# =============================================================================
+
+class _Page:
+    """Texto de una página ya indexada"""
+    __slots__ = ("words", "tokens", "coords")
+
+    def __init__(self, data):
+        words, tokens, coords = data
+        self.words = words.split("\n") if words else []
+        # El vocabulario es pequeño: compartir las cadenas ahorra mucha memoria
+        self.tokens = [sys.intern(token) for token in tokens.split("\n")] if tokens else []
+        self.coords = array("f")
+        self.coords.frombytes(coords)
+
+    def rect(self, i):
+        return tuple(round(v, 1) for v in self.coords[4 * i:4 * i + 4])
+
+
+class SearchIndex:
+    """
+    Índice invertido de las páginas del documento. Se puede consultar desde
+    el hilo de la interfaz mientras otro hilo lo va llenando.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        # Posición en el documento -> identificador de página (o None)
+        self.page_ids = []
+        # Identificador -> en cuántas posiciones está (las copias lo comparten)
+        self._refs = {}
+        # Identificador -> _Page, o None si aún no se ha extraído
+        self._pages = {}
+        # token -> {identificador: [posiciones]}
+        self._postings = {}
+        self._vocabulary = None
+        self._positions = None
+
+    def clear(self):
+        with self._lock:
+            self.page_ids = []
+            self._refs = {}
+            self._pages = {}
+            self._postings = {}
+            self._vocabulary = None
+            self._positions = None
+
+    @property
+    def page_count(self):
+        return len(self.page_ids)
+
+    def pending_count(self):
+        """Páginas reservadas cuyo texto aún no se ha extraído"""
+        with self._lock:
+            return sum(1 for page in self._pages.values() if page is None)
+
+    # =========================================================================
+    # PÁGINAS
+    # =========================================================================
+
+    def reserve_pages(self, start, count):
+        """
+        Reserva las posiciones start..start+count-1 para páginas cuyo texto
+        llegará después. Retorna sus identificadores.
+        """
+        with self._lock:
+            if len(self.page_ids) < start + count:
+                self.page_ids.extend([None] * (start + count - len(self.page_ids)))
+            uids = []
+            refs = self._refs
+            for position in range(start, start + count):
+                old = self.page_ids[position]
+                if old is not None:
+                    refs[old] -= 1
+                    if not refs[old]:
+                        del refs[old]
+                        self._remove(old)
+                uid = next(self._ids)
+                self._pages[uid] = None
+                refs[uid] = 1
+                self.page_ids[position] = uid
+                uids.append(uid)
+            self._positions = None
+            return uids
+
+    def fill(self, uid, data):
+        """Añade al índice el texto de una página reservada (formato de page_words)"""
+        page = _Page(data)
+        with self._lock:
+            if uid not in self._pages or self._pages[uid] is not None:
+                return  # Página ya eliminada o ya indexada
+            self._pages[uid] = page
+            postings = self._postings
+            for position, token in enumerate(page.tokens):
+                if not token:
+                    continue
+                pages = postings.get(token)
+                if pages is None:
+                    pages = postings[token] = {}
+                    self._vocabulary = None
+                positions = pages.get(uid)
+                if positions is None:
+                    pages[uid] = [position]
+                else:
+                    positions.append(position)
+
+    def set_page(self, position, data):
+        """Indexa directamente el texto de la página en una posición"""
+        uid, = self.reserve_pages(position, 1)
+        self.fill(uid, data)
+
+    def remap(self, order):
+        """
+        Reordena las páginas como Document.select(order): la nueva página i
+        es la antigua order[i]. Las que no aparecen se eliminan del índice y
+        las entradas None son páginas nuevas sin texto.
+        """
+        with self._lock:
+            new_ids = [self.page_ids[old] if old is not None and old < len(self.page_ids) else None
+                       for old in order]
+            refs = {}
+            for uid in new_ids:
+                if uid is not None:
+                    refs[uid] = refs.get(uid, 0) + 1
+            for uid in self._refs.keys() - refs.keys():
+                self._remove(uid)
+            self.page_ids = new_ids
+            self._refs = refs
+            self._positions = None
+
+    def extend(self, count):
+        """Añade páginas sin texto (p. ej. imágenes) al final"""
+        with self._lock:
+            self.page_ids.extend([None] * count)
+            self._positions = None
+
+    def _remove(self, uid):
+        page = self._pages.pop(uid, None)
+        if not page:
+            return
+        for token in set(page.tokens):
+            pages = self._postings.get(token)
+            if pages is None:
+                continue
+            pages.pop(uid, None)
+            if not pages:
+                del self._postings[token]
+                self._vocabulary = None
+
+    # =========================================================================
+    # CONSULTAS
+    # =========================================================================
+
+    def _page_positions(self):
+        """Identificador -> posiciones en el documento (una página puede estar repetida)"""
+        if self._positions is None:
+            positions = {}
+            for position, uid in enumerate(self.page_ids):
+                if uid is not None:
+                    positions.setdefault(uid, []).append(position)
+            self._positions = positions
+        return self._positions
+
+    def _expand_prefix(self, prefix):
+        """Tokens del vocabulario que empiezan por prefix"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = []
+        for token in itertools.islice(self._vocabulary, start, None):
+            if not token.startswith(prefix):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query, max_hits=DEFAULT_MAX_HITS):
+        """
+        Busca las palabras de query seguidas (la última puede estar
+        incompleta). Retorna los aciertos por orden de página:
+        {'page': índice en el documento, 'rects': [(x0, y0, x1, y1)], 'text': ...}
+        con los rectángulos en coordenadas de la página sin rotar.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            last_tokens = set(self._expand_prefix(terms[-1]))
+            if len(terms) == 1:
+                first_tokens = last_tokens
+            else:
+                first_tokens = {terms[0]} if terms[0] in self._postings else set()
+
+            # Páginas que contienen todas las palabras
+            candidates = None
+            for token_set in [first_tokens] + [{term} for term in terms[1:-1]] + [last_tokens]:
+                pages = set()
+                for token in token_set:
+                    pages.update(self._postings.get(token, ()))
+                candidates = pages if candidates is None else candidates & pages
+                if not candidates:
+                    return []
+
+            # Se recorren por orden de posición para poder parar en max_hits
+            positions = self._page_positions()
+            ordered = sorted((position, uid) for uid in candidates
+                             for position in positions.get(uid, ()))
+            hits = []
+            for position, uid in ordered:
+                page = self._pages[uid]
+                for start in self._phrase_starts(uid, page.tokens, terms, first_tokens, last_tokens):
+                    end = start + len(terms)
+                    hits.append({
+                        'page': position,
+                        'rects': _line_rects([page.rect(i) for i in range(start, end)]),
+                        'text': " ".join(page.words[start:end]),
+                    })
+                    if len(hits) >= max_hits:
+                        return hits
+        return hits
+
+    def _phrase_starts(self, uid, tokens, terms, first_tokens, last_tokens):
+        starts = []
+        for token in first_tokens:
+            starts.extend(self._postings[token].get(uid, ()))
+        count = len(terms)
+        for start in sorted(starts):
+            if start + count > len(tokens):
+                continue
+            if count > 1 and tokens[start + count - 1] not in last_tokens:
+                continue
+            if all(tokens[start + i] == terms[i] for i in range(1, count - 1)):
+                yield start
+
+
+def _line_rects(rects):
+    """Une los rectángulos de las palabras de un acierto en uno por línea"""
+    lines = []
+    for x0, y0, x1, y1 in rects:
+        if lines and abs(lines[-1][1] - y0) < (y1 - y0) / 2:
+            last = lines[-1]
+            lines[-1] = (min(last[0], x0), min(last[1], y0), max(last[2], x1), max(last[3], y1))
+        else:
+            lines.append((x0, y0, x1, y1))
+    return lines
+
+
+# =============================================================================
+# ÍNDICE EN DISCO
+# =============================================================================
+
+def default_store_dir():
+    return os.path.join(os.path.dirname(default_cache_dir()), "search-index")
+
+
+class IndexStore:
+    """
+    Texto extraído de cada archivo, indexado por su huella, para no volver
+    a extraerlo. Cuando se supera max_bytes se eliminan las entradas usadas
+    hace más tiempo.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_STORE_MAX_BYTES):
+        self.directory = directory or default_store_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.v{INDEX_VERSION}.idx")
+
+    def load(self, key):
+        """Retorna {página: palabras} (formato de page_words) o None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                pages = marshal.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            return None
+        return pages if isinstance(pages, dict) else None
+
+    def save(self, key, pages):
+        if self.max_bytes <= 0:
+            return
+        data = zlib.compress(marshal.dumps(pages), 1)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._entry_path(key))
+        except OSError:
+            return
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            try:
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if entry.name.endswith(".idx"):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except OSError:
+                return
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    continue
+
+
+# =============================================================================
+# CONSTRUCCIÓN EN SEGUNDO PLANO
+# =============================================================================
+
+class IndexBuilder:
+    """
+    Llena un SearchIndex extrayendo el texto en un pool de procesos. Cada
+    archivo se procesa en un hilo coordinador, así que quien lo llama (la
+    interfaz) no se bloquea.
+    """
+
+    def __init__(self, index, store=None, workers=None):
+        self.index = index
+        self.store = store
+        self.workers = workers or default_workers()
+        self._executor = None
+        self._threads = []
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = process_pool(self.workers)
+            return self._executor
+
+    def index_file(self, path, offset, count):
+        """Indexa en segundo plano las count primeras páginas de path en la posición offset"""
+        uids = self.index.reserve_pages(offset, count)
+        thread = threading.Thread(target=self._run_file, args=(self._generation, path, uids),
+                                  name="search-index", daemon=True)
+        self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def index_doc_pages(self, doc, positions):
+        """
+        Indexa páginas que solo existen en el documento abierto (p. ej.
+        documentos convertidos). Se hace en el hilo que llama, que es el
+        único que puede usar doc.
+        """
+        for position in positions:
+            self.index.set_page(position, page_words(doc[position]))
+
+    def cancel(self):
+        """Abandona lo pendiente (p. ej. al abrir otro documento)"""
+        self._generation += 1
+
+    def wait(self, timeout=None):
+        for thread in list(self._threads):
+            thread.join(timeout)
+
+    def shutdown(self):
+        self.cancel()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _run_file(self, generation, path, uids):
+        try:
+            key = fingerprint(path)
+        except OSError as e:
+            logger.warning("No se pudo indexar %s: %s", path, e)
+            key = None
+
+        stored = self.store.load(key) if self.store and key else None
+        if stored is not None:
+            for page, data in stored.items():
+                if generation != self._generation:
+                    return
+                if page < len(uids):
+                    self.index.fill(uids[page], data)
+        elif key is not None:
+            collected = self._extract(generation, path, uids)
+            if collected is None:
+                return
+            # Solo se guarda si se ha leído todo el archivo
+            if self.store and len(collected) == len(uids):
+                self.store.save(key, collected)
+
+        # Las páginas que no se pudieron leer quedan indexadas sin texto
+        for uid in uids:
+            self.index.fill(uid, EMPTY_PAGE)
+
+    def _extract(self, generation, path, uids):
+        pages = list(range(len(uids)))
+        chunks = [pages[i:i + CHUNK_PAGES] for i in range(0, len(pages), CHUNK_PAGES)]
+        try:
+            executor = self._get_executor()
+            futures = [executor.submit(extract_words, path, chunk) for chunk in chunks]
+        except RuntimeError:
+            return None  # Pool cerrado
+
+        collected = {}
+        for future in as_completed(futures):
+            if generation != self._generation:
+                for pending in futures:
+                    pending.cancel()
+                return None
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.warning("Error al extraer texto de %s: %s", path, e)
+                continue
+            for page, data in results:
+                self.index.fill(uids[page], data)
+                collected[page] = data
+        return collected
@@ -0,0 +1,321 @@
+"""
+Módulo con la sesión de edición de un PDF: el documento abierto junto con
+sus marcadores, orden de páginas y transformaciones pendientes.
+"""
+from logic.bookmarks import BookmarkManager
+from logic.page_order import PageOrderManager
+
+
+class PDFSession:
+    """
+    El documento abierto y sus managers, sin tkinter: la usan la interfaz
+    gráfica, la consola y los procesos por lotes, así que todos guardan
+    igual. Las páginas se indican con índices 0-based del documento.
+
+    pdf_handler, page_editor y stamp_manager (que importan fitz) se crean
+    la primera vez que se usan, para que la ventana no espere a fitz al
+    arrancar.
+    """
+
+    def __init__(self, notifier=None):
+        self.notifier = notifier
+        self._pdf_handler = None
+        self._page_editor = None
+        self._stamp_manager = None
+        self.bookmark_manager = BookmarkManager()
+        self.page_order_manager = PageOrderManager()
+        self.doc = None
+
+    @property
+    def pdf_handler(self):
+        if self._pdf_handler is None:
+            from logic.pdf_handler import PDFHandler
+            self._pdf_handler = PDFHandler(self.notifier)
+        return self._pdf_handler
+
+    @property
+    def page_editor(self):
+        if self._page_editor is None:
+            from logic.page_editor import PageEditor
+            self._page_editor = PageEditor()
+        return self._page_editor
+
+    @property
+    def stamp_manager(self):
+        if self._stamp_manager is None:
+            from logic.stamping import StampManager
+            self._stamp_manager = StampManager()
+        return self._stamp_manager
+
+    @property
+    def conversion_cache(self):
+        """Caché de documentos convertidos, o None si aún no se ha usado el manejador"""
+        return self._pdf_handler.conversion_cache if self._pdf_handler is not None else None
+
+    @property
+    def page_count(self):
+        return len(self.doc) if self.doc else 0
+
+    def all_pages(self):
+        """Retorna los índices de todas las páginas del documento"""
+        return list(range(self.page_count))
+
+    # =========================================================================
+    # CARGA Y CONTENIDO
+    # =========================================================================
+
+    def open(self, path):
+        """Abre un PDF como documento de la sesión"""
+        doc, toc = self.pdf_handler.load(path)
+        self.doc = doc
+        self.bookmark_manager.set_toc(toc)
+        self.page_order_manager.initialize(len(doc))
+        return self
+
+    def merge(self, paths):
+        """Añade al final las páginas de otros PDFs. Retorna cuántos se añadieron"""
+        added = 0
+        for path in paths:
+            result = self.pdf_handler.merge_single(
+                self.doc,
+                self.bookmark_manager.get_toc(),
+                self.page_order_manager.get_order(),
+                path
+            )
+            if result:
+                self.doc, toc, page_order = result
+                self.bookmark_manager.set_toc(toc)
+                self.page_order_manager.set_order(page_order, len(self.doc))
+                added += 1
+        return added
+
+    def add_images(self, paths, max_dpi=None):
+        """Añade imágenes como páginas. Retorna cuántas se añadieron"""
+        result = self.pdf_handler.add_images_as_pages(
+            self.doc, self.page_order_manager.get_order(), paths, max_dpi)
+        if not result:
+            return 0
+        self.doc, page_order, added_count = result
+        self.page_order_manager.set_order(page_order, len(self.doc))
+        return added_count
+
+    def add_documents(self, paths):
+        """Convierte documentos de oficina y los añade como páginas"""
+        result = self.pdf_handler.add_documents_as_pages(
+            self.doc,
+            self.bookmark_manager.get_toc(),
+            self.page_order_manager.get_order(),
+            paths
+        )
+        if not result:
+            return 0
+        self.doc, toc, page_order, added_count = result
+        self.bookmark_manager.set_toc(toc)
+        self.page_order_manager.set_order(page_order, len(self.doc))
+        return added_count
+
+    # =========================================================================
+    # EDICIÓN
+    # =========================================================================
+
+    def reorder(self, order):
+        """Establece el nuevo orden de páginas (lista de índices del documento)"""
+        self.page_order_manager.set_order(list(order))
+
+    def delete_pages(self, positions):
+        """Elimina las páginas en esas posiciones del orden. Retorna cuántas"""
+        return self.page_order_manager.delete(positions)
+
+    def duplicate_pages(self, positions):
+        """Duplica las páginas en esas posiciones. Retorna las posiciones de las copias"""
+        return self.page_order_manager.duplicate(positions)
+
+    def insert_blank(self, position, count=1, width=None, height=None):
+        """Inserta páginas en blanco en esa posición del orden"""
+        return self.page_order_manager.insert_blank(self.doc, position, count, width, height)
+
+    def rotate(self, pages, direction):
+        """Rota las páginas 90° ('left' o 'right')"""
+        for page_num in pages:
+            self.page_editor.rotate_page(self.doc, page_num, direction, keep_original=False)
+
+    def scale(self, pages, factor):
+        """Establece la escala de las páginas"""
+        for page_num in pages:
+            self.page_editor.set_page_scale(page_num, factor)
+
+    def margins(self, pages, top=0, right=0, bottom=0, left=0):
+        """Establece los márgenes de las páginas (en puntos)"""
+        for page_num in pages:
+            self.page_editor.set_page_margins(page_num, top, right, bottom, left)
+
+    def normalize_size(self, pages, width, height):
+        """
+        Ajusta las páginas a un tamaño fijo: se escalan manteniendo la
+        proporción y se centran con márgenes hasta ocupar width x height.
+        """
+        for page_num in pages:
+            self.page_editor.resize_page_to_fit(self.doc, page_num, width, height)
+            scaled_width, scaled_height = self.page_editor.get_scaled_page_size(self.doc, page_num)
+            pad_x = max(0, width - scaled_width) / 2
+            pad_y = max(0, height - scaled_height) / 2
+            self.page_editor.set_page_margins(page_num, pad_y, pad_x, pad_y, pad_x)
+
+    def autocrop(self, pages, uniform=False, padding=None, jobs=None):
+        """
+        Recorta los márgenes en blanco de las páginas (con uniform, el mismo
+        recorte en todas). Retorna cuántas se recortaron.
+        """
+        from logic import autocrop
+
+        crops = autocrop.plan_crops(
+            self.doc, pages, uniform,
+            autocrop.DEFAULT_PADDING if padding is None else padding, jobs)
+        for page_num, cropbox in crops.items():
+            self.page_editor.crop_page(self.doc, page_num, cropbox, keep_original=False)
+        return len(crops)
+
+    def grayscale(self, pages):
+        """Marca las páginas para convertirlas a blanco y negro"""
+        for page_num in pages:
+            self.page_editor.set_page_grayscale(page_num, True)
+
+    def optimize_images(self, target_dpi=None, jpeg_quality=None, jobs=None):
+        """Reduce y recomprime las imágenes del documento. Retorna el informe"""
+        from logic import image_optimizer
+
+        return image_optimizer.optimize_images(
+            self.doc,
+            target_dpi or image_optimizer.DEFAULT_TARGET_DPI,
+            jpeg_quality or image_optimizer.DEFAULT_JPEG_QUALITY,
+            jobs,
+        )
+
+    def find_duplicates(self, max_distance=None, jobs=None):
+        """Grupos de posiciones con la misma página (la primera es la original)"""
+        from logic import duplicates
+
+        return duplicates.find_duplicates(
+            self.doc, self.page_order_manager.get_order(),
+            duplicates.DEFAULT_MAX_DISTANCE if max_distance is None else max_distance, jobs)
+
+    def find_blank_pages(self, max_ink=None, jobs=None):
+        """Posiciones de las páginas en blanco: {posición: fracción de tinta}"""
+        from logic import blank_pages
+
+        return blank_pages.find_blank_pages(
+            self.doc, self.page_order_manager.get_order(),
+            blank_pages.DEFAULT_MAX_INK if max_ink is None else max_ink, jobs)
+
+    def impose(self, per_sheet=2, booklet=False, sheet_size=None, signature=0, creep=0,
+               gutter=0, margin=0):
+        """
+        Sustituye el documento por sus páginas impuestas en hojas de
+        impresión (per_sheet por cara o en cuadernillo), en el orden actual
+        y con los cambios pendientes aplicados. Retorna el número de caras.
+        """
+        from logic import imposition
+
+        self.apply_changes()
+        sheet_size = sheet_size or imposition.DEFAULT_SHEET
+        if booklet:
+            imposed, placements = imposition.impose_booklet(
+                self.doc, None, sheet_size, signature, creep, gutter, margin)
+        else:
+            imposed, placements = imposition.impose_nup(
+                self.doc, None, per_sheet, sheet_size, None, margin, gutter)
+
+        toc = imposition.remap_toc(self.bookmark_manager.get_toc(), placements)
+        self.doc.close()
+        self.doc = imposed
+        # El índice de recursos repetidos era del documento anterior
+        self.pdf_handler.deduplicator.reset()
+        self.page_order_manager.initialize(len(imposed))
+        self.bookmark_manager.set_toc(toc)
+        return len(imposed)
+
+    def stamp_text(self, template, position='bottom-right', font_size=None, color=(0, 0, 0),
+                   opacity=1.0, angle=0, margin=None):
+        """
+        Añade un texto a todas las páginas al guardar. La plantilla puede
+        usar {page}, {total} y {bates} (tras set_bates).
+        """
+        from logic import stamping
+
+        self.stamp_manager.add_text(
+            template, position, font_size or stamping.DEFAULT_FONT_SIZE, color, opacity, angle,
+            stamping.DEFAULT_MARGIN if margin is None else margin)
+
+    def stamp_image(self, path, position='top-right', width=None, margin=None):
+        """Añade una imagen (un logo) a todas las páginas al guardar"""
+        from logic import stamping
+
+        self.stamp_manager.add_image(
+            path, position, width or stamping.DEFAULT_IMAGE_WIDTH,
+            stamping.DEFAULT_MARGIN if margin is None else margin)
+
+    def set_bates(self, prefix="", start=1, digits=None):
+        """Numeración Bates para el campo {bates}: prefix + número con digits cifras"""
+        from logic import stamping
+
+        self.stamp_manager.set_bates(prefix, start, digits or stamping.DEFAULT_BATES_DIGITS)
+
+    def has_stamps(self):
+        """True si hay sellos pendientes (sin crear el manager si no se ha usado)"""
+        return self._stamp_manager is not None and self._stamp_manager.has_stamps()
+
+    def get_bookmarks(self):
+        """Retorna el TOC tal como quedará en el PDF final"""
+        return [list(entry) for entry in
+                self.bookmark_manager.prepare_for_display(self.page_order_manager.get_order())]
+
+    def set_bookmarks(self, toc):
+        """Sustituye los marcadores del documento"""
+        self.bookmark_manager.set_toc([list(entry) for entry in toc])
+
+    # =========================================================================
+    # GUARDADO
+    # =========================================================================
+
+    def apply_changes(self, on_reorder=None, on_transform=None):
+        """
+        Aplica al documento el orden, las transformaciones y los sellos
+        pendientes. on_reorder(orden) se llama justo antes de reordenar y
+        on_transform(páginas) tras transformar esas páginas (la interfaz
+        los usa para actualizar el índice de búsqueda).
+        """
+        if self.page_order_manager.has_changes():
+            order = self.page_order_manager.get_order()
+            if on_reorder is not None:
+                on_reorder(order)
+            # Las transformaciones van por página del documento, que cambian al reordenar
+            self.page_editor.remap_pages(order)
+            new_toc = self.page_order_manager.apply_reorder(
+                self.doc,
+                self.bookmark_manager.get_toc()
+            )
+            self.bookmark_manager.set_toc(new_toc)
+
+        if self._page_editor is not None and self._page_editor.has_pending_transforms():
+            transformed = list(self.page_editor.pending_transforms)
+            self.page_editor.apply_all_transforms(self.doc)
+            if on_transform is not None:
+                on_transform(transformed)
+
+        # Los sellos van sobre el tamaño final, ya en el orden definitivo
+        if self.has_stamps():
+            self.stamp_manager.apply(self.doc, self.page_editor)
+            self.stamp_manager.clear()
+
+        self.bookmark_manager.set_toc(self.bookmark_manager.normalize_hierarchy())
+
+    def save(self, path, options=None, on_reorder=None, on_transform=None):
+        """Aplica los cambios pendientes y guarda. Retorna True si se guardó"""
+        self.apply_changes(on_reorder, on_transform)
+        return self.pdf_handler.save(self.doc, self.bookmark_manager.get_toc(), path, options)
+
+    def close(self):
+        """Cierra el documento"""
+        if self.doc:
+            self.doc.close()
+        self.doc = None
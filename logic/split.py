@@ -0,0 +1,223 @@
+"""
+Módulo para dividir un PDF en varios archivos.
+
+Primero se planifican las partes (cada N páginas, por marcador de primer
+nivel, por una lista de rangos o por páginas en blanco que hacen de
+separador) y después cada parte se escribe en un proceso trabajador. Cada
+trabajador abre el PDF de origen una sola vez, solo para leer, y copia sus
+páginas con Document.insert_pdf, así que el trabajo se reparte entre todos
+los núcleos y lo que limita es la velocidad del disco.
+
+Las páginas se indican por su posición en el orden final (page_order) y los
+marcadores con páginas 1-based de ese mismo orden, como los devuelve
+BookmarkManager.prepare_for_display.
+"""
+import os
+import re
+import time
+
+from logic import blank_pages
+from logic.bookmarks import BookmarkManager
+from logic.workers import BackgroundJob, cached_document, process_map
+
+# Longitud máxima del título de un marcador en el nombre de archivo
+MAX_TITLE_CHARS = 60
+
+SPLIT_MODES = ('every', 'bookmarks', 'ranges', 'blank')
+
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]+')
+
+
+# =============================================================================
+# PLANIFICACIÓN
+# Cada función retorna una lista de partes: {'pages': [posiciones], 'title': str}
+# =============================================================================
+
+def plan_every(page_count, every):
+    """Una parte cada `every` páginas"""
+    if every < 1:
+        raise ValueError("El número de páginas por parte debe ser al menos 1")
+    return [{'pages': list(range(start, min(start + every, page_count))), 'title': ""}
+            for start in range(0, page_count, every)]
+
+
+def plan_by_bookmarks(toc, page_count):
+    """
+    Una parte por cada marcador de primer nivel, desde su página hasta la
+    anterior al siguiente. Las páginas antes del primer marcador forman
+    una parte propia.
+    """
+    starts = []
+    for lvl, title, page, *_ in toc:
+        if lvl != 1 or not 1 <= page <= page_count:
+            continue
+        if starts and starts[-1][0] == page - 1:
+            continue  # Varios marcadores en la misma página: cuenta el primero
+        starts.append((page - 1, title))
+    if not starts:
+        raise ValueError("El documento no tiene marcadores de primer nivel")
+
+    starts.sort(key=lambda item: item[0])
+    if starts[0][0] > 0:
+        starts.insert(0, (0, ""))
+    bounds = [start for start, _ in starts[1:]] + [page_count]
+    return [{'pages': list(range(start, end)), 'title': title}
+            for (start, title), end in zip(starts, bounds) if end > start]
+
+
+def plan_ranges(ranges):
+    """Una parte por cada lista de posiciones (p. ej. de parse_pages)"""
+    parts = [{'pages': list(pages), 'title': ""} for pages in ranges]
+    if not parts or not all(part['pages'] for part in parts):
+        raise ValueError("Hay rangos vacíos")
+    return parts
+
+
+def plan_by_separators(page_count, separators):
+    """
+    Divide por las páginas separadoras (posiciones), que no se incluyen en
+    ninguna parte. Varias separadoras seguidas cuentan como una.
+    """
+    separators = set(separators)
+    parts, current = [], []
+    for position in range(page_count):
+        if position in separators:
+            if current:
+                parts.append({'pages': current, 'title': ""})
+            current = []
+        else:
+            current.append(position)
+    if current:
+        parts.append({'pages': current, 'title': ""})
+    return parts
+
+
+def remap_toc(toc, positions):
+    """
+    Marcadores de una parte: los que apuntan a sus páginas, con la página
+    renumerada dentro de la parte y la jerarquía normalizada.
+    """
+    new_pages = {}
+    for index, position in enumerate(positions):
+        new_pages.setdefault(position + 1, index + 1)
+    entries = [[lvl, title, new_pages[page]] for lvl, title, page, *_ in toc if page in new_pages]
+    entries.sort(key=lambda entry: entry[2])
+    return BookmarkManager().normalize_hierarchy(entries)
+
+
+def part_filename(base_name, number, title=""):
+    """Nombre de archivo de una parte: base_001.pdf o base_001_Título.pdf"""
+    name = f"{base_name}_{number:03d}"
+    title = _UNSAFE_CHARS.sub(" ", title or "").strip(" .")[:MAX_TITLE_CHARS].strip()
+    if title:
+        name += f"_{title}"
+    return name + ".pdf"
+
+
+def build_tasks(source, parts, output_dir, toc=None, page_order=None, base_name=None, options=None):
+    """
+    Prepara las tareas de escritura de cada parte. page_order traduce las
+    posiciones a páginas del archivo de origen (por defecto, las mismas).
+    """
+    base_name = base_name or os.path.splitext(os.path.basename(source))[0]
+    tasks = []
+    for number, part in enumerate(parts, 1):
+        pages = [page_order[p] for p in part['pages']] if page_order else list(part['pages'])
+        tasks.append({
+            'source': source,
+            'pages': pages,
+            'toc': remap_toc(toc or [], part['pages']),
+            'output': os.path.join(output_dir, part_filename(base_name, number, part['title'])),
+            'options': options or {},
+        })
+    return tasks
+
+
+# =============================================================================
+# TRABAJADORES
+# =============================================================================
+
+def _runs(pages):
+    """Agrupa las páginas en tramos consecutivos ascendentes: [(primera, última)]"""
+    runs = []
+    for page in pages:
+        if runs and page == runs[-1][1] + 1:
+            runs[-1][1] = page
+        else:
+            runs.append([page, page])
+    return runs
+
+
+def write_part(task):
+    """
+    Escribe una parte en su archivo. Se ejecuta en un proceso trabajador:
+    recibe y retorna solo datos serializables.
+    """
+    import fitz  # PyMuPDF
+
+    start = time.perf_counter()
+    result = {'output': task['output'], 'pages': len(task['pages']), 'ok': False}
+    try:
+        source = cached_document(task['source'])
+        out = fitz.open()
+        try:
+            for first, last in _runs(task['pages']):
+                out.insert_pdf(source, from_page=first, to_page=last)
+            out.set_toc(task['toc'])
+            save_options = {'garbage': 1, 'deflate': True}
+            save_options.update(task['options'])
+            out.save(task['output'], **save_options)
+        finally:
+            out.close()
+        result['ok'] = True
+        result['bytes'] = os.path.getsize(task['output'])
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+# =============================================================================
+# EJECUCIÓN
+# =============================================================================
+
+def detect_separators(source, page_order=None, jobs=None, cancel=None):
+    """Posiciones (en page_order) de las páginas en blanco del documento"""
+    import fitz  # PyMuPDF
+
+    with fitz.open(source) as doc:
+        page_count = len(doc)
+    pages = list(range(page_count))
+    blank = set()
+    for _, found, error in process_map(blank_pages.scan_pages, blank_pages.chunk_tasks(source, pages),
+                                       jobs, cancel):
+        if error is not None:
+            raise error
+        blank.update(page_num for page_num, _ in found)
+    order = page_order if page_order is not None else pages
+    return [position for position, page in enumerate(order) if page in blank]
+
+
+def split_document(tasks, jobs=None, cancel=None):
+    """
+    Escribe las partes en paralelo. Produce el resultado de cada una en
+    orden: {'output', 'pages', 'ok', 'bytes' o 'error', 'seconds'}.
+    cancel es un threading.Event opcional para abandonar lo que quede.
+    """
+    if tasks:
+        os.makedirs(os.path.dirname(os.path.abspath(tasks[0]['output'])), exist_ok=True)
+    for task, result, error in process_map(write_part, tasks, jobs, cancel):
+        if error is not None:
+            result = {'output': task['output'], 'pages': len(task['pages']), 'ok': False,
+                      'error': str(error), 'seconds': 0.0}
+        yield result
+
+
+class SplitJob(BackgroundJob):
+    """
+    División en un hilo aparte, para la interfaz. make_tasks puede tardar
+    (p. ej. buscar las páginas en blanco); recibe el Event de cancelación.
+    """
+
+    def __init__(self, make_tasks, jobs=None):
+        super().__init__(make_tasks, split_document, jobs, name="split")
@@ -0,0 +1,379 @@
+"""
+Módulo para estampar texto e imágenes en todas las páginas: marcas de agua,
+numeración ("Página {page} de {total}") y numeración Bates.
+
+Los sellos fijos (un logo o un texto sin campos) se dibujan una sola vez y
+entran en el documento como un XObject de formulario que todas las páginas
+comparten. Los textos con campos cambian de una página a otra y se escriben
+con Helvetica, una de las fuentes estándar de PDF, que no se incrusta. Cada
+página solo recibe un pequeño flujo de contenido que dibuja los sellos, y
+los nombres de los recursos se añaden una sola vez a los diccionarios de
+recursos compartidos: Page.show_pdf_page e insert_text recorren los
+recursos de la página en cada llamada y, si son compartidos, crecen con
+cada página estampada (el coste se vuelve cuadrático).
+
+Las posiciones se calculan sobre el tamaño final de cada página
+(PageEditor.get_final_page_size) y en el sentido en que se ve la página,
+aunque esté rotada. Los sellos se aplican al guardar, después de las
+transformaciones pendientes.
+"""
+import functools
+import math
+import os
+import string
+
+import fitz  # PyMuPDF
+
+from logic.render_cache import render_cache
+from logic.tracing import annotate
+
+POSITIONS = ('top-left', 'top', 'top-right', 'center', 'bottom-left', 'bottom', 'bottom-right')
+# Campos que admiten las plantillas de texto
+FIELDS = ('page', 'total', 'bates')
+# Fuente estándar de PDF (no se incrusta)
+FONT = "helv"
+DEFAULT_FONT_SIZE = 10
+# Distancia (en puntos) entre el sello y el borde de la página
+DEFAULT_MARGIN = 24
+# Ancho (en puntos) de las imágenes si no se indica
+DEFAULT_IMAGE_WIDTH = 96
+DEFAULT_BATES_DIGITS = 6
+# Helvetica con la codificación de Windows (la de los textos, en cp1252)
+HELVETICA = "<</Type/Font/Subtype/Type1/BaseFont/Helvetica/Encoding/WinAnsiEncoding>>"
+
+
+def parse_color(value):
+    """Color "#rrggbb" (o "rrggbb") como tupla RGB de 0 a 1"""
+    value = value.strip().lstrip("#")
+    if len(value) != 6:
+        raise ValueError(f"Color no válido: {value} (se espera #rrggbb)")
+    return tuple(int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+
+
+def template_fields(template):
+    """Campos que usa una plantilla; ValueError si alguno no existe"""
+    try:
+        fields = {name for _, name, _, _ in string.Formatter().parse(template) if name is not None}
+    except ValueError as e:
+        raise ValueError(f"Plantilla no válida: {e}")
+    unknown = fields - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))} "
+                         f"(se admiten {', '.join('{' + f + '}' for f in FIELDS)})")
+    return fields
+
+
+@functools.lru_cache(maxsize=None)
+def _char_width(char):
+    return fitz.get_text_length(char, fontname=FONT, fontsize=1)
+
+
+def text_width(text, font_size):
+    """Ancho de un texto en Helvetica (sin interletraje: la suma de sus letras)"""
+    return sum(_char_width(char) for char in text) * font_size
+
+
+def place(page_width, page_height, width, height, position, margin=DEFAULT_MARGIN):
+    """Rectángulo width x height en esa posición de una página (como se ve)"""
+    if position not in POSITIONS:
+        raise ValueError(f"Posición no válida: {position}")
+    vertical, _, horizontal = position.partition("-") if "-" in position else (position, "", position)
+
+    if horizontal == "left":
+        x0 = margin
+    elif horizontal == "right":
+        x0 = page_width - margin - width
+    else:
+        x0 = (page_width - width) / 2
+    if vertical == "top":
+        y0 = margin
+    elif vertical == "bottom":
+        y0 = page_height - margin - height
+    else:
+        y0 = (page_height - height) / 2
+    return fitz.Rect(x0, y0, x0 + width, y0 + height)
+
+
+# =============================================================================
+# SELLOS FIJOS (un XObject compartido)
+# =============================================================================
+
+def text_stamp_pdf(text, font_size, color, opacity=1.0, angle=0):
+    """PDF de una página con el texto (girado angle grados a la izquierda) y nada más alrededor"""
+    width = fitz.get_text_length(text, fontname=FONT, fontsize=font_size)
+    height = font_size
+    radians = math.radians(angle)
+    box_width = width * abs(math.cos(radians)) + height * abs(math.sin(radians))
+    box_height = width * abs(math.sin(radians)) + height * abs(math.cos(radians))
+
+    src = fitz.open()
+    page = src.new_page(width=max(box_width, 1), height=max(box_height, 1))
+    center = fitz.Point(box_width / 2, box_height / 2)
+    # La línea base queda por debajo del centro (mayúsculas de ~0.7 del cuerpo)
+    origin = center + (-width / 2, 0.35 * font_size)
+    page.insert_text(origin, text, fontsize=font_size, fontname=FONT, color=color,
+                     fill_opacity=opacity, morph=(center, fitz.Matrix(angle)))
+    return src
+
+
+def image_stamp_pdf(path, width=DEFAULT_IMAGE_WIDTH):
+    """PDF de una página con la imagen a width puntos de ancho"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        pixel_width, pixel_height = img.size
+    src = fitz.open()
+    page = src.new_page(width=width, height=width * pixel_height / pixel_width)
+    page.insert_image(page.rect, filename=path)
+    return src
+
+
+# =============================================================================
+# OBJETOS DEL PDF
+# =============================================================================
+
+def new_object(doc, source, stream=None):
+    """Crea un objeto (con su flujo, si se indica) y retorna su xref"""
+    xref = doc.get_new_xref()
+    doc.update_object(xref, source)
+    if stream is not None:
+        doc.update_stream(xref, stream)
+    return xref
+
+
+def import_page(doc, src):
+    """
+    Copia la primera página de src a doc como XObject de formulario (con
+    BBox [0 0 ancho alto]) y retorna su xref. Se usa show_pdf_page sobre
+    una página provisional que luego se elimina.
+    """
+    rect = src[0].rect
+    scratch = doc.new_page(width=rect.width, height=rect.height)
+    try:
+        scratch.show_pdf_page(scratch.rect, src, 0)
+        # El XObject de la página de origen es el que está dentro del que
+        # show_pdf_page dibuja en la provisional
+        return next(xref for xref, _, referencer, _ in scratch.get_xobjects() if referencer)
+    finally:
+        doc.delete_page(scratch.number)
+
+
+def page_resources(doc, page_xref):
+    """
+    (xref, ruta) del diccionario de recursos de una página para
+    Document.xref_set_key: el objeto compartido o el de la propia página.
+    Si los hereda del árbol de páginas, la página pasa a indicarlos.
+    """
+    kind, value = doc.xref_get_key(page_xref, "Resources")
+    if kind == "xref":
+        return int(value.split()[0]), ""
+    if kind == "dict":
+        return page_xref, "Resources/"
+
+    node = page_xref
+    inherited = "<<>>"
+    while True:
+        kind, value = doc.xref_get_key(node, "Parent")
+        if kind != "xref":
+            break
+        node = int(value.split()[0])
+        kind, value = doc.xref_get_key(node, "Resources")
+        if kind in ("xref", "dict"):
+            inherited = value
+            break
+    doc.xref_set_key(page_xref, "Resources", inherited)
+    return page_resources(doc, page_xref)
+
+
+def page_contents(doc, page_xref):
+    """Referencias ("N 0 R") de los flujos de contenido de una página"""
+    kind, value = doc.xref_get_key(page_xref, "Contents")
+    if kind == "xref" and not doc.xref_is_stream(int(value.split()[0])):
+        kind, value = "array", doc.xref_object(int(value.split()[0]), compressed=True)
+    if kind == "xref":
+        return [value]
+    if kind == "array":
+        refs = value.strip("[] \n").split()
+        return [" ".join(refs[i:i + 3]) for i in range(0, len(refs), 3)]
+    return []
+
+
+def _numbers(values):
+    return " ".join(f"{v:.6g}" for v in values)
+
+
+# =============================================================================
+# GESTOR DE SELLOS
+# =============================================================================
+
+class StampManager:
+    """
+    Sellos pendientes de un documento. Se añaden en cualquier momento y se
+    aplican a todas las páginas al guardar (apply), en el orden final.
+    """
+
+    def __init__(self):
+        self.stamps = []
+        self.bates = None
+
+    def add_text(self, template, position='bottom-right', font_size=DEFAULT_FONT_SIZE,
+                 color=(0, 0, 0), opacity=1.0, angle=0, margin=DEFAULT_MARGIN):
+        """
+        Añade un texto. La plantilla puede usar {page}, {total} y {bates}.
+        angle (en grados) solo se admite en textos sin campos. Los
+        caracteres que no existen en cp1252 se escriben como "?".
+        """
+        fields = template_fields(template)
+        if 'bates' in fields and self.bates is None:
+            raise ValueError("La plantilla usa {bates} pero no hay numeración Bates")
+        if fields and angle:
+            raise ValueError("Los textos con campos no se pueden girar")
+        place(0, 0, 0, 0, position)  # Valida la posición
+        self.stamps.append({
+            'kind': 'text', 'template': template, 'fields': fields, 'position': position,
+            'font_size': font_size, 'color': tuple(color), 'opacity': opacity,
+            'angle': angle, 'margin': margin,
+        })
+
+    def add_image(self, path, position='top-right', width=DEFAULT_IMAGE_WIDTH, margin=DEFAULT_MARGIN):
+        """Añade una imagen (un logo) de width puntos de ancho"""
+        if not os.path.isfile(path):
+            raise ValueError(f"No existe la imagen: {path}")
+        place(0, 0, 0, 0, position)
+        self.stamps.append({'kind': 'image', 'path': path, 'position': position,
+                            'width': width, 'margin': margin})
+
+    def set_bates(self, prefix="", start=1, digits=DEFAULT_BATES_DIGITS):
+        """Numeración Bates: prefix seguido del número con digits cifras"""
+        if start < 0 or digits < 1:
+            raise ValueError("El número inicial y las cifras de Bates no son válidos")
+        self.bates = {'prefix': prefix, 'start': start, 'digits': digits}
+
+    def bates_number(self, position):
+        """Número Bates de la página en esa posición (0-based)"""
+        if self.bates is None:
+            return ""
+        return f"{self.bates['prefix']}{self.bates['start'] + position:0{self.bates['digits']}d}"
+
+    def has_stamps(self):
+        return bool(self.stamps)
+
+    def clear(self):
+        self.stamps = []
+        self.bates = None
+
+    def _source(self, stamp):
+        """PDF del sello si es fijo (se comparte entre páginas); None si tiene campos"""
+        if stamp['kind'] == 'image':
+            return image_stamp_pdf(stamp['path'], stamp['width'])
+        if not stamp['fields']:
+            return text_stamp_pdf(stamp['template'], stamp['font_size'], stamp['color'],
+                                  stamp['opacity'], stamp['angle'])
+        return None
+
+    def _prepare(self, doc):
+        """
+        Crea en doc los objetos que comparten todas las páginas: un XObject
+        por sello fijo, la fuente y un estado gráfico por opacidad. Retorna
+        {nombre del recurso: (tipo de recurso, xref)} y, por sello, lo que
+        necesita para dibujarse: ("XObject", nombre, ancho, alto) o
+        ("Font", fuente, estado gráfico o None).
+        """
+        # Nombres nuevos en cada estampado: los de uno anterior pueden estar
+        # en diccionarios de recursos compartidos por otras páginas
+        prefix = f"ePDF{os.urandom(3).hex()}"
+        resources = {}
+        names = []
+        for index, stamp in enumerate(self.stamps):
+            source = self._source(stamp)
+            if source is not None:
+                try:
+                    name = f"{prefix}S{index}"
+                    resources[name] = ("XObject", import_page(doc, source))
+                    size = source[0].rect
+                finally:
+                    source.close()
+                names.append(("XObject", name, size.width, size.height))
+                continue
+
+            font = f"{prefix}F"
+            if font not in resources:
+                resources[font] = ("Font", new_object(doc, HELVETICA))
+            state = None
+            if stamp['opacity'] < 1:
+                state = f"{prefix}G{round(stamp['opacity'] * 100)}"
+                if state not in resources:
+                    resources[state] = ("ExtGState", new_object(
+                        doc, f"<</Type/ExtGState/ca {stamp['opacity']:g}/CA {stamp['opacity']:g}>>"))
+            names.append(("Font", font, state))
+        return resources, names
+
+    def apply(self, doc, page_editor=None):
+        """
+        Estampa todas las páginas de doc. Las posiciones usan el tamaño
+        final de page_editor (o el de la página si no se indica).
+        Retorna el número de páginas estampadas.
+        """
+        if not doc or not self.stamps:
+            return 0
+
+        total = len(doc)
+        resources, names = self._prepare(doc)
+
+        # Primero se leen todas las páginas: tras crear un objeto, MuPDF
+        # vuelve a recorrer el árbol de páginas en la siguiente búsqueda
+        pages = []
+        for page_num in range(total):
+            page = doc[page_num]
+            if page_editor is not None:
+                size = page_editor.get_final_page_size(doc, page_num)
+            else:
+                size = (page.rect.width, page.rect.height)
+            # Del sentido en que se ve la página al espacio de usuario del PDF
+            pages.append((page.xref, size, page.derotation_matrix * ~page.transformation_matrix))
+
+        # El contenido original va entre q y Q para que no afecte a los sellos
+        save_state = new_object(doc, "<<>>", b"q\n")
+        done = set()
+        # Las páginas con los mismos sellos en el mismo sitio (solo sellos
+        # fijos y del mismo tamaño) comparten el flujo de contenido
+        streams = {}
+        for page_num, (page_xref, (page_width, page_height), to_pdf) in enumerate(pages):
+            fields = {'page': page_num + 1, 'total': total, 'bates': self.bates_number(page_num)}
+            ops = ["Q"]
+            for stamp, name in zip(self.stamps, names):
+                if name[0] == "XObject":
+                    _, xobject, width, height = name
+                    rect = place(page_width, page_height, width, height, stamp['position'], stamp['margin'])
+                    matrix = fitz.Matrix(1, 0, 0, -1, rect.x0, rect.y1) * to_pdf
+                    ops.append(f"q {_numbers(matrix)} cm /{xobject} Do Q")
+                    continue
+
+                _, font, state = name
+                text = stamp['template'].format(**fields)
+                font_size = stamp['font_size']
+                width = text_width(text, font_size)
+                rect = place(page_width, page_height, width, font_size, stamp['position'], stamp['margin'])
+                matrix = fitz.Matrix(1, 0, 0, -1, rect.x0, rect.y1 - 0.15 * font_size) * to_pdf
+                ops.append(
+                    "q " + (f"/{state} gs " if state else "")
+                    + f"{_numbers(stamp['color'])} rg BT /{font} {font_size:g} Tf {_numbers(matrix)} Tm "
+                    + f"<{text.encode('cp1252', errors='replace').hex()}> Tj ET Q")
+
+            target = page_resources(doc, page_xref)
+            if target not in done or target[1]:
+                # Un diccionario compartido solo se completa una vez
+                for resource, (kind, xref) in resources.items():
+                    doc.xref_set_key(target[0], f"{target[1]}{kind}/{resource}", f"{xref} 0 R")
+                done.add(target)
+            content = "\n".join(ops).encode("latin-1")
+            stamp_stream = streams.get(content)
+            if stamp_stream is None:
+                stamp_stream = streams[content] = new_object(doc, "<<>>", content)
+            contents = page_contents(doc, page_xref)
+            doc.xref_set_key(page_xref, "Contents",
+                             f"[{save_state} 0 R {' '.join(contents)} {stamp_stream} 0 R]")
+
+        render_cache.discard_document(doc)
+        annotate(pages=total, stamps=len(self.stamps))
+        return total
@@ -0,0 +1,28 @@
+"""
+Módulo para medir el tiempo de las etapas de un proceso.
+"""
+import time
+
+
+class StageTimer:
+    """
+    Anota cuánto tarda en completarse cada etapa desde que se creó el
+    temporizador (p. ej. primera página visible, documento completo).
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+
+    def mark(self, stage):
+        """Anota el fin de una etapa (solo la primera vez) y retorna los segundos"""
+        if stage not in self.stages:
+            self.stages[stage] = time.perf_counter() - self.start
+        return self.stages[stage]
+
+    def get(self, stage):
+        return self.stages.get(stage)
+
+    def as_dict(self):
+        """Segundos de cada etapa, redondeados a milisegundos"""
+        return {stage: round(seconds, 3) for stage, seconds in self.stages.items()}
@@ -0,0 +1,231 @@
+"""
+Módulo de trazas de rendimiento.
+
+Registra un "span" (inicio, duración, páginas y bytes producidos) por cada
+llamada a los métodos públicos de los managers y a los renderizados de la
+interfaz, y lo exporta en el formato de Chrome trace, que se abre con
+chrome://tracing o https://ui.perfetto.dev.
+
+Con las trazas desactivadas (lo normal) cada método instrumentado solo
+comprueba un atributo antes de llamar al original.
+"""
+import functools
+import os
+import threading
+import time
+import types
+from collections import deque
+
+# Variable de entorno para activar las trazas al arrancar: ruta del JSON
+TRACE_ENV = "EASYPDF_TRACE"
+
+# Spans guardados como máximo (los más antiguos se descartan)
+MAX_EVENTS = 200000
+
+
+class Tracer:
+    """Guarda los spans terminados mientras está activo"""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.events = deque(maxlen=max_events)
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._thread_names = {}
+        # Objetos con begin(span, profundidad) y end(span) que añaden datos a los spans
+        self.probes = []
+
+    def start(self):
+        """Empieza a registrar (descarta lo registrado antes)"""
+        self.events.clear()
+        self._thread_names.clear()
+        self._origin = time.perf_counter()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name, args=None):
+        """Abre un span en el hilo actual. Retorna el span (o None si está inactivo)"""
+        if not self.enabled:
+            return None
+        span = {'name': name, 'args': dict(args or {})}
+        stack = self._stack()
+        for probe in self.probes:
+            probe.begin(span, len(stack))
+        span['start'] = time.perf_counter()
+        stack.append(span)
+        return span
+
+    def end(self, span):
+        if span is None:
+            return
+        end = time.perf_counter()
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        for probe in self.probes:
+            probe.end(span)
+        thread = threading.current_thread()
+        self._thread_names.setdefault(thread.ident, thread.name)
+        self.events.append((span['name'], span['start'], end - span['start'],
+                            thread.ident, span['args']))
+
+    def span(self, name, **args):
+        """Context manager: `with tracer.span("guardar", pages=3): ...`"""
+        return _Span(self, name, args)
+
+    def annotate(self, **args):
+        """Añade datos (pages, bytes...) al span abierto en el hilo actual"""
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1]['args'].update(args)
+
+    def to_chrome_trace(self):
+        """Retorna los spans en el formato JSON de Chrome trace / Perfetto"""
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': 'easyPDF'}}]
+        for tid, thread_name in self._thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                           'args': {'name': thread_name}})
+        for name, start, duration, tid, args in list(self.events):
+            events.append({
+                'name': name,
+                'cat': name.split(".", 1)[0],
+                'ph': 'X',
+                'ts': round((start - self._origin) * 1e6, 1),
+                'dur': round(duration * 1e6, 1),
+                'pid': pid,
+                'tid': tid,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        """Escribe la traza en path. Retorna el número de spans exportados"""
+        import json
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return len(self.events)
+
+
+class _Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.tracer.begin(self.name, self.args)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None and exc_type is not None:
+            self.span['args']['error'] = exc_type.__name__
+        self.tracer.end(self.span)
+        return False
+
+
+# Tracer único del proceso
+tracer = Tracer()
+
+
+def annotate(**args):
+    """Añade datos al span actual (no hace nada si las trazas están desactivadas)"""
+    tracer.annotate(**args)
+
+
+# =============================================================================
+# INSTRUMENTACIÓN
+# =============================================================================
+
+def _describe_result(result, args):
+    """Páginas y bytes producidos a partir del valor de retorno"""
+    values = result if isinstance(result, tuple) else (result,)
+    for value in values:
+        if hasattr(value, "page_count") and 'pages' not in args:
+            # Documento de PyMuPDF
+            args['pages'] = value.page_count
+        elif hasattr(value, "stride") and hasattr(value, "height"):
+            # Pixmap
+            args['bytes'] = args.get('bytes', 0) + value.stride * value.height
+        elif isinstance(value, (bytes, bytearray)):
+            args['bytes'] = args.get('bytes', 0) + len(value)
+        elif isinstance(value, dict) and isinstance(value.get('bytes'), (bytes, bytearray)):
+            args['bytes'] = args.get('bytes', 0) + len(value['bytes'])
+
+
+def traced(name):
+    """
+    Decorador que registra un span por llamada. Si la función recibe
+    page_num, se anota como la página tocada.
+    """
+    def decorator(fn):
+        code = fn.__code__
+        params = list(code.co_varnames[:code.co_argcount])
+        page_index = params.index('page_num') if 'page_num' in params else None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+
+            span_args = {}
+            if page_index is not None:
+                page = kwargs['page_num'] if 'page_num' in kwargs else \
+                    args[page_index] if page_index < len(args) else None
+                if isinstance(page, int):
+                    span_args['page'] = page
+            span = tracer.begin(name, span_args)
+            if span is None:
+                return fn(*args, **kwargs)
+            try:
+                result = fn(*args, **kwargs)
+                _describe_result(result, span['args'])
+                return result
+            except Exception as e:
+                span['args']['error'] = type(e).__name__
+                raise
+            finally:
+                tracer.end(span)
+        return wrapper
+    return decorator
+
+
+def traced_class(prefix):
+    """
+    Decorador de clase: instrumenta todos sus métodos públicos con el
+    nombre "<prefix>.<método>".
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not isinstance(value, types.FunctionType):
+                continue
+            setattr(cls, attr, traced(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+
+def start_from_environment():
+    """
+    Si EASYPDF_TRACE indica una ruta, activa las trazas y las exporta a esa
+    ruta al terminar el proceso. Retorna la ruta o None.
+    """
+    path = os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    import atexit
+    tracer.start()
+    atexit.register(tracer.export, path)
+    return path
@@ -0,0 +1,202 @@
+"""
+Módulo con utilidades para repartir trabajo entre hilos o procesos.
+"""
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from logic.tracing import tracer
+
+
+def default_workers(limit=8):
+    """Número de trabajadores por defecto según los núcleos disponibles"""
+    return max(1, min(limit, os.cpu_count() or 1))
+
+
+def init_process_worker():
+    """Inicializador de los procesos trabajadores: Ctrl+C lo gestiona el proceso principal"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def process_pool(max_workers=None):
+    """
+    Pool de procesos para trabajo pesado de PyMuPDF. Los procesos se crean
+    con "spawn" para no duplicar el proceso de la interfaz con sus hilos.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=max_workers or default_workers(),
+                               mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_process_worker)
+
+
+# Documento abierto en este proceso trabajador: (ruta, mtime, doc)
+_cached_document = None
+
+
+def cached_document(path):
+    """
+    Abre un PDF una sola vez por proceso trabajador, para las tareas que
+    leen del mismo archivo. Se vuelve a abrir si el archivo cambia.
+    """
+    global _cached_document
+    import fitz  # PyMuPDF
+
+    mtime = os.path.getmtime(path)
+    if _cached_document is None or _cached_document[:2] != (path, mtime):
+        close_cached_document()
+        _cached_document = (path, mtime, fitz.open(path))
+    return _cached_document[2]
+
+
+def close_cached_document():
+    global _cached_document
+    if _cached_document is not None:
+        _cached_document[2].close()
+        _cached_document = None
+
+
+def document_source(doc):
+    """
+    Ruta de la que pueden leer los procesos trabajadores el contenido
+    actual de doc: su archivo si no ha cambiado en memoria o, si no, una
+    copia temporal. Retorna (ruta, es_temporal); quien llama borra la copia.
+    """
+    import tempfile
+
+    if doc.name and not doc.is_dirty and os.path.isfile(doc.name):
+        return doc.name, False
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    doc.save(path)
+    return path, True
+
+
+def ordered_map(fn, items, max_workers=None, window=None, executor=None):
+    """
+    Aplica fn a cada elemento en paralelo y produce (item, resultado, error)
+    en el orden original.
+
+    Como máximo hay `window` tareas en vuelo, así que la memoria ocupada por
+    resultados pendientes está acotada aunque haya miles de elementos.
+    Si se pasa un executor (de hilos o de procesos) se reutiliza; si no, se
+    crea un ThreadPoolExecutor temporal.
+    """
+    max_workers = max_workers or default_workers()
+    window = window or max_workers * 2
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    pending = deque()
+    items = iter(items)
+
+    try:
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) >= window:
+                yield _take(pending)
+
+        while pending:
+            yield _take(pending)
+    finally:
+        # Si el consumidor abandona el generador, cancelar lo que quede
+        for _, future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+
+
+def _take(pending):
+    item, future = pending.popleft()
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
+
+
+def process_map(fn, tasks, jobs=None, cancel=None):
+    """
+    ordered_map en un pool de procesos, para tareas que abren el PDF con
+    cached_document. Con un solo trabajo, una sola tarea o las trazas
+    activas se hace todo en este proceso (así las trazas quedan registradas).
+    Produce (tarea, resultado, error) en el orden de las tareas. cancel es
+    un threading.Event opcional para abandonar lo que quede.
+    """
+    tasks = list(tasks)
+    jobs = jobs or default_workers(limit=os.cpu_count() or 1)
+    if jobs <= 1 or len(tasks) <= 1 or tracer.enabled:
+        try:
+            for task in tasks:
+                if cancel is not None and cancel.is_set():
+                    return
+                try:
+                    yield task, fn(task), None
+                except Exception as e:
+                    yield task, None, e
+        finally:
+            close_cached_document()
+        return
+
+    executor = process_pool(min(jobs, len(tasks)))
+    try:
+        for item in ordered_map(fn, tasks, executor=executor, window=jobs * 2):
+            if cancel is not None and cancel.is_set():
+                break
+            yield item
+    finally:
+        executor.shutdown(wait=True)
+
+
+class BackgroundJob:
+    """
+    Trabajo por tareas en un hilo aparte, para la interfaz: expone el
+    progreso (done/total) y el resultado sin bloquear el bucle de eventos.
+    make_tasks(cancel) se llama en ese hilo, así que puede tardar; después
+    run(tareas, jobs, cancel) produce un resultado por tarea con 'ok'.
+    """
+
+    def __init__(self, make_tasks, run, jobs=None, name="job"):
+        self.make_tasks = make_tasks
+        self.run = run
+        self.jobs = jobs
+        self.total = 0
+        self.done = 0
+        self.failed = []
+        self.error = None
+        self.seconds = None
+        self.cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def wait(self):
+        self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            tasks = self.make_tasks(self.cancel_event)
+            self.total = len(tasks)
+            for result in self.run(tasks, self.jobs, self.cancel_event):
+                if not result['ok']:
+                    self.failed.append(result)
+                self.done += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.seconds = time.perf_counter() - start
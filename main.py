@@ -2,18 +2,35 @@
 PDF Bookmark Editor - Punto de entrada principal.
 
 Aplicación para editar marcadores de PDFs, reordenar páginas y fusionar documentos.
+Con argumentos (p. ej. `python main.py merge a.pdf b.pdf -o out.pdf`) se
+ejecuta la línea de comandos sin cargar la interfaz gráfica.
 """
-import tkinter as tk
-from ui.app import PDFEditorApp
+import os
+import sys
 
 
 def main():
+    import tkinter as tk
+    from logic import memory, tracing
+    from ui.app import PDFEditorApp
+
+    # EASYPDF_TRACE=traza.json: registrar trazas desde el arranque
+    tracing.start_from_environment()
+    # EASYPDF_TRACEMALLOC=1: medir la memoria de cada operación
+    memory.start_from_environment()
+
     root = tk.Tk()
     root.geometry("950x600")
     app = PDFEditorApp(root)
+    if os.environ.get("EASYPDF_STARTUP_PROBE"):
+        # Medición de arranque (python main.py startup)
+        from cli.startup import report_first_window
+        report_first_window(root, app)
     root.mainloop()
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from cli.main import run
+        sys.exit(run(sys.argv[1:]))
     main()
-
@@ -1,21 +1,52 @@
 """
 Clase principal de la aplicación PDF Editor.
+
+Para que la ventana aparezca cuanto antes, fitz y PIL (lo más lento de
+importar) no se cargan al arrancar: los managers que los usan se crean la
+primera vez que se necesitan y, mientras tanto, se precargan en segundo
+plano. Los paneles de los modos ordenar y editar se construyen al activarlos.
 """
 import io
+import logging
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
 
-from ui.panels import build_left_panel, build_center_panel, build_right_panel
+from ui.notifier import MessageBoxNotifier
+from ui.panels import (
+    build_left_panel, build_center_panel, build_right_panel,
+    build_preview_panel, build_edit_panel
+)
 from ui.styles import (
     COLORS, FONTS, apply_theme,
     create_styled_button, create_styled_frame, create_styled_checkbutton,
-    create_styled_label
+    create_styled_entry, create_styled_label
 )
-from logic.pdf_handler import PDFHandler
-from logic.bookmarks import BookmarkManager
-from logic.page_order import PageOrderManager
-from logic.page_editor import PageEditor
+from logic.memory import memory
+from logic.perf_stats import perf_stats, timed
+from logic.session import PDFSession
+from logic.timing import StageTimer
+from logic.tracing import annotate, traced, tracer
+
+# Paneles que se construyen la primera vez que se muestran
+MODE_PANELS = {
+    'preview_frame': build_preview_panel,
+    'edit_frame': build_edit_panel,
+}
+
+# Tiempo máximo de cada tanda de miniaturas antes de devolver el control a la ventana
+THUMBNAIL_BATCH_SECONDS = 0.04
+# Escala a la que se renderizan las miniaturas
+THUMBNAIL_SCALE = 0.15
+
+# Módulos que se precargan en segundo plano tras mostrar la ventana
+PRELOAD_MODULES = ("fitz", "PIL.Image", "logic.pdf_handler", "logic.page_editor", "logic.search")
+
+# Espera tras la última tecla antes de buscar (ms)
+SEARCH_DELAY_MS = 150
+# Intervalo con el que se comprueba el progreso del índice de búsqueda (ms)
+SEARCH_POLL_MS = 300
 
 
 class PDFEditorApp:
@@ -27,14 +58,12 @@ class PDFEditorApp:
         # Aplicar tema oscuro
         apply_theme(root)
 
-        # Managers de lógica
-        self.pdf_handler = PDFHandler()
-        self.bookmark_manager = BookmarkManager()
-        self.page_order_manager = PageOrderManager()
-        self.page_editor = PageEditor()
+        # Documento y managers de lógica: la misma sesión que usa la consola
+        # (pdf_handler, page_editor y stamp_manager se crean al usarlos)
+        self.session = PDFSession(MessageBoxNotifier())
+        self._search_builder = None
 
         # Estado de la UI
-        self.doc = None
         self.thumbnails = []
         self.current_page = None
         self.order_mode = False
@@ -43,9 +72,100 @@ class PDFEditorApp:
         self.preview_image = None
         self.original_preview_image = None
         self.result_preview_image = None
+        self.preview_frame = None
+        self.edit_frame = None
+        self.thumb_info_frames = []
+        # Posiciones marcadas en el modo ordenar (para eliminar, duplicar...)
+        # y avisos por posición bajo las miniaturas (p. ej. páginas repetidas)
+        self.selected_positions = set()
+        self.page_marks = {}
+        self._thumb_generation = 0
+        self._thumbs_started = None
+        self.thumbnails_pending = 0
+        self._preload_thread = None
+        self.hud = None
+
+        # Búsqueda: aciertos de la última consulta y el que se está mostrando
+        self.search_hits = []
+        self.search_hit_index = -1
+        self._search_job = None
+        self._search_poll_job = None
+
+        # Apertura por etapas: tiempos de la última apertura y etapas pendientes
+        self.open_metrics = None
+        self._open_timer = None
+        self._open_pending = set()
+        self._outline_pending = False
 
         self.build_ui()
 
+        # Cuando la ventana ya esté en pantalla, precargar lo que falta
+        self.root.after(200, self.preload_modules)
+
+    # =========================================================================
+    # CARGA DIFERIDA
+    # =========================================================================
+
+    @property
+    def doc(self):
+        return self.session.doc
+
+    @doc.setter
+    def doc(self, doc):
+        self.session.doc = doc
+
+    @property
+    def pdf_handler(self):
+        return self.session.pdf_handler
+
+    @property
+    def page_editor(self):
+        return self.session.page_editor
+
+    @property
+    def stamp_manager(self):
+        return self.session.stamp_manager
+
+    @property
+    def bookmark_manager(self):
+        return self.session.bookmark_manager
+
+    @property
+    def page_order_manager(self):
+        return self.session.page_order_manager
+
+    @property
+    def search_builder(self):
+        """Constructor del índice de búsqueda (su índice es search_builder.index)"""
+        if self._search_builder is None:
+            from logic.search import IndexBuilder, IndexStore, SearchIndex
+            self._search_builder = IndexBuilder(SearchIndex(), IndexStore())
+        return self._search_builder
+
+    def preload_modules(self):
+        """Importa en un hilo los módulos pesados para que el primer uso no espere"""
+        def preload():
+            import importlib
+            for name in PRELOAD_MODULES:
+                try:
+                    importlib.import_module(name)
+                except ImportError:
+                    pass
+        self._preload_thread = threading.Thread(target=preload, daemon=True)
+        self._preload_thread.start()
+
+    def get_mode_panel(self, name):
+        """Retorna el panel de un modo, construyéndolo si es la primera vez"""
+        if getattr(self, name) is None:
+            MODE_PANELS[name](self)
+        return getattr(self, name)
+
+    def hide_mode_panel(self, name):
+        """Oculta el panel de un modo si ya se construyó"""
+        frame = getattr(self, name)
+        if frame is not None:
+            frame.pack_forget()
+
     def build_ui(self):
         """Construye la interfaz de usuario"""
         # Barra superior
@@ -65,6 +185,11 @@ class PDFEditorApp:
         # Botones de archivo
         create_styled_button(top_inner, "📂 Cargar", self.load_pdf, 'normal').pack(side="left", padx=3)
         create_styled_button(top_inner, "💾 Guardar", self.save_pdf, 'success').pack(side="left", padx=3)
+        create_styled_button(top_inner, "✂️ Dividir", self.split_pdf, 'normal').pack(side="left", padx=3)
+        create_styled_button(top_inner, "🗜️ Optimizar", self.optimize_images, 'normal').pack(side="left", padx=3)
+        create_styled_button(top_inner, "🖼️ Exportar", self.export_images, 'normal').pack(side="left", padx=3)
+        create_styled_button(top_inner, "🗞️ Imponer", self.impose_pdf, 'normal').pack(side="left", padx=3)
+        create_styled_button(top_inner, "🔖 Sellos", self.stamp_pages, 'normal').pack(side="left", padx=3)
 
         # Separador
         sep1 = create_styled_frame(top_inner, 'light', width=2)
@@ -92,6 +217,23 @@ class PDFEditorApp:
         self.edit_switch.config(bg=COLORS['bg_medium'])
         self.edit_switch.pack(side="left", padx=8)
 
+        # Búsqueda (a la derecha)
+        search_frame = create_styled_frame(top_inner, 'medium')
+        search_frame.pack(side="right")
+        self.search_status = tk.Label(search_frame, text="", width=16, anchor="e",
+                                      bg=COLORS['bg_medium'], fg=COLORS['text_muted'], font=FONTS['small'])
+        self.search_status.pack(side="left", padx=(0, 6))
+        self.search_entry = create_styled_entry(search_frame, width=22)
+        self.search_entry.pack(side="left", ipady=4)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", lambda e: self.next_search_hit())
+        self.search_entry.bind("<Shift-Return>", lambda e: self.previous_search_hit())
+        self.search_entry.bind("<Escape>", self.clear_search)
+        create_styled_button(search_frame, "◀", self.previous_search_hit, 'normal',
+                             width=2).pack(side="left", padx=(4, 1))
+        create_styled_button(search_frame, "▶", self.next_search_hit, 'normal',
+                             width=2).pack(side="left", padx=1)
+
         # Contenedor principal con 3 paneles
         main = tk.PanedWindow(self.root, orient="horizontal",
                              bg=COLORS['border'], sashwidth=4, sashpad=2)
@@ -106,52 +248,235 @@ class PDFEditorApp:
         main.add(center_frame)
         main.add(right_frame)
 
+        # Ctrl+Mayús+T: empezar/terminar de registrar trazas de rendimiento
+        self.root.bind("<Control-T>", self.toggle_tracing)
+        # F12: panel de rendimiento
+        self.root.bind("<F12>", self.toggle_hud)
+        # Ctrl+F: buscar
+        self.root.bind("<Control-f>", self.focus_search)
+
+    def toggle_hud(self, event=None):
+        """Muestra u oculta el panel de rendimiento"""
+        if self.hud is None:
+            from ui.hud import PerformanceHUD
+            self.hud = PerformanceHUD(self)
+        self.hud.toggle()
+
+    def background_jobs(self):
+        """Trabajos pendientes en segundo plano, por tipo"""
+        return {
+            'miniaturas': self.thumbnails_pending,
+            'índice': 1 if self._outline_pending else 0,
+            'búsqueda': self._search_builder.index.pending_count() if self._search_builder else 0,
+            'precarga': 1 if self._preload_thread and self._preload_thread.is_alive() else 0,
+        }
+
+    def conversion_cache_stats(self):
+        """(aciertos, fallos) de la caché de documentos convertidos, si ya se usó"""
+        cache = self.session.conversion_cache
+        if cache is None:
+            return None
+        return cache.hits, cache.misses
+
+    def toggle_tracing(self, event=None):
+        """Activa las trazas o, si ya estaban activas, las detiene y las exporta"""
+        if not tracer.enabled:
+            tracer.start()
+            self.page_label.config(text="⏺ Registrando trazas (Ctrl+Mayús+T para terminar)")
+            return
+
+        tracer.stop()
+        self.page_label.config(text="")
+        path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="easypdf-trace.json",
+                                            filetypes=[("Chrome trace", "*.json")])
+        if not path:
+            return
+        count = tracer.export(path)
+        messagebox.showinfo("Trazas", f"{count} operaciones guardadas en:\n{path}\n\n"
+                                      "Se pueden abrir en https://ui.perfetto.dev o chrome://tracing")
+
     # =========================================================================
     # CARGA Y GUARDADO
     # =========================================================================
 
     def load_pdf(self):
         """Carga un archivo PDF"""
-        doc, toc = self.pdf_handler.load()
-        if not doc:
+        path = filedialog.askopenfilename(filetypes=[("PDF", "*.pdf")])
+        if not path:
+            return
+        self.open_pdf(path)
+
+    def open_pdf(self, path):
+        """
+        Abre un PDF por etapas para que algo aparezca cuanto antes:
+        1. la primera página y el número de páginas,
+        2. el índice (marcadores),
+        3. el resto de miniaturas, por tandas.
+        Las etapas 2 y 3 se hacen desde el bucle de eventos, sin bloquear
+        la ventana. Los tiempos quedan en self.open_metrics.
+        """
+        timer = StageTimer()
+        try:
+            doc = self.pdf_handler.open_document(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo abrir el PDF:\n{e}")
             return
 
         self.doc = doc
-        self.bookmark_manager.set_toc(toc)
+        self.bookmark_manager.set_toc([])
         self.page_order_manager.initialize(len(doc))
         self.current_page = None
+        self.selected_positions = set()
+        if self.session.has_stamps():
+            self.stamp_manager.clear()
+
+        self.open_metrics = None
+        self._open_timer = timer
+        self._open_pending = {'outline', 'thumbnails'}
+        self._outline_pending = True
+
+        self.tree.delete(*self.tree.get_children())
+        self.page_bookmarks_list.delete(0, tk.END)
+        self.page_label.config(text=f"📄 {len(doc)} páginas · cargando...")
 
+        # Etapa 1: primera tanda de miniaturas (al menos la página 1)
         self.load_thumbnails()
+        if self.order_mode and len(doc):
+            self.show_preview(0)
+        self.root.update_idletasks()
+        timer.mark('first_pixel')
+
+        # El texto para la búsqueda se extrae en otros procesos mientras tanto
+        self.reset_search_index()
+        self.search_builder.index_file(path, 0, len(doc))
+        self.watch_search_index()
+
+        # Etapa 2: el índice va antes que las tandas de miniaturas pendientes
+        self.root.after(0, self.ensure_outline)
+
+    def ensure_outline(self):
+        """
+        Carga el índice del documento si aún está pendiente. Se llama también
+        antes de cualquier operación que use los marcadores.
+        """
+        if not self._outline_pending or not self.doc:
+            return
+        self._outline_pending = False
+
+        self.bookmark_manager.set_toc(self.pdf_handler.get_toc(self.doc))
         self.refresh_tree()
-        self.page_label.config(text="Selecciona una página")
-        self.page_bookmarks_list.delete(0, tk.END)
+        # Las miniaturas ya construidas no sabían aún cuántos marcadores tenían
+        for info_frame, page_num in self.thumb_info_frames:
+            self.add_bookmark_indicator(info_frame, page_num)
+        self.finish_open_stage('outline')
+
+    def finish_open_stage(self, stage):
+        """Anota el fin de una etapa de la apertura y, si es la última, los tiempos"""
+        if not self._open_timer or stage not in self._open_pending:
+            return
+        self._open_timer.mark(stage)
+        self._open_pending.discard(stage)
+        if self._open_pending:
+            return
+
+        self._open_timer.mark('fully_loaded')
+        self.open_metrics = self._open_timer.as_dict()
+        self._open_timer = None
+        logging.getLogger("easypdf").info("PDF abierto: %s", self.open_metrics)
+
+        if self.current_page is None and self.doc:
+            self.page_label.config(
+                text=f"📄 {len(self.doc)} páginas · "
+                     f"primera página en {self.open_metrics['first_pixel'] * 1000:.0f} ms, "
+                     f"completo en {self.open_metrics['fully_loaded'] * 1000:.0f} ms")
+        self.root.event_generate("<<DocumentLoaded>>", when="tail")
 
     def save_pdf(self):
         """Guarda el PDF"""
         if not self.doc:
             messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
             return
+        self.ensure_outline()
+        out = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")])
+        if not out:
+            return
 
-        # Aplicar reordenación si es necesario
-        if self.page_order_manager.has_changes():
-            new_toc = self.page_order_manager.apply_reorder(
-                self.doc,
-                self.bookmark_manager.get_toc()
-            )
-            self.bookmark_manager.set_toc(new_toc)
+        def reindex_pages(pages):
+            # El texto de esas páginas ha cambiado de sitio
+            self.search_builder.index_doc_pages(self.doc, pages)
 
-        # Aplicar transformaciones de página (escala)
-        if self.page_editor.has_pending_transforms():
-            self.page_editor.apply_all_transforms(self.doc)
+        # Orden, transformaciones y sellos pendientes se aplican aunque falle
+        # la escritura, así que la vista se rehace en cualquier caso
+        self.session.save(out, on_reorder=self.search_builder.index.remap,
+                          on_transform=reindex_pages)
+        self.refresh_tree()
+        self.load_thumbnails()
+        self.run_search()
 
-        # Normalizar jerarquía
-        normalized_toc = self.bookmark_manager.normalize_hierarchy()
+    def split_pdf(self):
+        """Divide el documento en varios PDFs (en procesos trabajadores)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from ui.split_dialog import SplitDialog
+        SplitDialog(self)
 
-        # Guardar
-        if self.pdf_handler.save(self.doc, normalized_toc):
-            self.bookmark_manager.set_toc(normalized_toc)
-            self.refresh_tree()
-            self.load_thumbnails()
+    def export_images(self):
+        """Exporta páginas como imágenes (en procesos trabajadores)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from ui.export_dialog import ExportDialog
+        ExportDialog(self)
+
+    def impose_pdf(self):
+        """Guarda el documento impuesto en hojas de impresión (N-up o cuadernillo)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from ui.impose_dialog import ImposeDialog
+        ImposeDialog(self)
+
+    def stamp_pages(self):
+        """Numeración, Bates, marcas de agua y logos (se aplican al guardar)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from ui.stamp_dialog import StampDialog
+        StampDialog(self)
+
+    def optimize_images(self):
+        """Reduce y recomprime las imágenes del documento (en procesos trabajadores)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from logic import image_optimizer
+
+        dpi = image_optimizer.DEFAULT_TARGET_DPI
+        if not messagebox.askyesno(
+                "Optimizar imágenes",
+                f"Las imágenes se reducirán a {dpi} ppp según el tamaño al que se muestran "
+                "y se volverán a comprimir.\nEl cambio se aplica al documento abierto.\n\n¿Continuar?"):
+            return
+
+        def progress(done, total):
+            self.page_label.config(text=f"🗜️ Optimizando imágenes: {done} de {total}")
+            self.root.update_idletasks()
+
+        self.root.config(cursor="wait")
+        self.root.update()
+        try:
+            report = image_optimizer.optimize_images(self.doc, dpi, progress=progress)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron optimizar las imágenes:\n{e}")
+            return
+        finally:
+            self.root.config(cursor="")
+
+        self.load_thumbnails()
+        if self.current_page is not None:
+            self.show_preview(self.current_page - 1)
+        messagebox.showinfo("Optimizar imágenes", image_optimizer.format_report(report))
 
     def merge_multiple_pdfs(self):
         """Fusiona múltiples PDFs seleccionados con el actual"""
@@ -161,26 +486,27 @@ class PDFEditorApp:
         )
         if not paths:
             return
+        self.ensure_outline()
 
         total_added = 0
+        saved_before = self.pdf_handler.deduplicator.bytes_saved if self.doc else 0
         for path in paths:
-            result = self.pdf_handler.merge_single(
-                self.doc,
-                self.bookmark_manager.get_toc(),
-                self.page_order_manager.get_order(),
-                path
-            )
-
-            if result:
-                self.doc, toc, page_order = result
-                self.bookmark_manager.set_toc(toc)
-                self.page_order_manager.set_order(page_order)
+            if not self.doc:
+                self.reset_search_index()
+            page_count = len(self.doc) if self.doc else 0
+            if self.session.merge([path]):
+                self.search_builder.index_file(path, page_count, len(self.doc) - page_count)
                 total_added += 1
 
         if total_added > 0:
             self.load_thumbnails()
             self.refresh_tree()
-            messagebox.showinfo("OK", f"Se añadieron {total_added} PDF(s). Total de páginas: {len(self.doc)}")
+            self.watch_search_index()
+            saved = self.pdf_handler.deduplicator.bytes_saved - saved_before
+            msg = f"Se añadieron {total_added} PDF(s). Total de páginas: {len(self.doc)}"
+            if saved > 0:
+                msg += f"\nRecursos duplicados compartidos: {saved / 1024:.0f} KB ahorrados"
+            messagebox.showinfo("OK", msg)
 
     def add_images(self):
         """Añade imágenes como nuevas páginas al PDF"""
@@ -199,16 +525,14 @@ class PDFEditorApp:
         )
         if not paths:
             return
+        if not self.doc:
+            self.reset_search_index()
 
-        result = self.pdf_handler.add_images_as_pages(
-            self.doc,
-            self.page_order_manager.get_order(),
-            paths
-        )
-
-        if result:
-            self.doc, page_order, added_count = result
-            self.page_order_manager.set_order(page_order)
+        added_count = self.session.add_images(paths)
+        if added_count:
+            # Las páginas de imagen no tienen texto
+            index = self.search_builder.index
+            index.extend(len(self.doc) - index.page_count)
             self.load_thumbnails()
             self.refresh_tree()
             messagebox.showinfo("OK", f"Se añadieron {added_count} imagen(es) como páginas. Total: {len(self.doc)}")
@@ -229,23 +553,20 @@ class PDFEditorApp:
         )
         if not paths:
             return
+        self.ensure_outline()
+        if not self.doc:
+            self.reset_search_index()
+        page_count = len(self.doc) if self.doc else 0
 
         # Mostrar mensaje de espera (la conversión puede tardar)
         self.root.config(cursor="wait")
         self.root.update()
 
         try:
-            result = self.pdf_handler.add_documents_as_pages(
-                self.doc,
-                self.bookmark_manager.get_toc(),
-                self.page_order_manager.get_order(),
-                paths
-            )
-
-            if result:
-                self.doc, toc, page_order, added_count = result
-                self.bookmark_manager.set_toc(toc)
-                self.page_order_manager.set_order(page_order)
+            added_count = self.session.add_documents(paths)
+            if added_count:
+                # Los documentos convertidos solo existen en memoria
+                self.search_builder.index_doc_pages(self.doc, range(page_count, len(self.doc)))
                 self.load_thumbnails()
                 self.refresh_tree()
                 messagebox.showinfo("OK", f"Se añadieron {added_count} documento(s) como páginas. Total: {len(self.doc)}")
@@ -267,106 +588,167 @@ class PDFEditorApp:
     # MINIATURAS
     # =========================================================================
 
+    @traced("ui.load_thumbnails")
     def load_thumbnails(self):
-        """Carga las miniaturas de todas las páginas"""
+        """
+        Carga las miniaturas de todas las páginas. Se construyen por tandas
+        cortas para que la ventana siga respondiendo en documentos grandes:
+        la primera tanda se muestra enseguida y el resto se va añadiendo.
+        """
         for widget in self.thumb_frame.winfo_children():
             widget.destroy()
         self.thumbnails = []
+        memory.untrack_all('thumbnails')
+        self.thumb_info_frames = []
 
-        page_order = self.page_order_manager.get_order()
+        # Una carga nueva cancela las tandas pendientes de la anterior
+        self._thumb_generation += 1
+
+        page_order = list(self.page_order_manager.get_order())
+        self.thumbnails_pending = 0
 
         if not self.doc or not page_order:
+            self.finish_open_stage('thumbnails')
             return
 
-        for idx, page_num in enumerate(page_order):
-            pix = self.pdf_handler.get_page_pixmap(self.doc, page_num, scale=0.15)
-            if not pix:
-                continue
+        self._thumbs_started = time.perf_counter()
+        self._load_thumbnail_batch(self._thumb_generation, page_order, 0)
 
-            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-            photo = ImageTk.PhotoImage(img)
-            self.thumbnails.append(photo)
-
-            thumb_item = create_styled_frame(self.thumb_frame, 'medium', padx=5, pady=4)
-            thumb_item.pack(fill="x", pady=2, padx=3)
-
-            row_frame = create_styled_frame(thumb_item, 'medium')
-            row_frame.pack(fill="x")
-
-            # Botones de ordenar (solo en modo ordenar)
-            if self.order_mode:
-                btn_order_frame = create_styled_frame(row_frame, 'medium')
-                btn_order_frame.pack(side="left", padx=2)
-
-                tk.Button(btn_order_frame, text="⬆", width=2, font=("Segoe UI", 7),
-                         command=lambda i=idx: self.move_page_up(i),
-                         bg=COLORS['button_bg'], fg=COLORS['text_primary'],
-                         relief='flat').pack(pady=1)
-                tk.Button(btn_order_frame, text="⬇", width=2, font=("Segoe UI", 7),
-                         command=lambda i=idx: self.move_page_down(i),
-                         bg=COLORS['button_bg'], fg=COLORS['text_primary'],
-                         relief='flat').pack(pady=1)
-
-            # Botones de editar página (solo en modo editar)
-            if self.edit_mode:
-                btn_edit_frame = create_styled_frame(row_frame, 'medium')
-                btn_edit_frame.pack(side="left", padx=2)
-
-                tk.Button(btn_edit_frame, text="↶", width=2, font=("Segoe UI", 7),
-                         command=lambda p=page_num: self.rotate_page_left(p),
-                         bg=COLORS['accent_primary'], fg=COLORS['text_primary'],
-                         relief='flat').pack(pady=1)
-                tk.Button(btn_edit_frame, text="↷", width=2, font=("Segoe UI", 7),
-                         command=lambda p=page_num: self.rotate_page_right(p),
-                         bg=COLORS['accent_primary'], fg=COLORS['text_primary'],
-                         relief='flat').pack(pady=1)
-
-            # Miniatura
-            if self.order_mode:
-                btn = tk.Button(row_frame, image=photo,
-                               command=lambda p=page_num: self.show_preview(p),
-                               relief="flat", bd=0, bg=COLORS['bg_medium'],
-                               cursor='hand2')
-            elif self.edit_mode:
-                btn = tk.Button(row_frame, image=photo,
-                               command=lambda p=page_num: self.show_edit_page(p),
-                               relief="flat", bd=0, bg=COLORS['bg_medium'],
-                               cursor='hand2')
-            else:
-                btn = tk.Button(row_frame, image=photo,
-                               command=lambda p=page_num: self.select_page(p),
-                               relief="flat", bd=0, bg=COLORS['bg_medium'],
-                               cursor='hand2')
-            btn.pack(side="left" if (self.order_mode or self.edit_mode) else None, padx=2)
-
-            # Etiquetas
-            info_frame = create_styled_frame(thumb_item, 'medium')
-            info_frame.pack()
-
-            if self.order_mode:
-                lbl_text = f"Pos {idx + 1} (Pág. {page_num + 1})"
-                lbl = tk.Label(info_frame, text=lbl_text, bg=COLORS['bg_medium'],
-                              font=FONTS['small'], fg=COLORS['accent_secondary'])
-            elif self.edit_mode:
-                rotation = self.page_editor.get_page_rotation(self.doc, page_num)
-                scale = self.page_editor.get_page_scale(page_num)
-                lbl_text = f"Pág. {page_num + 1} | {rotation}°"
-                if scale != 1.0:
-                    lbl_text += f" | {int(scale*100)}%"
-                lbl = tk.Label(info_frame, text=lbl_text, bg=COLORS['bg_medium'],
-                              font=FONTS['small'], fg=COLORS['accent_primary'])
-            else:
-                lbl = tk.Label(info_frame, text=f"Pág. {page_num + 1}",
-                              bg=COLORS['bg_medium'], font=FONTS['small'],
-                              fg=COLORS['text_secondary'])
-            lbl.pack()
+    @traced("ui.load_thumbnail_batch")
+    @timed("ui.load_thumbnail_batch")
+    def _load_thumbnail_batch(self, generation, page_order, start):
+        """Construye miniaturas hasta agotar el tiempo de una tanda"""
+        if generation != self._thumb_generation or not self.doc:
+            return
+
+        deadline = time.perf_counter() + THUMBNAIL_BATCH_SECONDS
+        idx = start
+        while idx < len(page_order):
+            self.add_thumbnail(idx, page_order[idx])
+            idx += 1
+            if time.perf_counter() >= deadline:
+                break
+        annotate(pages=idx - start)
+        self.thumbnails_pending = len(page_order) - idx
+
+        if idx < len(page_order):
+            self.root.after(1, self._load_thumbnail_batch, generation, page_order, idx)
+        else:
+            perf_stats.record("ui.thumbnails", time.perf_counter() - self._thumbs_started,
+                              f"{len(page_order)} páginas")
+            self.finish_open_stage('thumbnails')
+
+    def add_thumbnail(self, idx, page_num):
+        """Añade la miniatura de una página en la posición idx de la lista"""
+        from PIL import Image, ImageTk
+
+        pix = self.pdf_handler.get_page_pixmap(self.doc, page_num, scale=THUMBNAIL_SCALE)
+        if not pix:
+            return
+
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        photo = ImageTk.PhotoImage(img)
+        self.thumbnails.append(photo)
+        self.track_image('thumbnails', idx, photo)
+
+        thumb_item = create_styled_frame(self.thumb_frame, 'medium', padx=5, pady=4)
+        thumb_item.pack(fill="x", pady=2, padx=3)
+
+        row_frame = create_styled_frame(thumb_item, 'medium')
+        row_frame.pack(fill="x")
 
-            # Indicador de marcadores
-            count = self.bookmark_manager.count_bookmarks_for_page(page_num + 1)
-            if count > 0:
-                tk.Label(info_frame, text=f"📑 {count}", bg=COLORS['bg_medium'],
-                        fg=COLORS['accent_success'], font=FONTS['small']).pack()
+        # Botones de ordenar (solo en modo ordenar)
+        if self.order_mode:
+            btn_order_frame = create_styled_frame(row_frame, 'medium')
+            btn_order_frame.pack(side="left", padx=2)
+
+            tk.Button(btn_order_frame, text="⬆", width=2, font=("Segoe UI", 7),
+                     command=lambda i=idx: self.move_page_up(i),
+                     bg=COLORS['button_bg'], fg=COLORS['text_primary'],
+                     relief='flat').pack(pady=1)
+            tk.Button(btn_order_frame, text="⬇", width=2, font=("Segoe UI", 7),
+                     command=lambda i=idx: self.move_page_down(i),
+                     bg=COLORS['button_bg'], fg=COLORS['text_primary'],
+                     relief='flat').pack(pady=1)
+
+            selected = tk.BooleanVar(value=idx in self.selected_positions)
+            check = tk.Checkbutton(row_frame, variable=selected,
+                                   command=lambda i=idx, v=selected: self.toggle_page_selection(i, v.get()),
+                                   bg=COLORS['bg_medium'], selectcolor=COLORS['bg_light'],
+                                   activebackground=COLORS['bg_medium'])
+            check.var = selected  # Mantener la referencia
+            check.pack(side="left")
+
+        # Botones de editar página (solo en modo editar)
+        if self.edit_mode:
+            btn_edit_frame = create_styled_frame(row_frame, 'medium')
+            btn_edit_frame.pack(side="left", padx=2)
+
+            tk.Button(btn_edit_frame, text="↶", width=2, font=("Segoe UI", 7),
+                     command=lambda p=page_num: self.rotate_page_left(p),
+                     bg=COLORS['accent_primary'], fg=COLORS['text_primary'],
+                     relief='flat').pack(pady=1)
+            tk.Button(btn_edit_frame, text="↷", width=2, font=("Segoe UI", 7),
+                     command=lambda p=page_num: self.rotate_page_right(p),
+                     bg=COLORS['accent_primary'], fg=COLORS['text_primary'],
+                     relief='flat').pack(pady=1)
+
+        # Miniatura
+        if self.order_mode:
+            btn = tk.Button(row_frame, image=photo,
+                           command=lambda p=page_num: self.show_preview(p),
+                           relief="flat", bd=0, bg=COLORS['bg_medium'],
+                           cursor='hand2')
+        elif self.edit_mode:
+            btn = tk.Button(row_frame, image=photo,
+                           command=lambda p=page_num: self.show_edit_page(p),
+                           relief="flat", bd=0, bg=COLORS['bg_medium'],
+                           cursor='hand2')
+        else:
+            btn = tk.Button(row_frame, image=photo,
+                           command=lambda p=page_num: self.select_page(p),
+                           relief="flat", bd=0, bg=COLORS['bg_medium'],
+                           cursor='hand2')
+        btn.pack(side="left" if (self.order_mode or self.edit_mode) else None, padx=2)
+
+        # Etiquetas
+        info_frame = create_styled_frame(thumb_item, 'medium')
+        info_frame.pack()
+
+        if self.order_mode:
+            lbl_text = f"Pos {idx + 1} (Pág. {page_num + 1})"
+            lbl = tk.Label(info_frame, text=lbl_text, bg=COLORS['bg_medium'],
+                          font=FONTS['small'], fg=COLORS['accent_secondary'])
+            if idx in self.page_marks:
+                tk.Label(info_frame, text=self.page_marks[idx], bg=COLORS['bg_medium'],
+                        font=FONTS['small'], fg=COLORS['accent_warning']).pack(side="bottom")
+        elif self.edit_mode:
+            rotation = self.page_editor.get_page_rotation(self.doc, page_num)
+            scale = self.page_editor.get_page_scale(page_num)
+            lbl_text = f"Pág. {page_num + 1} | {rotation}°"
+            if scale != 1.0:
+                lbl_text += f" | {int(scale*100)}%"
+            lbl = tk.Label(info_frame, text=lbl_text, bg=COLORS['bg_medium'],
+                          font=FONTS['small'], fg=COLORS['accent_primary'])
+        else:
+            lbl = tk.Label(info_frame, text=f"Pág. {page_num + 1}",
+                          bg=COLORS['bg_medium'], font=FONTS['small'],
+                          fg=COLORS['text_secondary'])
+        lbl.pack()
+
+        self.thumb_info_frames.append((info_frame, page_num))
+        self.add_bookmark_indicator(info_frame, page_num)
+
+    def track_image(self, category, key, photo):
+        """Anota en la contabilidad de memoria una imagen de tkinter (RGBA)"""
+        memory.track(category, key, photo.width() * photo.height() * 4)
 
+    def add_bookmark_indicator(self, info_frame, page_num):
+        """Muestra bajo la miniatura cuántos marcadores tiene la página"""
+        count = self.bookmark_manager.count_bookmarks_for_page(page_num + 1)
+        if count > 0:
+            tk.Label(info_frame, text=f"📑 {count}", bg=COLORS['bg_medium'],
+                    fg=COLORS['accent_success'], font=FONTS['small']).pack()
 
     # =========================================================================
     # SELECCIÓN DE PÁGINA
@@ -374,6 +756,7 @@ class PDFEditorApp:
 
     def select_page(self, page_num):
         """Selecciona una página y muestra sus marcadores"""
+        self.ensure_outline()
         self.current_page = page_num + 1
         self.page_label.config(text=f"📄 Página {self.current_page} de {len(self.doc)}")
 
@@ -514,14 +897,14 @@ class PDFEditorApp:
         if self.order_mode and self.edit_mode:
             self.edit_mode_var.set(False)
             self.edit_mode = False
-            self.edit_frame.pack_forget()
+            self.hide_mode_panel('edit_frame')
 
         if self.order_mode:
             self.bookmarks_frame.pack_forget()
-            self.preview_frame.pack(fill="both", expand=True)
+            self.get_mode_panel('preview_frame').pack(fill="both", expand=True)
             self.page_label.config(text="🔀 Modo Ordenar - Selecciona una página para ver")
         else:
-            self.preview_frame.pack_forget()
+            self.hide_mode_panel('preview_frame')
             self.bookmarks_frame.pack(fill="both", expand=True)
             self.page_label.config(text="Selecciona una página")
 
@@ -531,15 +914,140 @@ class PDFEditorApp:
     def move_page_up(self, idx):
         """Mueve una página hacia arriba"""
         if self.page_order_manager.move_up(idx):
+            self.clear_page_selection()
             self.load_thumbnails()
             self.refresh_tree()
 
     def move_page_down(self, idx):
         """Mueve una página hacia abajo"""
         if self.page_order_manager.move_down(idx):
+            self.clear_page_selection()
             self.load_thumbnails()
             self.refresh_tree()
 
+    def toggle_page_selection(self, idx, selected):
+        """Marca o desmarca la página en la posición idx"""
+        if selected:
+            self.selected_positions.add(idx)
+        else:
+            self.selected_positions.discard(idx)
+        self.update_selection_label()
+
+    def clear_page_selection(self):
+        self.selected_positions = set()
+        self.page_marks = {}
+        self.update_selection_label()
+
+    def update_selection_label(self):
+        if self.preview_frame is not None:
+            count = len(self.selected_positions)
+            self.selection_label.config(text=f"{count} marcadas" if count else "")
+
+    def delete_selected_pages(self):
+        """Elimina del orden las páginas marcadas (el documento cambia al guardar)"""
+        if not self.doc or not self.selected_positions:
+            messagebox.showwarning("Aviso", "Marca antes las páginas a eliminar")
+            return
+        count = len(self.selected_positions)
+        if not messagebox.askyesno("Eliminar páginas", f"¿Eliminar {count} página(s)?"):
+            return
+        self.ensure_outline()
+        try:
+            self.page_order_manager.delete(self.selected_positions)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.clear_page_selection()
+        self.load_thumbnails()
+        self.refresh_tree()
+
+    def duplicate_selected_pages(self):
+        """Duplica las páginas marcadas; cada copia queda tras su original"""
+        if not self.doc or not self.selected_positions:
+            messagebox.showwarning("Aviso", "Marca antes las páginas a duplicar")
+            return
+        self.page_order_manager.duplicate(self.selected_positions)
+        self.clear_page_selection()
+        self.load_thumbnails()
+        self.refresh_tree()
+
+    def find_duplicate_pages(self):
+        """Marca las páginas repetidas (todas menos la primera de cada grupo)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from logic.duplicates import find_duplicates
+
+        def progress(done, total):
+            self.page_label.config(text=f"🔁 Buscando páginas repetidas: {done} de {total}")
+            self.root.update_idletasks()
+
+        self.root.config(cursor="wait")
+        self.root.update()
+        try:
+            groups = find_duplicates(self.doc, self.page_order_manager.get_order(),
+                                     thumbnail_scale=THUMBNAIL_SCALE, progress=progress)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron buscar páginas repetidas:\n{e}")
+            return
+        finally:
+            self.root.config(cursor="")
+            self.page_label.config(text="🔀 Modo Ordenar")
+
+        self.mark_pages({position: f"🔁 Repite la pos. {group[0] + 1}"
+                         for group in groups for position in group[1:]})
+        if not groups:
+            messagebox.showinfo("Páginas repetidas", "No hay páginas repetidas")
+
+    def find_blank_pages(self):
+        """Marca las páginas en blanco para poder eliminarlas de una vez"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        from logic.blank_pages import find_blank_pages
+
+        def progress(done, total):
+            self.page_label.config(text=f"⬜ Buscando páginas en blanco: {done} de {total}")
+            self.root.update_idletasks()
+
+        self.root.config(cursor="wait")
+        self.root.update()
+        try:
+            blank = find_blank_pages(self.doc, self.page_order_manager.get_order(), progress=progress)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron buscar páginas en blanco:\n{e}")
+            return
+        finally:
+            self.root.config(cursor="")
+            self.page_label.config(text="🔀 Modo Ordenar")
+
+        self.mark_pages({position: f"⬜ En blanco ({ink * 100:.2f} % tinta)"
+                         for position, ink in blank.items()})
+        if not blank:
+            messagebox.showinfo("Páginas en blanco", "No hay páginas en blanco")
+
+    def mark_pages(self, marks):
+        """Deja marcadas (y con su aviso) las posiciones de marks: {posición: texto}"""
+        self.clear_page_selection()
+        self.selected_positions.update(marks)
+        self.page_marks = dict(marks)
+        self.update_selection_label()
+        self.load_thumbnails()
+
+    def insert_blank_page(self):
+        """Inserta una página en blanco tras la última marcada (o al final)"""
+        if not self.doc:
+            messagebox.showwarning("Aviso", "No hay ningún PDF cargado")
+            return
+        order = self.page_order_manager.get_order()
+        position = max(self.selected_positions) + 1 if self.selected_positions else len(order)
+        added = self.page_order_manager.insert_blank(self.doc, position)
+        # La página nueva se añade al final del documento y no tiene texto
+        self.search_builder.index.extend(len(added))
+        self.clear_page_selection()
+        self.load_thumbnails()
+        self.refresh_tree()
+
     # =========================================================================
     # VISTA PREVIA
     # =========================================================================
@@ -553,10 +1061,15 @@ class PDFEditorApp:
         self.page_label.config(text=f"🔀 Vista previa: Página {self.current_page}")
         self.render_preview()
 
+    @traced("ui.render_preview")
+    @timed("ui.render_preview")
     def render_preview(self):
         """Renderiza la página actual con el zoom actual"""
+        from PIL import Image, ImageTk
+
         if not self.doc or not self.current_page:
             return
+        annotate(page=self.current_page - 1, zoom=self.preview_zoom)
 
         pix = self.pdf_handler.get_page_pixmap(self.doc, self.current_page - 1, self.preview_zoom)
         if not pix:
@@ -564,11 +1077,13 @@ class PDFEditorApp:
 
         img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
         self.preview_image = ImageTk.PhotoImage(img)
+        self.track_image('preview', 'preview', self.preview_image)
 
         self.preview_canvas.delete("all")
         self.preview_canvas.create_image(0, 0, anchor="nw", image=self.preview_image)
         self.preview_canvas.configure(scrollregion=(0, 0, pix.width, pix.height))
         self.zoom_label.config(text=f"{int(self.preview_zoom * 100)}%")
+        self.draw_search_highlights()
 
     def zoom_in(self):
         """Aumentar zoom"""
@@ -609,6 +1124,140 @@ class PDFEditorApp:
         """Scroll vertical en la vista previa"""
         self.preview_canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
+    # =========================================================================
+    # BÚSQUEDA
+    # =========================================================================
+
+    def focus_search(self, event=None):
+        self.search_entry.focus_set()
+        self.search_entry.select_range(0, tk.END)
+        return "break"
+
+    def reset_search_index(self):
+        """Vacía el índice de búsqueda (se va a cargar otro documento)"""
+        if self._search_builder is None:
+            return
+        self._search_builder.cancel()
+        self._search_builder.index.clear()
+        self.search_hits = []
+        self.search_hit_index = -1
+        self.search_status.config(text="")
+
+    def watch_search_index(self):
+        """Muestra el progreso del índice y repite la búsqueda cuando termina"""
+        if self._search_poll_job is not None:
+            self.root.after_cancel(self._search_poll_job)
+            self._search_poll_job = None
+
+        index = self.search_builder.index
+        pending = index.pending_count()
+        if pending:
+            done = index.page_count - pending
+            self.search_status.config(text=f"indexando {done}/{index.page_count}")
+            self._search_poll_job = self.root.after(SEARCH_POLL_MS, self.watch_search_index)
+        else:
+            self.search_status.config(text="")
+            self.run_search()
+
+    def on_search_key(self, event):
+        """Busca al dejar de escribir"""
+        if event.keysym in ("Return", "Escape", "Shift_L", "Shift_R"):
+            return
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DELAY_MS, self.run_search)
+
+    def clear_search(self, event=None):
+        self.search_entry.delete(0, tk.END)
+        self.run_search()
+
+    @traced("ui.search")
+    @timed("ui.search")
+    def run_search(self):
+        """Busca el texto de la barra de búsqueda y muestra el primer acierto"""
+        self._search_job = None
+        query = self.search_entry.get().strip()
+        annotate(query=query)
+        previous = self.search_hits[self.search_hit_index] if self.search_hits else None
+
+        if not query or self._search_builder is None or not self.doc:
+            self.search_hits = []
+            self.search_hit_index = -1
+        else:
+            self.search_hits = self._search_builder.index.search(query)
+            self.search_hit_index = 0 if self.search_hits else -1
+            # Si ya se estaba mostrando un acierto, seguir desde su página
+            if previous and self.search_hits:
+                self.search_hit_index = next(
+                    (i for i, hit in enumerate(self.search_hits) if hit['page'] >= previous['page']), 0)
+        annotate(hits=len(self.search_hits))
+
+        if self._search_poll_job is None:
+            self.update_search_status()
+        if self.search_hits:
+            self.show_search_hit(self.search_hit_index)
+        elif previous and self.order_mode and self.current_page:
+            self.render_preview()  # Quitar los resaltados anteriores
+
+    def update_search_status(self):
+        if not self.search_entry.get().strip():
+            text = ""
+        elif not self.search_hits:
+            text = "sin resultados"
+        else:
+            text = f"{self.search_hit_index + 1} de {len(self.search_hits)}"
+        self.search_status.config(text=text)
+
+    def next_search_hit(self):
+        if self.search_hits:
+            self.show_search_hit((self.search_hit_index + 1) % len(self.search_hits))
+
+    def previous_search_hit(self):
+        if self.search_hits:
+            self.show_search_hit((self.search_hit_index - 1) % len(self.search_hits))
+
+    def show_search_hit(self, hit_index):
+        """Muestra un acierto resaltado en la vista previa (modo ordenar)"""
+        self.search_hit_index = hit_index
+        hit = self.search_hits[hit_index]
+        if self._search_poll_job is None:
+            self.update_search_status()
+
+        if not self.order_mode:
+            self.order_mode_var.set(True)
+            self.toggle_order_mode()
+        self.show_preview(hit['page'])
+
+        # Desplazar la vista previa hasta el acierto
+        x0, y0, x1, y1 = self.preview_canvas.bbox("search_current") or (0, 0, 0, 0)
+        region = self.preview_canvas.cget("scrollregion").split()
+        if region:
+            width, height = float(region[2]), float(region[3])
+            if width and height:
+                self.preview_canvas.xview_moveto(max(0, x0 - 40) / width)
+                self.preview_canvas.yview_moveto(max(0, y0 - 80) / height)
+
+    def draw_search_highlights(self):
+        """Resalta en la vista previa los aciertos de la página actual"""
+        import fitz  # PyMuPDF
+
+        if not self.search_hits or not self.current_page:
+            return
+        page_num = self.current_page - 1
+        matrix = self.doc[page_num].rotation_matrix * fitz.Matrix(self.preview_zoom, self.preview_zoom)
+        for i, hit in enumerate(self.search_hits):
+            if hit['page'] != page_num:
+                continue
+            current = i == self.search_hit_index
+            for rect in hit['rects']:
+                r = fitz.Rect(rect) * matrix
+                self.preview_canvas.create_rectangle(
+                    r.x0 - 1, r.y0 - 1, r.x1 + 1, r.y1 + 1,
+                    outline=COLORS['accent_warning'] if current else "#ffd54f",
+                    width=2 if current else 1,
+                    fill="#ffd54f", stipple="gray25",
+                    tags=("search_current",) if current else ("search",))
+
     # =========================================================================
     # MODO EDITAR PÁGINAS
     # =========================================================================
@@ -624,10 +1273,11 @@ class PDFEditorApp:
 
         if self.edit_mode:
             self.bookmarks_frame.pack_forget()
-            self.edit_frame.pack(fill="both", expand=True)
+            self.hide_mode_panel('preview_frame')
+            self.get_mode_panel('edit_frame').pack(fill="both", expand=True)
             self.page_label.config(text="✏️ Modo Editar - Selecciona una página")
         else:
-            self.edit_frame.pack_forget()
+            self.hide_mode_panel('edit_frame')
             self.bookmarks_frame.pack(fill="both", expand=True)
             self.page_label.config(text="Selecciona una página")
 
@@ -683,10 +1333,15 @@ class PDFEditorApp:
         # Mostrar vista previa (antes y después)
         self.render_edit_preview()
 
+    @traced("ui.render_edit_preview")
+    @timed("ui.render_edit_preview")
     def render_edit_preview(self):
         """Renderiza la vista previa de la página en modo edición (antes/después)"""
+        from PIL import Image, ImageTk
+
         if not self.doc or not self.current_page:
             return
+        annotate(page=self.current_page - 1)
 
         page_num = self.current_page - 1
         scale = self.page_editor.get_page_scale(page_num)
@@ -721,6 +1376,7 @@ class PDFEditorApp:
                 self.original_preview_image = ImageTk.PhotoImage(img_original)
 
         if self.original_preview_image:
+            self.track_image('preview', 'original', self.original_preview_image)
             self.original_canvas.delete("all")
             img_w = self.original_preview_image.width()
             img_h = self.original_preview_image.height()
@@ -774,6 +1430,7 @@ class PDFEditorApp:
                 img_result = img_with_margins
 
             self.result_preview_image = ImageTk.PhotoImage(img_result)
+            self.track_image('preview', 'result', self.result_preview_image)
 
             self.edit_canvas.delete("all")
             img_w = self.result_preview_image.width()
@@ -798,6 +1455,34 @@ class PDFEditorApp:
             if self.current_page == page_num + 1:
                 self.show_edit_page(page_num)
 
+    def autocrop_pages(self, pages):
+        """Recorta los márgenes en blanco de las páginas (None: todas)"""
+        if not self.doc:
+            return
+        from logic.autocrop import plan_crops
+
+        def progress(done, total):
+            self.page_label.config(text=f"✂️ Buscando el contenido: {done} de {total}")
+            self.root.update_idletasks()
+
+        uniform = self.uniform_crop_var.get() and pages is None
+        self.root.config(cursor="wait")
+        self.root.update()
+        try:
+            crops = plan_crops(self.doc, pages, uniform, progress=progress)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron recortar las páginas:\n{e}")
+            return
+        finally:
+            self.root.config(cursor="")
+
+        for page_num, cropbox in crops.items():
+            self.page_editor.crop_page(self.doc, page_num, cropbox)
+        self.page_label.config(text=f"✂️ {len(crops)} página(s) recortadas")
+        self.load_thumbnails()
+        if self.current_page:
+            self.show_edit_page(self.current_page - 1)
+
     def on_scale_change(self, value):
         """Cuando cambia el slider de escala"""
         if not self.current_page:
@@ -0,0 +1,199 @@
+"""
+Diálogo para exportar páginas del documento abierto como imágenes.
+
+El renderizado y la escritura de las imágenes se hacen en logic/page_export.py,
+en procesos trabajadores; aquí solo se recogen las opciones y se muestra el
+progreso sin bloquear la ventana.
+"""
+import os
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from ui.styles import (
+    COLORS, FONTS,
+    create_styled_button, create_styled_entry, create_styled_frame,
+    create_styled_label, create_styled_labelframe
+)
+
+# Intervalo de refresco del progreso (ms)
+PROGRESS_INTERVAL_MS = 200
+
+FORMAT_LABELS = (
+    ('png', "PNG (sin pérdida)"),
+    ('jpeg', "JPEG"),
+    ('webp', "WebP"),
+    ('tiff', "TIFF (sin pérdida)"),
+)
+
+
+class ExportDialog:
+    """Ventana con las opciones de exportación y el progreso"""
+
+    def __init__(self, app):
+        self.app = app
+        self.job = None
+        self.temp_source = None
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Exportar imágenes")
+        self.window.configure(bg=COLORS['bg_dark'])
+        self.window.transient(app.root)
+        self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.build()
+
+    def _radio(self, parent, text, value, variable):
+        tk.Radiobutton(parent, text=text, value=value, variable=variable,
+                       bg=COLORS['bg_medium'], fg=COLORS['text_primary'],
+                       selectcolor=COLORS['bg_dark'], activebackground=COLORS['bg_medium'],
+                       activeforeground=COLORS['text_primary'], font=FONTS['normal'],
+                       anchor="w").pack(fill="x", padx=8, pady=1)
+
+    def build(self):
+        from logic.page_export import DEFAULT_DPI, DEFAULT_FORMAT, DEFAULT_QUALITY
+
+        body = create_styled_frame(self.window, 'dark')
+        body.pack(fill="both", expand=True, padx=15, pady=15)
+
+        formats = create_styled_labelframe(body, "🖼️ Formato")
+        formats.pack(fill="x")
+        self.format_var = tk.StringVar(value=DEFAULT_FORMAT)
+        for image_format, label in FORMAT_LABELS:
+            self._radio(formats, label, image_format, self.format_var)
+
+        options = create_styled_frame(body, 'dark')
+        options.pack(fill="x", pady=(10, 0))
+        create_styled_label(options, "Resolución (ppp):").pack(side="left")
+        self.dpi_entry = create_styled_entry(options, width=6)
+        self.dpi_entry.insert(0, str(DEFAULT_DPI))
+        self.dpi_entry.pack(side="left", padx=8, ipady=3)
+        create_styled_label(options, "Calidad:").pack(side="left")
+        self.quality_entry = create_styled_entry(options, width=4)
+        self.quality_entry.insert(0, str(DEFAULT_QUALITY))
+        self.quality_entry.pack(side="left", padx=8, ipady=3)
+
+        pages = create_styled_labelframe(body, "📄 Páginas")
+        pages.pack(fill="x", pady=(10, 0))
+        self.pages_var = tk.StringVar(value='selected' if self.app.selected_positions else 'all')
+        self._radio(pages, "Todas", 'all', self.pages_var)
+        if self.app.selected_positions:
+            self._radio(pages, f"Marcadas ({len(self.app.selected_positions)})", 'selected', self.pages_var)
+        self._radio(pages, "Rango (p. ej. 1-3,5,9-):", 'range', self.pages_var)
+        self.range_entry = create_styled_entry(pages, width=28)
+        self.range_entry.pack(anchor="w", padx=28, pady=(0, 6), ipady=3)
+
+        if self.app.page_editor.has_pending_transforms():
+            create_styled_label(body, "Las escalas, márgenes y el blanco y negro pendientes\n"
+                                      "se aplican al guardar y no se incluyen en las imágenes.",
+                                style='muted', justify="left").pack(anchor="w", pady=(8, 0))
+
+        self.status = create_styled_label(body, "", style='accent')
+        self.status.pack(anchor="w", pady=(10, 0))
+
+        buttons = create_styled_frame(body, 'dark')
+        buttons.pack(fill="x", pady=(10, 0))
+        self.start_button = create_styled_button(buttons, "Exportar…", self.start, 'success')
+        self.start_button.pack(side="right")
+        create_styled_button(buttons, "Cerrar", self.close, 'normal').pack(side="right", padx=6)
+
+    # =========================================================================
+    # EXPORTACIÓN
+    # =========================================================================
+
+    def selected_pages(self, page_count):
+        """Posiciones (0-based, en el orden actual) que se van a exportar"""
+        from cli.commands import parse_pages
+
+        mode = self.pages_var.get()
+        if mode == 'selected':
+            return sorted(p for p in self.app.selected_positions if p < page_count)
+        if mode == 'range':
+            return parse_pages(self.range_entry.get().strip(), page_count)
+        return list(range(page_count))
+
+    def start(self):
+        from logic import page_export
+        from logic.workers import document_source
+
+        app = self.app
+        page_order = list(app.page_order_manager.get_order())
+        try:
+            positions = self.selected_pages(len(page_order))
+            dpi = int(self.dpi_entry.get())
+            quality = int(self.quality_entry.get())
+            if not 1 <= quality <= 100:
+                raise ValueError("La calidad debe estar entre 1 y 100")
+            # Valida el formato y la resolución antes de pedir la carpeta
+            page_export.build_tasks("", [], "", image_format=self.format_var.get(), dpi=dpi)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Opciones no válidas:\n{e}", parent=self.window)
+            return
+        if not positions:
+            messagebox.showwarning("Aviso", "No hay páginas que exportar", parent=self.window)
+            return
+
+        output_dir = filedialog.askdirectory(title="Carpeta para las imágenes", parent=self.window)
+        if not output_dir:
+            return
+
+        source, is_temp = document_source(app.doc)
+        self.temp_source = source if is_temp else None
+        base_name = os.path.splitext(os.path.basename(app.doc.name or "documento"))[0] or "documento"
+        image_format = self.format_var.get()
+
+        def make_tasks(cancel):
+            return page_export.build_tasks(source, positions, output_dir, page_order, base_name,
+                                           image_format, dpi, quality)
+
+        self.output_dir = output_dir
+        self.start_button.config(state="disabled")
+        self.status.config(text="Preparando…")
+        self.job = page_export.ExportJob(make_tasks).start()
+        self.window.after(PROGRESS_INTERVAL_MS, self.poll)
+
+    def poll(self):
+        job = self.job
+        if job is None:
+            return
+        if job.running:
+            if job.total:
+                self.status.config(text=f"Exportando {job.done} de {job.total} páginas…")
+            self.window.after(PROGRESS_INTERVAL_MS, self.poll)
+            return
+
+        self.job = None
+        self.remove_temp_source()
+        self.start_button.config(state="normal")
+        if job.error is not None:
+            self.status.config(text="")
+            messagebox.showerror("Error", f"No se pudieron exportar las páginas:\n{job.error}",
+                                 parent=self.window)
+            return
+        if job.cancel_event.is_set():
+            self.status.config(text=f"Cancelado: {job.done} de {job.total} imágenes escritas")
+            return
+
+        written = job.done - len(job.failed)
+        self.status.config(text=f"{written} imágenes en {job.seconds:.1f} s")
+        message = f"Se exportaron {written} páginas a:\n{self.output_dir}"
+        if job.failed:
+            message += f"\n\n{len(job.failed)} páginas fallaron:\n" + "\n".join(
+                f"{os.path.basename(r['output'])}: {r['error']}" for r in job.failed[:5])
+        messagebox.showinfo("Exportar imágenes", message, parent=self.window)
+
+    def remove_temp_source(self):
+        if self.temp_source:
+            try:
+                os.remove(self.temp_source)
+            except OSError:
+                pass
+            self.temp_source = None
+
+    def close(self):
+        if self.job is not None:
+            # Los trabajadores terminan la página que están escribiendo
+            self.job.cancel()
+            self.job.wait()
+            self.job = None
+        self.remove_temp_source()
+        self.window.destroy()
@@ -0,0 +1,119 @@
+"""
+Panel de rendimiento superpuesto a la ventana (F12 para mostrar/ocultar).
+
+Muestra el último tiempo de renderizado de la vista previa y las miniaturas,
+la tasa de aciertos de las cachés, los trabajos pendientes, la memoria por
+categoría y las operaciones recientes más lentas. Solo lee estadísticas que
+ya se recogen (logic/perf_stats.py, logic/memory.py) y se refresca como
+mucho dos veces por segundo para no influir en lo que mide.
+"""
+import tkinter as tk
+
+from logic.memory import memory
+from logic.perf_stats import perf_stats
+from logic.render_cache import render_cache
+from ui.styles import COLORS, FONTS
+
+# Intervalo de refresco (ms)
+HUD_INTERVAL_MS = 500
+SLOWEST_COUNT = 5
+
+# Operaciones que se muestran como "último renderizado"
+RENDER_OPERATIONS = (
+    ("Vista previa", "ui.render_preview"),
+    ("Vista edición", "ui.render_edit_preview"),
+    ("Miniaturas", "ui.thumbnails"),
+    ("Tanda miniat.", "ui.load_thumbnail_batch"),
+    ("Página (fitz)", "pdf_handler.get_page_pixmap"),
+    ("Búsqueda", "ui.search"),
+)
+
+
+def _ms(seconds):
+    return "—" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def _mb(nbytes):
+    return f"{nbytes / 1048576:.1f} MB"
+
+
+class PerformanceHUD:
+    """Panel flotante en la esquina inferior derecha de la ventana principal"""
+
+    def __init__(self, app):
+        self.app = app
+        self.frame = None
+        self.label = None
+        self._job = None
+
+    @property
+    def visible(self):
+        return self.frame is not None
+
+    def toggle(self, event=None):
+        if self.visible:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        if self.visible:
+            return
+        self.frame = tk.Frame(self.app.root, bg=COLORS['bg_dark'],
+                              highlightbackground=COLORS['border_light'], highlightthickness=1)
+        self.label = tk.Label(self.frame, font=FONTS['mono'], justify="left", anchor="nw",
+                              bg=COLORS['bg_dark'], fg=COLORS['text_secondary'])
+        self.label.pack(padx=8, pady=6)
+        self.frame.place(relx=1.0, rely=1.0, x=-12, y=-12, anchor="se")
+        self.refresh()
+
+    def hide(self):
+        if self._job is not None:
+            self.app.root.after_cancel(self._job)
+            self._job = None
+        if self.frame is not None:
+            self.frame.destroy()
+        self.frame = None
+        self.label = None
+
+    def refresh(self):
+        """Actualiza el texto y programa el siguiente refresco"""
+        if not self.visible:
+            return
+        self.label.config(text=self.build_text())
+        self.frame.lift()
+        self._job = self.app.root.after(HUD_INTERVAL_MS, self.refresh)
+
+    def build_text(self):
+        lines = ["RENDIMIENTO  (F12 para ocultar)", ""]
+        for label, name in RENDER_OPERATIONS:
+            lines.append(f"{label:<15}{_ms(perf_stats.get_last(name)):>12}")
+
+        lines.append("")
+        lines.append(f"{'Caché render':<15}{render_cache.hit_rate() * 100:>10.0f} %"
+                     f"  ({render_cache.hits}/{render_cache.hits + render_cache.misses})")
+        conversion = self.app.conversion_cache_stats()
+        if conversion:
+            hits, misses = conversion
+            rate = hits / (hits + misses) * 100 if hits + misses else 0
+            lines.append(f"{'Caché docs':<15}{rate:>10.0f} %  ({hits}/{hits + misses})")
+
+        jobs = self.app.background_jobs()
+        lines.append(f"{'Pendientes':<15}{sum(jobs.values()):>12}  "
+                     + ", ".join(f"{name} {count}" for name, count in jobs.items() if count))
+
+        lines.append("")
+        lines.append(f"{'Memoria':<15}{_mb(memory.total()):>12}  de {_mb(memory.budget_bytes)}")
+        for category, nbytes in memory.usage().items():
+            lines.append(f"  {category:<15}{_mb(nbytes):>10}")
+
+        slowest = perf_stats.slowest(SLOWEST_COUNT)
+        if slowest:
+            lines.append("")
+            lines.append("Más lentas recientes:")
+            for name, seconds, detail, _ in slowest:
+                text = f"  {_ms(seconds):>10}  {name}"
+                if detail:
+                    text += f" ({detail})"
+                lines.append(text)
+        return "\n".join(lines)
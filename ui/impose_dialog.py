@@ -0,0 +1,143 @@
+"""
+Diálogo para imponer el documento abierto en hojas de impresión (varias
+páginas por cara o cuadernillo) y guardarlo como un PDF nuevo.
+
+La imposición se hace en logic/imposition.py sin renderizar, así que tarda
+poco incluso con miles de páginas; el documento abierto no cambia.
+"""
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from ui.styles import (
+    COLORS, FONTS,
+    create_styled_button, create_styled_entry, create_styled_frame,
+    create_styled_label, create_styled_labelframe
+)
+
+LAYOUT_LABELS = (
+    ('2', "2 páginas por cara"),
+    ('4', "4 páginas por cara"),
+    ('8', "8 páginas por cara"),
+    ('booklet', "Cuadernillo (plegar y grapar)"),
+)
+# Tamaños de hoja (en puntos)
+PAPER_SIZES = (
+    ("A4", (595, 842)),
+    ("A3", (842, 1191)),
+    ("Carta", (612, 792)),
+)
+
+
+class ImposeDialog:
+    """Ventana con las opciones de imposición"""
+
+    def __init__(self, app):
+        self.app = app
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Imponer para imprimir")
+        self.window.configure(bg=COLORS['bg_dark'])
+        self.window.transient(app.root)
+        self.window.resizable(False, False)
+        self.build()
+
+    def _radio(self, parent, text, value, variable, side=None):
+        button = tk.Radiobutton(parent, text=text, value=value, variable=variable,
+                                bg=COLORS['bg_medium'], fg=COLORS['text_primary'],
+                                selectcolor=COLORS['bg_dark'], activebackground=COLORS['bg_medium'],
+                                activeforeground=COLORS['text_primary'], font=FONTS['normal'],
+                                anchor="w")
+        if side:
+            button.pack(side=side, padx=8, pady=1)
+        else:
+            button.pack(fill="x", padx=8, pady=1)
+
+    def _entry(self, parent, label, value):
+        row = create_styled_frame(parent, 'dark')
+        row.pack(fill="x", pady=(6, 0))
+        create_styled_label(row, label).pack(side="left")
+        entry = create_styled_entry(row, width=6)
+        entry.insert(0, value)
+        entry.pack(side="right", ipady=3)
+        return entry
+
+    def build(self):
+        body = create_styled_frame(self.window, 'dark')
+        body.pack(fill="both", expand=True, padx=15, pady=15)
+
+        layouts = create_styled_labelframe(body, "🗞️ Disposición")
+        layouts.pack(fill="x")
+        self.layout_var = tk.StringVar(value='2')
+        for layout, label in LAYOUT_LABELS:
+            self._radio(layouts, label, layout, self.layout_var)
+
+        papers = create_styled_labelframe(body, "📄 Hoja")
+        papers.pack(fill="x", pady=(10, 0))
+        self.paper_var = tk.StringVar(value=PAPER_SIZES[0][0])
+        for name, _ in PAPER_SIZES:
+            self._radio(papers, name, name, self.paper_var, side="left")
+
+        self.margin_entry = self._entry(body, "Margen de la hoja (pt):", "0")
+        self.gutter_entry = self._entry(body, "Espacio entre páginas (pt):", "0")
+        self.signature_entry = self._entry(body, "Hojas por pliego (0 = uno solo):", "0")
+        self.creep_entry = self._entry(body, "Corrección de lomo (pt):", "0")
+
+        if self.app.page_editor.has_pending_transforms():
+            create_styled_label(body, "Las escalas, márgenes y el blanco y negro pendientes\n"
+                                      "se aplican al guardar y no se incluyen en las hojas.",
+                                style='muted', justify="left").pack(anchor="w", pady=(8, 0))
+
+        buttons = create_styled_frame(body, 'dark')
+        buttons.pack(fill="x", pady=(12, 0))
+        create_styled_button(buttons, "Guardar…", self.save, 'success').pack(side="right")
+        create_styled_button(buttons, "Cerrar", self.window.destroy, 'normal').pack(side="right", padx=6)
+
+    # =========================================================================
+    # IMPOSICIÓN
+    # =========================================================================
+
+    def save(self):
+        from logic import imposition
+
+        app = self.app
+        try:
+            margin = float(self.margin_entry.get())
+            gutter = float(self.gutter_entry.get())
+            signature = int(self.signature_entry.get())
+            creep = float(self.creep_entry.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Opciones no válidas:\n{e}", parent=self.window)
+            return
+
+        out = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF", "*.pdf")],
+                                           parent=self.window)
+        if not out:
+            return
+
+        app.ensure_outline()
+        page_order = list(app.page_order_manager.get_order())
+        toc = app.bookmark_manager.prepare_for_display(page_order)
+        sheet_size = dict(PAPER_SIZES)[self.paper_var.get()]
+        layout = self.layout_var.get()
+
+        app.root.config(cursor="wait")
+        self.window.config(cursor="wait")
+        app.root.update_idletasks()
+        imposed = None
+        try:
+            if layout == 'booklet':
+                imposed, placements = imposition.impose_booklet(
+                    app.doc, page_order, sheet_size, signature, creep, gutter, margin)
+            else:
+                imposed, placements = imposition.impose_nup(
+                    app.doc, page_order, int(layout), sheet_size, None, margin, gutter)
+            if app.pdf_handler.save(imposed, imposition.remap_toc(toc, placements), out):
+                self.window.destroy()
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo imponer el PDF:\n{e}", parent=self.window)
+        finally:
+            if imposed is not None:
+                imposed.close()
+            app.root.config(cursor="")
+            if self.window.winfo_exists():
+                self.window.config(cursor="")
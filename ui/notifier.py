@@ -0,0 +1,19 @@
+"""
+Módulo con el notificador que muestra los avisos de la lógica en diálogos.
+"""
+from tkinter import messagebox
+
+from logic.notifier import Notifier
+
+
+class MessageBoxNotifier(Notifier):
+    """Muestra los avisos de la lógica con cuadros de diálogo de tkinter"""
+
+    def info(self, title, message):
+        messagebox.showinfo(title, message)
+
+    def warning(self, title, message):
+        messagebox.showwarning(title, message)
+
+    def error(self, title, message):
+        messagebox.showerror(title, message)
@@ -103,8 +103,16 @@ def build_center_panel(parent, app):
     create_styled_button(btn_frame, "✏️ Modificar", app.update_bookmark, 'accent').pack(side="left", padx=2)
     create_styled_button(btn_frame, "🗑️ Eliminar", app.delete_bookmark, 'danger').pack(side="left", padx=2)
 
-    # --- Frame para modo VISTA PREVIA (inicialmente oculto) ---
-    app.preview_frame = create_styled_frame(center_frame, 'dark')
+    # Los paneles de los modos ordenar y editar se construyen al usarlos
+    # por primera vez (build_preview_panel / build_edit_panel)
+    app.center_frame = center_frame
+
+    return center_frame
+
+
+def build_preview_panel(app):
+    """Construye el panel de vista previa del modo ordenar (inicialmente oculto)"""
+    app.preview_frame = create_styled_frame(app.center_frame, 'dark')
 
     # Controles de zoom
     zoom_frame = create_styled_frame(app.preview_frame, 'medium')
@@ -116,6 +124,18 @@ def build_center_panel(parent, app):
     create_styled_button(zoom_frame, "🔍+", app.zoom_in, 'normal', width=4).pack(side="left", padx=2)
     create_styled_button(zoom_frame, "Ajustar", app.zoom_fit, 'accent', width=8).pack(side="left", padx=10)
 
+    # Acciones sobre las páginas marcadas en las miniaturas
+    pages_frame = create_styled_frame(app.preview_frame, 'medium')
+    pages_frame.pack(fill="x", pady=(0, 5), padx=10)
+
+    create_styled_button(pages_frame, "🗑️ Eliminar", app.delete_selected_pages, 'danger').pack(side="left", padx=2)
+    create_styled_button(pages_frame, "⧉ Duplicar", app.duplicate_selected_pages, 'normal').pack(side="left", padx=2)
+    create_styled_button(pages_frame, "📄 En blanco", app.insert_blank_page, 'normal').pack(side="left", padx=2)
+    create_styled_button(pages_frame, "🔁 Repetidas", app.find_duplicate_pages, 'normal').pack(side="left", padx=2)
+    create_styled_button(pages_frame, "⬜ Blancas", app.find_blank_pages, 'normal').pack(side="left", padx=2)
+    app.selection_label = create_styled_label(pages_frame, "", bg=COLORS['bg_medium'])
+    app.selection_label.pack(side="left", padx=10)
+
     # Canvas para vista previa con scroll
     preview_container = create_styled_frame(app.preview_frame, 'dark')
     preview_container.pack(fill="both", expand=True, padx=10)
@@ -134,8 +154,12 @@ def build_center_panel(parent, app):
     app.preview_canvas.bind("<Control-MouseWheel>", app.on_preview_zoom)
     app.preview_canvas.bind("<MouseWheel>", app.on_preview_scroll)
 
-    # --- Frame para modo EDITAR PÁGINAS (inicialmente oculto) ---
-    app.edit_frame = create_styled_frame(center_frame, 'dark')
+    return app.preview_frame
+
+
+def build_edit_panel(app):
+    """Construye el panel del modo editar páginas (inicialmente oculto)"""
+    app.edit_frame = create_styled_frame(app.center_frame, 'dark')
 
     # Contenedor con scroll para los controles de edición
     edit_controls_canvas = create_styled_canvas(app.edit_frame)
@@ -246,6 +270,24 @@ def build_center_panel(parent, app):
 
     create_styled_button(margin_inner, "↺ Quitar márgenes", app.reset_margins, 'normal').pack(pady=5)
 
+    # Sección de recorte automático
+    crop_frame = create_styled_labelframe(edit_controls_frame, "✂️ Recortar márgenes en blanco")
+    crop_frame.pack(fill="x", pady=5, padx=10)
+
+    crop_inner = create_styled_frame(crop_frame, 'medium')
+    crop_inner.pack(fill="x", padx=10, pady=10)
+
+    app.uniform_crop_var = tk.BooleanVar(value=False)
+    create_styled_checkbutton(crop_inner, "Mismo recorte en todas las páginas",
+                             app.uniform_crop_var).pack(anchor="w")
+    crop_btns = create_styled_frame(crop_inner, 'medium')
+    crop_btns.pack(pady=5)
+    create_styled_button(crop_btns, "Esta página",
+                        lambda: app.autocrop_pages([app.current_page - 1]) if app.current_page else None,
+                        'accent', width=12).pack(side="left", padx=5)
+    create_styled_button(crop_btns, "Todas", lambda: app.autocrop_pages(None),
+                        'accent', width=12).pack(side="left", padx=5)
+
     # Sección de blanco y negro
     bw_frame = create_styled_labelframe(edit_controls_frame, "🎨 Color")
     bw_frame.pack(fill="x", pady=5, padx=10)
@@ -298,7 +340,7 @@ def build_center_panel(parent, app):
     app.result_size_label = create_styled_label(size_info_frame, "Resultado: --", style='accent')
     app.result_size_label.pack(side="left", expand=True)
 
-    return center_frame
+    return app.edit_frame
 
 
 def build_right_panel(parent, app):
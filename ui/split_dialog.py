@@ -0,0 +1,176 @@
+"""
+Diálogo para dividir el documento abierto en varios PDFs.
+
+La planificación y la escritura de las partes se hacen en logic/split.py,
+en procesos trabajadores; aquí solo se recogen las opciones y se muestra el
+progreso sin bloquear la ventana.
+"""
+import os
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from ui.styles import (
+    COLORS, FONTS,
+    create_styled_button, create_styled_entry, create_styled_frame,
+    create_styled_label, create_styled_labelframe
+)
+
+# Intervalo de refresco del progreso (ms)
+PROGRESS_INTERVAL_MS = 200
+
+MODE_LABELS = (
+    ('every', "Cada N páginas"),
+    ('bookmarks', "Por marcador de primer nivel"),
+    ('ranges', "Por rangos (uno por parte, separados por ;)"),
+    ('blank', "Por páginas en blanco (se descartan)"),
+)
+
+
+class SplitDialog:
+    """Ventana con las opciones de división y el progreso"""
+
+    def __init__(self, app):
+        self.app = app
+        self.job = None
+        self.temp_source = None
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Dividir PDF")
+        self.window.configure(bg=COLORS['bg_dark'])
+        self.window.transient(app.root)
+        self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.build()
+
+    def build(self):
+        body = create_styled_frame(self.window, 'dark')
+        body.pack(fill="both", expand=True, padx=15, pady=15)
+
+        modes = create_styled_labelframe(body, "✂️ Modo")
+        modes.pack(fill="x")
+        self.mode_var = tk.StringVar(value='every')
+        for mode, label in MODE_LABELS:
+            tk.Radiobutton(modes, text=label, value=mode, variable=self.mode_var,
+                           bg=COLORS['bg_medium'], fg=COLORS['text_primary'],
+                           selectcolor=COLORS['bg_dark'], activebackground=COLORS['bg_medium'],
+                           activeforeground=COLORS['text_primary'], font=FONTS['normal'],
+                           anchor="w").pack(fill="x", padx=8, pady=1)
+
+        value_row = create_styled_frame(body, 'dark')
+        value_row.pack(fill="x", pady=(10, 0))
+        create_styled_label(value_row, "N / rangos:").pack(side="left")
+        self.value_entry = create_styled_entry(value_row, width=28)
+        self.value_entry.insert(0, "10")
+        self.value_entry.pack(side="left", padx=8, ipady=3)
+
+        if self.app.page_editor.has_pending_transforms():
+            create_styled_label(body, "Las escalas, márgenes y el blanco y negro pendientes\n"
+                                      "se aplican al guardar y no se incluyen en las partes.",
+                                style='muted', justify="left").pack(anchor="w", pady=(8, 0))
+
+        self.status = create_styled_label(body, "", style='accent')
+        self.status.pack(anchor="w", pady=(10, 0))
+
+        buttons = create_styled_frame(body, 'dark')
+        buttons.pack(fill="x", pady=(10, 0))
+        self.start_button = create_styled_button(buttons, "Dividir…", self.start, 'success')
+        self.start_button.pack(side="right")
+        create_styled_button(buttons, "Cerrar", self.close, 'normal').pack(side="right", padx=6)
+
+    # =========================================================================
+    # DIVISIÓN
+    # =========================================================================
+
+    def start(self):
+        from cli.commands import parse_pages
+        from logic import split
+        from logic.workers import document_source
+
+        app = self.app
+        app.ensure_outline()
+        page_order = list(app.page_order_manager.get_order())
+        page_count = len(page_order)
+        toc = app.bookmark_manager.prepare_for_display(page_order)
+        mode = self.mode_var.get()
+        value = self.value_entry.get().strip()
+
+        try:
+            if mode == 'every':
+                parts = split.plan_every(page_count, int(value))
+            elif mode == 'bookmarks':
+                parts = split.plan_by_bookmarks(toc, page_count)
+            elif mode == 'ranges':
+                parts = split.plan_ranges([parse_pages(spec, page_count)
+                                           for spec in value.split(";") if spec.strip()])
+            else:
+                parts = None  # Se planifica en el hilo, tras buscar las páginas en blanco
+        except ValueError as e:
+            messagebox.showerror("Error", f"Opciones no válidas:\n{e}", parent=self.window)
+            return
+
+        output_dir = filedialog.askdirectory(title="Carpeta para las partes", parent=self.window)
+        if not output_dir:
+            return
+
+        source, is_temp = document_source(app.doc)
+        self.temp_source = source if is_temp else None
+        base_name = os.path.splitext(os.path.basename(app.doc.name or "documento"))[0] or "documento"
+
+        def make_tasks(cancel):
+            plan = parts
+            if plan is None:
+                separators = split.detect_separators(source, page_order, cancel=cancel)
+                plan = split.plan_by_separators(page_count, separators)
+            return split.build_tasks(source, plan, output_dir, toc, page_order, base_name)
+
+        self.output_dir = output_dir
+        self.start_button.config(state="disabled")
+        self.status.config(text="Preparando…")
+        self.job = split.SplitJob(make_tasks).start()
+        self.window.after(PROGRESS_INTERVAL_MS, self.poll)
+
+    def poll(self):
+        job = self.job
+        if job is None:
+            return
+        if job.running:
+            if job.total:
+                self.status.config(text=f"Escribiendo {job.done} de {job.total} partes…")
+            self.window.after(PROGRESS_INTERVAL_MS, self.poll)
+            return
+
+        self.job = None
+        self.remove_temp_source()
+        self.start_button.config(state="normal")
+        if job.error is not None:
+            self.status.config(text="")
+            messagebox.showerror("Error", f"No se pudo dividir el PDF:\n{job.error}", parent=self.window)
+            return
+        if job.cancel_event.is_set():
+            self.status.config(text=f"Cancelado: {job.done} de {job.total} partes escritas")
+            return
+
+        written = job.done - len(job.failed)
+        self.status.config(text=f"{written} partes en {job.seconds:.1f} s")
+        message = f"Se escribieron {written} partes en:\n{self.output_dir}"
+        if job.failed:
+            message += f"\n\n{len(job.failed)} partes fallaron:\n" + "\n".join(
+                f"{os.path.basename(r['output'])}: {r['error']}" for r in job.failed[:5])
+        messagebox.showinfo("Dividir PDF", message, parent=self.window)
+
+    def remove_temp_source(self):
+        if self.temp_source:
+            try:
+                os.remove(self.temp_source)
+            except OSError:
+                pass
+            self.temp_source = None
+
+    def close(self):
+        if self.job is not None:
+            # Los trabajadores terminan la parte que están escribiendo
+            self.job.cancel()
+            self.job.wait()
+            self.job = None
+        self.remove_temp_source()
+        self.window.destroy()
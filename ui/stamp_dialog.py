@@ -0,0 +1,181 @@
+"""
+Diálogo para añadir sellos a todas las páginas: numeración, Bates, marcas de
+agua y logos.
+
+Los sellos se guardan en app.stamp_manager (logic/stamping.py) y se aplican
+al guardar el PDF, sobre el tamaño final de cada página.
+"""
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from ui.styles import (
+    COLORS, FONTS,
+    create_styled_button, create_styled_entry, create_styled_frame,
+    create_styled_label, create_styled_labelframe
+)
+
+# Posiciones en una rejilla de 3x3 (la casilla vacía no se usa)
+POSITION_GRID = (
+    (('top-left', "↖"), ('top', "↑"), ('top-right', "↗")),
+    ((None, ""), ('center', "●"), (None, "")),
+    (('bottom-left', "↙"), ('bottom', "↓"), ('bottom-right', "↘")),
+)
+PRESETS = (
+    ("Página n de N", "Página {page} de {total}"),
+    ("Bates", "{bates}"),
+    ("Marca de agua", "CONFIDENCIAL"),
+)
+
+
+class StampDialog:
+    """Ventana para añadir sellos pendientes"""
+
+    def __init__(self, app):
+        self.app = app
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Sellos")
+        self.window.configure(bg=COLORS['bg_dark'])
+        self.window.transient(app.root)
+        self.window.resizable(False, False)
+        self.build()
+        self.update_status()
+
+    def _entry(self, parent, label, value, width=8):
+        row = create_styled_frame(parent, 'medium')
+        row.pack(fill="x", padx=8, pady=2)
+        create_styled_label(row, label, bg=COLORS['bg_medium']).pack(side="left")
+        entry = create_styled_entry(row, width=width)
+        entry.insert(0, value)
+        entry.pack(side="right", ipady=2)
+        return entry
+
+    def _position_grid(self, parent, variable):
+        grid = create_styled_frame(parent, 'medium')
+        grid.pack(padx=8, pady=4)
+        for row, cells in enumerate(POSITION_GRID):
+            for col, (position, label) in enumerate(cells):
+                if position is None:
+                    continue
+                tk.Radiobutton(grid, text=label, value=position, variable=variable, indicatoron=False,
+                               width=3, bg=COLORS['bg_light'], fg=COLORS['text_primary'],
+                               selectcolor=COLORS['accent_primary'], font=FONTS['normal']
+                               ).grid(row=row, column=col, padx=1, pady=1)
+
+    def build(self):
+        from logic import stamping
+
+        body = create_styled_frame(self.window, 'dark')
+        body.pack(fill="both", expand=True, padx=15, pady=15)
+
+        # --- Texto ---
+        text = create_styled_labelframe(body, "🔤 Texto")
+        text.pack(fill="x")
+        presets = create_styled_frame(text, 'medium')
+        presets.pack(fill="x", padx=8, pady=(4, 2))
+        for label, template in PRESETS:
+            create_styled_button(presets, label, lambda t=template: self.set_template(t),
+                                 'normal').pack(side="left", padx=2)
+        self.text_entry = create_styled_entry(text, width=36)
+        self.text_entry.insert(0, PRESETS[0][1])
+        self.text_entry.pack(fill="x", padx=8, pady=4, ipady=3)
+        create_styled_label(text, "Campos: {page}, {total}, {bates}", style='muted',
+                            bg=COLORS['bg_medium']).pack(anchor="w", padx=8)
+
+        self.text_position = tk.StringVar(value='bottom')
+        self._position_grid(text, self.text_position)
+        self.size_entry = self._entry(text, "Cuerpo (pt):", str(stamping.DEFAULT_FONT_SIZE))
+        self.color_entry = self._entry(text, "Color:", "#000000")
+        self.opacity_entry = self._entry(text, "Opacidad (0-1):", "1")
+        self.angle_entry = self._entry(text, "Giro (grados, sin campos):", "0")
+
+        bates = create_styled_frame(text, 'medium')
+        bates.pack(fill="x", padx=8, pady=(6, 2))
+        create_styled_label(bates, "Bates:", bg=COLORS['bg_medium']).pack(side="left")
+        self.bates_prefix = create_styled_entry(bates, width=10)
+        self.bates_prefix.pack(side="left", padx=4, ipady=2)
+        create_styled_label(bates, "desde", bg=COLORS['bg_medium']).pack(side="left")
+        self.bates_start = create_styled_entry(bates, width=7)
+        self.bates_start.insert(0, "1")
+        self.bates_start.pack(side="left", padx=4, ipady=2)
+
+        create_styled_button(text, "Añadir texto", self.add_text, 'success').pack(anchor="e", padx=8, pady=6)
+
+        # --- Imagen ---
+        image = create_styled_labelframe(body, "🖼️ Imagen (logo)")
+        image.pack(fill="x", pady=(10, 0))
+        path_row = create_styled_frame(image, 'medium')
+        path_row.pack(fill="x", padx=8, pady=4)
+        self.image_entry = create_styled_entry(path_row, width=28)
+        self.image_entry.pack(side="left", fill="x", expand=True, ipady=2)
+        create_styled_button(path_row, "…", self.browse_image, 'normal').pack(side="left", padx=4)
+        self.image_position = tk.StringVar(value='top-right')
+        self._position_grid(image, self.image_position)
+        self.width_entry = self._entry(image, "Ancho (pt):", str(stamping.DEFAULT_IMAGE_WIDTH))
+        create_styled_button(image, "Añadir imagen", self.add_image, 'success').pack(anchor="e", padx=8, pady=6)
+
+        self.status = create_styled_label(body, "", style='accent', justify="left")
+        self.status.pack(anchor="w", pady=(10, 0))
+
+        buttons = create_styled_frame(body, 'dark')
+        buttons.pack(fill="x", pady=(10, 0))
+        create_styled_button(buttons, "Cerrar", self.window.destroy, 'normal').pack(side="right")
+        create_styled_button(buttons, "Quitar todos", self.clear, 'danger').pack(side="right", padx=6)
+
+    # =========================================================================
+    # SELLOS
+    # =========================================================================
+
+    def set_template(self, template):
+        self.text_entry.delete(0, tk.END)
+        self.text_entry.insert(0, template)
+
+    def browse_image(self):
+        path = filedialog.askopenfilename(
+            parent=self.window,
+            filetypes=[("Imágenes", "*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff *.webp")])
+        if path:
+            self.image_entry.delete(0, tk.END)
+            self.image_entry.insert(0, path)
+
+    def add_text(self):
+        from logic.stamping import parse_color, template_fields
+
+        manager = self.app.stamp_manager
+        template = self.text_entry.get()
+        try:
+            if 'bates' in template_fields(template):
+                manager.set_bates(self.bates_prefix.get(), int(self.bates_start.get()))
+            manager.add_text(template, self.text_position.get(), float(self.size_entry.get()),
+                             parse_color(self.color_entry.get()), float(self.opacity_entry.get()),
+                             float(self.angle_entry.get()))
+        except ValueError as e:
+            messagebox.showerror("Error", f"Sello no válido:\n{e}", parent=self.window)
+            return
+        self.update_status()
+
+    def add_image(self):
+        path = self.image_entry.get().strip()
+        if not path:
+            messagebox.showwarning("Aviso", "Elige una imagen", parent=self.window)
+            return
+        try:
+            self.app.stamp_manager.add_image(path, self.image_position.get(), float(self.width_entry.get()))
+        except ValueError as e:
+            messagebox.showerror("Error", f"Sello no válido:\n{e}", parent=self.window)
+            return
+        self.update_status()
+
+    def clear(self):
+        self.app.stamp_manager.clear()
+        self.update_status()
+
+    def update_status(self):
+        stamps = self.app.stamp_manager.stamps
+        if not stamps:
+            self.status.config(text="No hay sellos pendientes")
+            return
+        lines = [stamp['template'] if stamp['kind'] == 'text' else f"Imagen: {stamp['path']}"
+                 for stamp in stamps]
+        self.status.config(text=f"{len(stamps)} sellos (se aplican al guardar):\n"
+                                + "\n".join(f"• {line}" for line in lines[:6]))